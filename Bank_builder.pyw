@@ -1,78 +1,65 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import json
-import re
 import sys
+import time
+
+# --- Mesure du démarrage (--startup-profile) : posée avant les imports qu'elle chronomètre ---
+class StartupProfile:
+    """Durée de chaque phase du démarrage (imports, fenêtre, premier affichage, bank), depuis le script."""
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.t0 = self.last = time.perf_counter()
+        self.phases = []   # (phase, durée, cumul) en secondes
+
+    def mark(self, phase: str):
+        now = time.perf_counter()
+        self.phases.append((phase, now - self.last, now - self.t0))
+        self.last = now
+
+    def report(self) -> str:
+        lines = [f"{'phase':<28}{'ms':>10}{'total ms':>12}"]
+        for phase, secs, total in self.phases:
+            lines.append(f"{phase:<28}{secs * 1e3:>10.1f}{total * 1e3:>12.1f}")
+        return "\n".join(lines) + "\n"
+
+STARTUP = StartupProfile(enabled="--startup-profile" in sys.argv[1:])
+
+import io
+import json
+import os
 from pathlib import Path
+import queue
+import threading
+from array import array
 import tkinter as tk
 from tkinter import messagebox, filedialog
-import importlib
+STARTUP.mark("import tkinter")
 
 # --- ttkbootstrap (thème moderne + dark mode) ---
 from ttkbootstrap import ttk
 import ttkbootstrap as tb
 from ttkbootstrap.constants import *
-
-# ---------- Utils chemins (compatibles PyInstaller) ----------
-def resource_path(relpath: str | Path) -> Path:
-    """Chemin réel d'une ressource embarquée (--add-data) ou locale."""
-    base = Path(getattr(sys, "_MEIPASS", Path(__file__).resolve().parent))
-    return base / relpath
-
-def app_dir() -> Path:
-    """Dossier de l'exe si gelé, sinon dossier du script."""
-    if getattr(sys, "frozen", False):
-        return Path(sys.executable).resolve().parent
-    return Path(__file__).resolve().parent
-
-APP_DIR = app_dir()
-
-# ---------- Config ----------
-BANK_FILENAME = "bank.yaml"
-BANK_PATH = APP_DIR / BANK_FILENAME  # bank.yaml à côté de l'exe
-STATE_FLAGS_DEFAULT = 1
+STARTUP.mark("import ttkbootstrap")
+
+# --- Cœur sans interface (bank.yaml, décodeur, extraction) : voir bank_core.py ---
+# main.py (décodeur) n'est importé qu'au premier décodage (auto à l'ajout, Décrypter...)
+import bank_core
+from bank_core import (
+    resource_path, BANK_PATH, STATE_FLAGS_DEFAULT, DECODER_STATS, JOB_CHUNK, STARTUP_LOG,
+    load_decoder, decoder_available, BankFile, ItemStore, SearchIndex, write_yaml_manual, TIMINGS, timed,
+    iter_file_lines, iter_text_items, apply_decoded, iter_enrich_serials,
+)
+STARTUP.mark("import bank_core")
+
+# Mesures (fenêtre Diagnostic, F12) : à activer avant la définition d'App, qui pose les enveloppes
+if "--timings" in sys.argv[1:]:
+    TIMINGS.enabled = True
+
+# ---------- Config (interface) ----------
 LANG_FILES = {"fr": "fr.json", "en": "en.json"}
 DEFAULT_LANG = "fr"
 
-# ----- (Optionnel) Kill switch du décodeur externe -----
-DISABLE_DECODER = False
-
-# ----- Intégration du décodeur externe (main.py) avec reload -----
-ext_decoder = None
-has_external_decoder = False
-
-def load_decoder():
-    """Charge/recharge main.py et expose has_external_decoder (désactivable)."""
-    global ext_decoder, has_external_decoder
-    if DISABLE_DECODER:
-        ext_decoder = None
-        has_external_decoder = False
-        return None
-    try:
-        if ext_decoder is None:
-            ext_decoder = importlib.import_module("main")   # main.py à côté (ou embarqué)
-        else:
-            importlib.reload(ext_decoder)                   # hot-reload
-        has_external_decoder = hasattr(ext_decoder, "decode_item_serial")
-    except Exception:
-        ext_decoder = None
-        has_external_decoder = False
-    return ext_decoder
-
-# map des catégories (clé en minuscules) -> libellés UI
-DECODER_CAT_MAP = {
-    "weapon": "Weapons",
-    "equipment": "Equipment",
-    "equipment_alt": "Equipment Alt",
-    "weapon_special": "Special Items",
-    "special": "Special Items",
-    "utility": "Unknown",
-    "consumable": "Unknown",
-    "decode_failed": "Unknown",
-    "unknown": "Unknown",
-}
-
 # --------- i18n ----------
 class I18N:
     def __init__(self, lang="fr"):
@@ -120,6 +107,26 @@ class I18N:
                 "no_selection": "Select at least one row.",
                 "with_comment": "With comment",
                 "without_comment": "Without comment",
+                "reload_decoder": "Reload decoder",
+                "decoder_reloaded": "Decoder reloaded (loads: {loads}, reloads: {reloads}).",
+                "cancel": "Cancel", "cancelling": "Cancelling…", "cancelled": "Cancelled.",
+                "busy": "A task is already running.", "progress_n": "{done} / {total}",
+                "cache_stats": "Decode cache (session): {hits} hit(s), {misses} miss(es).",
+                "bank_parse_errors": "bank.yaml: {n} malformed entry(ies) skipped:",
+                "merge_appended": "Only the new slots were appended; existing content left untouched.",
+                "journal_replayed": "An interrupted merge into bank.yaml was completed from its journal.",
+                "journal_discarded": "The journal of an interrupted merge was discarded: it was incomplete, or bank.yaml changed since. The slots of that merge are not in bank.yaml; merge them again if needed.",
+                "dedupe_on_add": "Skip duplicates on add",
+                "dedupe_skipped": "{n} duplicate(s) skipped (already in the list).",
+                "patch_btn": "Apply to selection…", "patch_title": "Edit a stat on the selection",
+                "patch_field": "Stat:", "patch_value": "New value:", "patch_bad_value": "Invalid value.",
+                "patch_unsupported": "This main.py has no bulk edit (iter_patch_serials).",
+                "patch_done": "{n} serial(s) modified.",
+                "diag_title": "Diagnostics", "diag_refresh": "Refresh", "diag_reset": "Reset",
+                "diag_profile_next": "Profile next action (cProfile)", "diag_save": "Append to log",
+                "diag_profile_armed": "cProfile: next action",
+                "loading_bank": "Loading bank.yaml…", "loading_n": "Loading {n} serials…",
+                "watch_bank": "Watch bank.yaml", "bank_reloaded": "bank.yaml: +{added} / −{removed}",
                 "lang_fr": "FR", "lang_en": "EN"
             }
 
@@ -138,173 +145,254 @@ class I18N:
 
 i18n = I18N(DEFAULT_LANG)
 
-# --------- Fonctions utilitaires ---------
-def detect_category(serial: str) -> str:
-    if serial.startswith("@Ugr"):
-        return "Weapons"
-    if serial.startswith("@Uge"):
-        return "Equipment"
-    if serial.startswith("@Ugd"):
-        return "Equipment Alt"
-    if serial.startswith("@Ugw") or serial.startswith("@Ugu") or serial.startswith("@Ugf") or serial.startswith("@Ug!"):
-        return "Special Items"
-    return "Unknown"
-
-def escape_yaml_single_quoted(val: str) -> str:
-    return val.replace("'", "''")
-
-def parse_bank_yaml_simple(path: Path):
-    """
-    Parse simple du format:
-    slot_X:
-      serial: '...'
-      state_flags: N
-    Supporte commentaire inline après serial: serial: '...' # xxx
-    """
-    entries = {}
-    existing_serials = set()
-    max_slot = -1
-    if not path.exists():
-        return entries, -1, existing_serials
-    try:
-        lines = path.read_text(encoding="utf-8").splitlines()
-    except Exception:
-        return entries, -1, existing_serials
-
-    i = 0
-    while i < len(lines):
-        line = lines[i].rstrip()
-        m_slot = re.match(r"\s*slot_(\d+)\s*:\s*$", line)
-        if m_slot:
-            idx = int(m_slot.group(1))
-            ser = None
-            sf = STATE_FLAGS_DEFAULT
-            comment = ""
-            j = i + 1
-            while j < len(lines):
-                l2 = lines[j].rstrip()
-                if re.match(r"\s*slot_(\d+)\s*:\s*$", l2):
-                    break
-                m_ser = re.match(r"\s*serial\s*:\s*(.+?)\s*$", l2)
-                if m_ser and ser is None:
-                    val = m_ser.group(1)
-                    mq = re.match(r"""['"](.*)['"]\s*(#\s*(.*))?$""", val)
-                    if mq:
-                        ser = mq.group(1)
-                        if mq.group(3):
-                            comment = mq.group(3).strip()
-                    else:
-                        if " #" in val:
-                            ser, c = val.split(" #", 1)
-                            ser = ser.strip()
-                            comment = c.strip()
-                        else:
-                            ser = val.strip()
-                m_sf = re.match(r"\s*state_flags\s*:\s*(\d+)\s*$", l2)
-                if m_sf:
-                    sf = int(m_sf.group(1))
-                j += 1
-            if ser is not None:
-                entries[idx] = {"serial": ser, "state_flags": sf, "comment": comment}
-                existing_serials.add(ser)
-                if idx > max_slot:
-                    max_slot = idx
-            i = j
-        else:
-            i += 1
-    return entries, max_slot, existing_serials
-
-def write_yaml_manual(path: Path, ordered_items, state_flags=STATE_FLAGS_DEFAULT, with_comments=True,
-                      slot_indent=0, inner_indent=2):
-    """
-    ordered_items: liste d'objets {"serial","comment","category"}
-    slot_indent: nb d'espaces avant 'slot_X:'
-    inner_indent: nb d'espaces supplémentaires pour 'serial' et 'state_flags'
-    """
-    s = " " * max(0, int(slot_indent))
-    i = " " * max(0, int(slot_indent) + int(inner_indent))
-    lines = []
-    for idx, it in enumerate(ordered_items):
-        serial_val = it["serial"]
-        comment = (it.get("comment") or "").strip()
-        lines.append(f"{s}slot_{idx}:")
-        if with_comments and comment:
-            lines.append(f"{i}serial: '{escape_yaml_single_quoted(serial_val)}' # {comment}")
-        else:
-            lines.append(f"{i}serial: '{escape_yaml_single_quoted(serial_val)}'")
-        lines.append(f"{i}state_flags: {int(state_flags)}")
-    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+# --------- Travail en arrière-plan ---------
 
-def extract_serials(blob: str):
-    """
-    Extrait serials depuis:
-    - blocs YAML: serial: '...'/ "..." / non-quoted
-    - lignes brutes: @U....
-    """
-    serials = []
-    seen = set()
-
-    re_yaml_serial = re.compile(r"""serial\s*:\s*(?:'([^']*)'|"([^"]*)"|([^\s#]+))""", re.IGNORECASE)
-    for m in re_yaml_serial.finditer(blob):
-        val = (m.group(1) or m.group(2) or m.group(3) or "").strip()
-        if val and val not in seen:
-            serials.append(val)
-            seen.add(val)
-
-    for line in blob.splitlines():
-        line = line.strip()
-        if not line or line.startswith("#"):
-            continue
-        if " #" in line:
-            line = line.split(" #", 1)[0].strip()
-        if re.match(r"^@U\S+$", line) and line not in seen:
-            serials.append(line)
-            seen.add(line)
-    return serials
-
-def try_decode_and_enrich(item: dict) -> bool:
+class BackgroundWork:
     """
-    Essaye main.decode_item_serial(serial):
-      - si weapon_name et commentaire vide -> commentaire
-      - si item_category -> catégorie (mappée)
+    Un job à la fois sur un thread de travail. Le job reçoit cet objet : il teste cancelled()
+    entre deux tranches et publie report(done, total, chunk). Le thread Tk lit la queue via after()
+    et appelle on_chunk / on_done / on_error ; seul le thread Tk touche aux items et à la table.
     """
-    mod = load_decoder()
-    if not (mod and hasattr(mod, "decode_item_serial")):
-        return False
-
-    serial = item.get("serial", "")
-    if not serial:
-        return False
+    POLL_MS = 50
+
+    def __init__(self, root, on_progress=None, on_state=None):
+        self.root = root
+        self.on_progress = on_progress   # (done, total) -> None
+        self.on_state = on_state         # (busy: bool) -> None
+        self._queue = queue.Queue()
+        self._cancel = threading.Event()
+        self._thread = None
+        self._handlers = (None, None, None)
+
+    @property
+    def busy(self) -> bool:
+        return self._thread is not None
+
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def report(self, done: int, total: int, chunk=None):
+        """Appelé depuis le thread de travail."""
+        self._queue.put(("progress", done, total, chunk))
+
+    def submit(self, job, on_chunk=None, on_done=None, on_error=None) -> bool:
+        if self.busy:
+            return False
+        self._cancel.clear()
+        self._handlers = (on_chunk, on_done, on_error)
+
+        def run():
+            try:
+                self._queue.put(("done", job(self)))
+            except Exception as e:
+                self._queue.put(("error", e))
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+        if self.on_state:
+            self.on_state(True)
+        self.root.after(self.POLL_MS, self._poll)
+        return True
+
+    def _poll(self):
+        on_chunk, on_done, on_error = self._handlers
+        while True:
+            try:
+                msg = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if msg[0] == "progress":
+                _, done, total, chunk = msg
+                if chunk is not None and on_chunk:
+                    on_chunk(chunk)
+                if self.on_progress:
+                    self.on_progress(done, total)
+                continue
+            # fin du job
+            self._thread = None
+            cancelled = self.cancelled()
+            if self.on_state:
+                self.on_state(False)
+            if msg[0] == "done":
+                if on_done:
+                    on_done(msg[1], cancelled)
+            elif on_error:
+                on_error(msg[1])
+            return
+        self.root.after(self.POLL_MS, self._poll)
 
-    try:
-        decoded = mod.decode_item_serial(serial)
-    except Exception:
-        return False
-    if not decoded:
-        return False
+# --------- Filtre et surveillance ---------
+FILTER_DEBOUNCE_MS = 250   # délai du filtre à la frappe
+WATCH_POLL_MS = 1000       # surveillance de bank.yaml : un stat() par tour
+SEARCH_INDEX_CHUNK = 1000  # ids indexés (trigrammes) par passage dans la boucle Tk
 
-    changed = False
+# --------- Table virtualisée ---------
+VIRTUAL_MIN_ROWS = 2000   # en dessous, toutes les lignes sont insérées (Treeview natif)
+VIRTUAL_BUFFER = 20       # lignes insérées sous la fenêtre visible
 
-    wn = getattr(decoded, "weapon_name", None)
-    if wn and not (item.get("comment") or "").strip():
-        item["comment"] = str(wn).strip()
-        changed = True
+class VirtualTree:
+    """
+    Au-delà de VIRTUAL_MIN_ROWS lignes, seule la fenêtre visible de rows (+ VIRTUAL_BUFFER)
+    est insérée dans le Treeview ; scrollbar, molette et clavier déplacent cette fenêtre (top).
+    La sélection est gardée par iid, y compris pour les lignes hors fenêtre.
+    row_iid(row) -> iid stable ; row_values(row) -> valeurs des colonnes.
+    """
+    EXTEND_MASK = 0x0001 | 0x0004 | 0x0008   # Shift | Control | Command (mac)
+
+    def __init__(self, tree, vsb, row_iid, row_values):
+        self.tree = tree
+        self.vsb = vsb
+        self.row_iid = row_iid
+        self.row_values = row_values
+        self.rows = []
+        self.top = 0
+        self.virtual = False
+        self.selected = set()        # iids sélectionnés dans toute la vue
+        self._rendered = {}          # iid -> index dans rows (fenêtre insérée)
+        self._window_sel = set()     # sélection Tk posée par render()
+        self._extend = False         # dernier clic / touche avec Shift ou Ctrl
+        self._page = 0
+        self._render_pending = False
+        vsb.configure(command=self._on_scrollbar)
+        tree.configure(yscrollcommand=self._on_tree_yscroll)
+        tree.bind("<ButtonPress-1>", self._note_modifiers, add="+")
+        tree.bind("<KeyPress>", self._note_modifiers, add="+")
+        tree.bind("<Up>", self._on_key_up, add="+")
+        tree.bind("<Prior>", lambda e: self._page_scroll(-1), add="+")
+        tree.bind("<Next>", lambda e: self._page_scroll(1), add="+")
+        tree.bind("<Configure>", self._on_configure, add="+")
+
+    def page_size(self) -> int:
+        try:
+            rh = int(ttk.Style().lookup("Treeview", "rowheight") or 0)
+        except (tk.TclError, ValueError):
+            rh = 0
+        h = self.tree.winfo_height()
+        return max(10, h // (rh or 20)) if h > 1 else 40
+
+    def set_rows(self, rows, keep_position=False, keep_selection=False):
+        """Nouvelle vue ; keep_selection garde les iids sélectionnés (à l'appelant de retirer les absents)."""
+        self.rows = rows
+        self.virtual = len(rows) > VIRTUAL_MIN_ROWS
+        if not keep_position:
+            self.top = 0
+        if not keep_selection:
+            self.selected = set()
+        self.render()
+
+    def render(self):
+        self._render_pending = False
+        tree = self.tree
+        focus = tree.focus()
+        tree.delete(*tree.get_children())
+        n = len(self.rows)
+        if self.virtual:
+            self._page = page = self.page_size()
+            self.top = max(0, min(self.top, n - page))
+            start, stop = self.top, min(n, self.top + page + VIRTUAL_BUFFER)
+        else:
+            start, stop = 0, n
+        rendered = {}
+        for i in range(start, stop):
+            row = self.rows[i]
+            iid = self.row_iid(row)
+            tree.insert("", "end", iid=iid, values=self.row_values(row))
+            rendered[iid] = i
+        self._rendered = rendered
+        self._window_sel = {iid for iid in self.selected if iid in rendered}
+        if self._window_sel:
+            tree.selection_set(list(self._window_sel))
+        if focus in rendered:
+            tree.focus(focus)
+        if self.virtual:
+            self.vsb.set(start / n, min(1.0, (start + page) / n))
+
+    def _schedule_render(self):
+        if not self._render_pending:
+            self._render_pending = True
+            self.tree.after_idle(self.render)
+
+    def update_row(self, row):
+        """Une ligne modifiée : seulement tree.item(values=...) si elle est dans la fenêtre."""
+        iid = self.row_iid(row)
+        if iid in self._rendered:
+            self.tree.item(iid, values=self.row_values(row))
+
+    # --- défilement ---
+    def scroll(self, delta):
+        if not self.virtual:
+            self.tree.yview_scroll(delta, "units")
+            return
+        self.top += delta
+        self._schedule_render()
 
-    dec_cat = getattr(decoded, "item_category", None)
-    if isinstance(dec_cat, str) and dec_cat.strip():
-        key = dec_cat.strip().lower()
-        mapped = DECODER_CAT_MAP.get(key, "Unknown")
-        if item.get("category") != mapped:
-            item["category"] = mapped
-            changed = True
+    def _on_scrollbar(self, *args):
+        if not self.virtual:
+            self.tree.yview(*args)
+            return
+        if args[0] == "moveto":
+            self.top = int(float(args[1]) * len(self.rows))
+        elif args[0] == "scroll":
+            self.top += int(args[1]) * (self._page if args[2] == "pages" else 1)
+        self._schedule_render()
+
+    def _on_tree_yscroll(self, first, last):
+        if not self.virtual:
+            self.vsb.set(first, last)
+            return
+        # le Treeview a défilé tout seul dans la marge (flèche bas, see()) : on décale la fenêtre
+        shift = round(float(first) * len(self._rendered))
+        if shift:
+            self.top += shift
+            self._schedule_render()
+
+    def _on_key_up(self, event):
+        # flèche haut sur la première ligne insérée : on remonte la fenêtre d'une ligne d'abord
+        if self.virtual and self.top > 0 and self._rendered.get(self.tree.focus()) == self.top:
+            self.top -= 1
+            self.render()
+
+    def _page_scroll(self, direction):
+        if not self.virtual:
+            return None
+        self.top += direction * self._page
+        self._schedule_render()
+        return "break"
+
+    def _on_configure(self, event=None):
+        if self.virtual and self.page_size() != self._page:
+            self._schedule_render()
+
+    # --- sélection ---
+    def _note_modifiers(self, event):
+        self._extend = bool(event.state & self.EXTEND_MASK)
+
+    def sync_selection(self):
+        """À appeler sur <<TreeviewSelect>> : reporte la sélection Tk de la fenêtre dans selected."""
+        current = set(self.tree.selection())
+        if current == self._window_sel:
+            return
+        if self._extend:
+            self.selected = (self.selected - self._rendered.keys()) | current
+        else:
+            self.selected = current
+        self._window_sel = current
 
-    return changed
+    def select_only(self, iid):
+        self.selected = {iid}
+        self._window_sel = {iid}
+        self.tree.selection_set(iid)
+        self.tree.focus(iid)
 
 # --------- App (ttkbootstrap Window) ---------
 class App(tb.Window):
     def __init__(self):
         # Thème par défaut (sombre). Met "flatly" si tu préfères clair.
         super().__init__(themename="darkly")
+        STARTUP.mark("window")
         self.title("Bank Format YAML Builder by F3F364fr and GPT5")
         self.geometry("1000x600")
         self.minsize(1000, 600)
@@ -320,20 +408,21 @@ class App(tb.Window):
         except Exception:
             pass
 
-        load_decoder()
-
-        # Banque existante
-        self.bank_entries, self.bank_max_slot, self.bank_serials = parse_bank_yaml_simple(BANK_PATH)
+        # Items (source) : ItemStore en colonnes ; id stable = iid du Treeview,
+        # store.ids = ordre de la liste (ids croissants : ajouts en fin, jamais de réordonnancement).
+        self.store = ItemStore()
+        self.search = SearchIndex(self.store)
+        self._index_after = None
 
-        # Items (source)
-        self.items = []
-        for idx in sorted(self.bank_entries.keys()):
-            ser = self.bank_entries[idx]["serial"]
-            com = self.bank_entries[idx].get("comment", "")
-            self.items.append({"serial": ser, "comment": com, "category": detect_category(ser)})
+        # Banque existante : chargée par load_bank() une fois la fenêtre affichée
+        self.bank = BankFile(BANK_PATH)
+        self._loading = False
 
-        # Vue
-        self.view_items = list(self.items)
+        # Vue : array("I") d'ids ; _view_pos (id -> position) construit à la demande si la vue
+        # n'est plus dans l'ordre des ids (tri)
+        self.view = array("I", self.store.ids)
+        self._view_sorted = True
+        self._view_pos = None
 
         # --- Barre langue + Thème ---
         langbar = ttk.Frame(self)
@@ -385,6 +474,8 @@ class App(tb.Window):
         self.lbl_search = ttk.Label(ctrl, text=i18n.t("search_contains") + ":")
         self.lbl_search.pack(side="left", padx=(12,0))
         self.var_query = tk.StringVar()
+        self._filter_after = None
+        self.var_query.trace_add("write", lambda *a: self._schedule_filter())   # filtre à la frappe
         ent = ttk.Entry(ctrl, textvariable=self.var_query, width=28)
         ent.pack(side="left", padx=6)
         self.btn_filter = ttk.Button(ctrl, text=i18n.t("filter"), command=self.apply_filters)
@@ -394,6 +485,10 @@ class App(tb.Window):
 
         self.btn_dedupe = ttk.Button(ctrl, text=i18n.t("dedupe"), command=self.deduplicate_items)
         self.btn_dedupe.pack(side="right")
+        self.var_dedupe_on_add = tk.BooleanVar(value=False)
+        self.chk_dedupe_on_add = ttk.Checkbutton(ctrl, text=i18n.t("dedupe_on_add"), variable=self.var_dedupe_on_add,
+                                                 onvalue=True, offvalue=False)
+        self.chk_dedupe_on_add.pack(side="right", padx=6)
         self.btn_delete = ttk.Button(ctrl, text=i18n.t("delete_selected"), command=self.remove_selected)
         self.btn_delete.pack(side="right", padx=6)
 
@@ -410,14 +505,17 @@ class App(tb.Window):
         self.tree.heading("serial", text=i18n.t("serial_col"), command=lambda: self.sort_by("serial"))
         self.tree.heading("category", text=i18n.t("category_col"), command=lambda: self.sort_by("category"))
         self.tree.heading("comment", text=i18n.t("comment_col"), command=lambda: self.sort_by("comment"))
+        # Maj+clic sur un en-tête : colonne ajoutée comme clé de tri suivante
+        self.tree.bind("<ButtonPress-1>", self._note_sort_modifier, add="+")
         self.tree.column("serial", width=500, anchor="w")
         self.tree.column("category", width=200, anchor="w")
         self.tree.column("comment", width=300, anchor="w")
         self.tree.grid(row=0, column=0, sticky="nsew")
 
-        vsb = ttk.Scrollbar(table_frame, orient="vertical", command=self.tree.yview)
+        vsb = ttk.Scrollbar(table_frame, orient="vertical")
         vsb.grid(row=0, column=1, sticky="ns")
-        self.tree.configure(yscrollcommand=vsb.set)
+        # iid = id stable de l'item ; seules les lignes visibles sont insérées
+        self.vt = VirtualTree(self.tree, vsb, row_iid=str, row_values=self.store.values)
 
         table_frame.grid_columnconfigure(0, weight=1)
         table_frame.grid_rowconfigure(0, weight=1)
@@ -430,7 +528,7 @@ class App(tb.Window):
                 delta = 1
             else:
                 delta = -1 * (event.delta // 120 if event.delta else 0)
-            self.tree.yview_scroll(delta, "units")
+            self.vt.scroll(delta)
             return "break"
         self.tree.bind("<MouseWheel>", _on_tree_mousewheel)
         self.tree.bind("<Button-4>", _on_tree_mousewheel)
@@ -490,9 +588,24 @@ class App(tb.Window):
         )
         self.btn_dec_sel.pack(side="left", padx=12)
 
-        # Désactiver si pas de décodeur
-        if not has_external_decoder:
+        self.btn_patch_sel = ttk.Button(
+            comment_bar,
+            text=i18n.t("patch_btn"),
+            command=self.patch_selection
+        )
+        self.btn_patch_sel.pack(side="left", padx=(0,12))
+
+        self.btn_reload_dec = ttk.Button(
+            comment_bar,
+            text=i18n.t("reload_decoder"),
+            command=self.reload_decoder
+        )
+        self.btn_reload_dec.pack(side="left")
+
+        # Désactiver si pas de décodeur (main.py trouvable, sans l'importer)
+        if not decoder_available():
             self.btn_dec_sel.config(state="disabled")
+            self.btn_patch_sel.config(state="disabled")
             self.chk_auto_decode.config(state="disabled")
 
         # --- Options + actions (sans Auto/Décrypter désormais) ---
@@ -516,17 +629,102 @@ class App(tb.Window):
         self.spin_inner_indent = ttk.Spinbox(action_bar, from_=0, to=16, textvariable=self.var_inner_indent, width=5)
         self.spin_inner_indent.pack(side="left", padx=6)
 
+        # Modifications de bank.yaml par un autre programme : reportées dans la liste
+        self.var_watch = tk.BooleanVar(value=True)
+        self.chk_watch = ttk.Checkbutton(action_bar, text=i18n.t("watch_bank"), variable=self.var_watch,
+                                         onvalue=True, offvalue=False)
+        self.chk_watch.pack(side="left", padx=(18,0))
+        self._watch_seen = None
+
         self.btn_merge = ttk.Button(action_bar, text=i18n.t("merge_btn"), command=self.merge_to_bank)
         self.btn_merge.pack(side="right")
         self.btn_export = ttk.Button(action_bar, text=i18n.t("export_btn"), command=self.export_to_file)
         self.btn_export.pack(side="right", padx=8)
 
-        self.sort_state = {"serial": True, "category": True, "comment": True}
-
-        # Initialiser thème pour Text et remplir la table
+        # --- Progression des tâches de fond + Annuler ---
+        status_bar = ttk.Frame(self)
+        status_bar.pack(fill="x", padx=10, pady=(0,8))
+        self.var_status = tk.StringVar(value="")
+        self.progress = ttk.Progressbar(status_bar, mode="determinate", maximum=1)
+        self.progress.pack(side="left", fill="x", expand=True)
+        self.lbl_status = ttk.Label(status_bar, textvariable=self.var_status, width=24)
+        self.lbl_status.pack(side="left", padx=6)
+        self.btn_cancel = ttk.Button(status_bar, text=i18n.t("cancel"), command=self.cancel_work, state="disabled")
+        self.btn_cancel.pack(side="right")
+
+        self.work = BackgroundWork(self, on_progress=self._on_work_progress, on_state=self._on_work_state)
+        self.bind("<F12>", lambda e: self.show_diagnostics())
+        self._diag = None
+        self._refresh_pending = False
+
+        # Tri de la vue : colonnes (clé principale d'abord) et sens ; ordres en cache dans le store
+        self.sort_keys = ()
+        self.sort_reverse = False
+        self._sort_add = False
+
+        # Initialiser thème pour Text ; la table se remplit quand le bank est chargé
         self._apply_text_theme()
         self.refresh_tree()
         self.update_title()
+        STARTUP.mark("widgets")
+        self.after_idle(self._on_first_frame)
+
+    # ---------- Démarrage ----------
+    def _on_first_frame(self):
+        """Fenêtre affichée : le bank se charge ensuite sur le thread de travail."""
+        self.update_idletasks()
+        STARTUP.mark("first frame")
+        self.load_bank()
+
+    def load_bank(self):
+        """Charge bank.yaml (snapshot ou parse) hors du thread Tk ; « chargement de N serials » en attendant."""
+        self._loading = True
+        self.var_status.set(i18n.t("loading_bank"))
+
+        def job(work):
+            return self.bank.read_columns(report=lambda n: work.report(0, n))
+
+        def loaded():
+            """Fin du chargement, réussi ou non : profil de démarrage ou surveillance de bank.yaml."""
+            self._loading = False
+            STARTUP.mark("bank loaded")
+            if STARTUP.enabled:
+                self._finish_startup_profile()
+                return False
+            # après un échec, la surveillance relira bank.yaml dès qu'il changera
+            self.after(WATCH_POLL_MS, self._watch_bank)
+            return True
+
+        def on_done(columns, cancelled):
+            self._track(self.store.load_columns(*columns))
+            self.apply_filters()
+            self.update_title()
+            if not loaded():
+                return
+            scan = self.bank.scan
+            if scan.errors:
+                self.after(200, lambda: self.show_parse_errors(scan.errors))
+            if self.bank.journal_result == "replayed":
+                self.after(200, lambda: messagebox.showinfo(i18n.t("info"), i18n.t("journal_replayed")))
+            elif self.bank.journal_result == "discarded":
+                self.after(200, lambda: messagebox.showwarning(i18n.t("warn"), i18n.t("journal_discarded")))
+
+        def on_error(e):
+            self.var_status.set("")
+            loaded()
+
+        self.start_work(job, on_done=on_done, on_error=on_error)
+
+    def _finish_startup_profile(self):
+        """--startup-profile : durées par phase sur stderr et dans STARTUP_LOG, puis fermeture."""
+        text = STARTUP.report() + f"serials: {len(self.store)}, decoder imported: {bank_core.ext_decoder is not None}\n"
+        sys.stderr.write(text)
+        try:
+            with open(STARTUP_LOG, "a", encoding="utf-8") as fh:
+                fh.write(f"=== {time.strftime('%Y-%m-%d %H:%M:%S')} ===\n{text}\n")
+        except OSError:
+            pass
+        self.after(0, self.destroy)
 
     # ---------- Thème ----------
     def switch_theme(self, name: str):
@@ -555,9 +753,16 @@ class App(tb.Window):
         except Exception:
             pass
 
+    def show_parse_errors(self, errors, limit=15):
+        """Slots mal formés de bank.yaml (ignorés à la lecture), avec n° de ligne."""
+        lines = [f"L{lineno}: {msg}" for lineno, msg in errors[:limit]]
+        if len(errors) > limit:
+            lines.append("…")
+        messagebox.showwarning(i18n.t("warn"), i18n.t("bank_parse_errors", n=len(errors)) + "\n" + "\n".join(lines))
+
     # ---------- Mise à jour du titre ----------
     def update_title(self):
-        count = len(self.items)
+        count = len(self.store)
         self.title(f"Bank Format YAML Builder by F3F364fr and GPT5 — {count} serials")
 
     # ---------- i18n refresh ----------
@@ -585,10 +790,9 @@ class App(tb.Window):
         self.btn_filter.config(text=i18n.t("filter"))
         self.btn_reset.config(text=i18n.t("reset"))
         self.btn_dedupe.config(text=i18n.t("dedupe"))
+        self.chk_dedupe_on_add.config(text=i18n.t("dedupe_on_add"))
         self.btn_delete.config(text=i18n.t("delete_selected"))
-        self.tree.heading("serial", text=i18n.t("serial_col"))
-        self.tree.heading("category", text=i18n.t("category_col"))
-        self.tree.heading("comment", text=i18n.t("comment_col"))
+        self._update_sort_headings()
         self.lbl_comment.config(text=i18n.t("comment_apply_label"))
         self.btn_apply_comment.config(text=i18n.t("comment_apply_btn"))
         self.lbl_sf.config(text=i18n.t("state_flags_default"))
@@ -596,28 +800,88 @@ class App(tb.Window):
         self.lbl_inner_indent.config(text=i18n.t("indent_inner"))
         self.btn_merge.config(text=i18n.t("merge_btn"))
         self.btn_export.config(text=i18n.t("export_btn"))
+        self.chk_watch.config(text=i18n.t("watch_bank"))
         self.chk_auto_decode.config(text=i18n.t("auto_decode_on_add"))
         self.btn_dec_sel.config(text=i18n.t("decrypt_btn"))
+        self.btn_patch_sel.config(text=i18n.t("patch_btn"))
+        self.btn_reload_dec.config(text=i18n.t("reload_decoder"))
+        self.btn_cancel.config(text=i18n.t("cancel"))
         try:
             self.tree_menu.entryconfig(0, label=i18n.t("copy_serials"))
         except Exception:
             pass
-        sel = self.tree.selection()
+        sel = self.selected_items()
         if not sel:
             self.var_selected_info.set(i18n.t("selected_none"))
         elif len(sel) == 1:
-            vals = self.tree.item(sel[0], "values")
-            self.var_selected_info.set(i18n.t("selected_one", serial=vals[0]))
+            self.var_selected_info.set(i18n.t("selected_one", serial=self.store.serial(sel[0])))
         else:
             self.var_selected_info.set(i18n.t("selected_many", n=len(sel)))
         self.update_title()
 
     # ---------- Model <-> View ----------
-    def refresh_tree(self):
-        self.tree.delete(*self.tree.get_children())
-        for it in self.view_items:
-            self.tree.insert("", "end", values=(it["serial"], it["category"], it.get("comment","")))
-
+    def _track(self, ids):
+        """Nouveaux ids du store : trigrammes à calculer (thread Tk)."""
+        self.search.add(ids)
+        self._schedule_search_index()
+        return ids
+
+    def _untrack(self, ids):
+        """Ids retirés (ou serial remplacé) : traces dans l'index, reconstruit par tranches si trop nombreuses."""
+        self.search.remove(ids)
+        self._schedule_search_index()
+
+    def _schedule_search_index(self):
+        """Trigrammes des nouveaux items calculés par tranches entre deux événements Tk."""
+        if self._index_after is not None or not self.search.pending:
+            return
+        def step():
+            self._index_after = None
+            if self.search.index_pending(SEARCH_INDEX_CHUNK):
+                self._index_after = self.after(1, step)
+        self._index_after = self.after(1, step)
+
+    def _set_item(self, iid, comment, category):
+        """Commentaire + catégorie d'un item : store, index de recherche, ligne affichée."""
+        self.store.set_comment(iid, comment)
+        self.store.set_category(iid, category)
+        self.search.update(iid)
+        self._schedule_search_index()
+        self.vt.update_row(iid)
+
+    def _insert_items(self, chunk, dedupe=False):
+        """
+        Ajoute chunk (dicts {"serial","comment","category"}) au store. Avec dedupe, un serial
+        déjà présent n'est pas ajouté (même règle que deduplicate_items : s'il apporte un
+        commentaire et que l'existant n'en a pas, le commentaire passe sur l'existant).
+        Renvoie le nb d'ignorés.
+        """
+        store = self.store
+        fresh = array("I")
+        skipped = 0
+        for it in chunk:
+            if dedupe:
+                kept = store.first(it["serial"])   # indexé dès l'ajout : vaut aussi pour un doublon dans chunk
+                if kept is not None:
+                    if (it.get("comment") or "").strip() and not store.comment(kept).strip():
+                        self._set_item(kept, it["comment"], it["category"])
+                    skipped += 1
+                    continue
+            fresh.append(store.append(it["serial"], it.get("comment") or "", it["category"]))
+        self._track(fresh)
+        return skipped
+
+    def _set_view(self, ids, sorted_ids=True):
+        """Nouvelle vue (array d'ids) ; sorted_ids : dans l'ordre de la liste."""
+        self.view = ids
+        self._view_sorted = sorted_ids
+        self._view_pos = None
+
+    @timed()
+    def refresh_tree(self, keep_position=False, keep_selection=False):
+        self.vt.set_rows(self.view, keep_position=keep_position, keep_selection=keep_selection)
+
+    @timed()
     def apply_filters(self):
         cat_label = self.var_cat.get()
         if cat_label.lower() in ("tous",):
@@ -628,52 +892,93 @@ class App(tb.Window):
             cat = cat_label
 
         q = self.var_query.get().strip().lower()
-        base = list(self.items)
+        category = has_comment = None
 
         if cat and cat != "All":
             if cat in (i18n.t("with_comment"),):
-                base = [it for it in base if (it.get("comment") or "").strip()]
+                has_comment = True
             elif cat in (i18n.t("without_comment"),):
-                base = [it for it in base if not (it.get("comment") or "").strip()]
+                has_comment = False
             else:
-                base = [it for it in base if it["category"] == cat]
+                category = cat
 
-        if q:
-            base = [it for it in base if (q in it["serial"].lower() or q in (it.get("comment","").lower()))]
-
-        self.view_items = base
+        ids = self.search.search(category=category, has_comment=has_comment, query=q)
+        if self.sort_keys:   # tirée de l'ordre global en cache, sans nouveau tri
+            self._set_view(self.store.order(ids, self.sort_keys, self.sort_reverse), sorted_ids=False)
+        else:
+            self._set_view(array("I", self.store.ids) if ids is None else ids)
         self.refresh_tree()
         # self.update_title()  # active si tu veux compter la vue plutôt que la base
 
+    def _schedule_filter(self):
+        """Filtre à la frappe : un seul apply_filters une fois la saisie posée."""
+        if self._filter_after is not None:
+            self.after_cancel(self._filter_after)
+        def run():
+            self._filter_after = None
+            self.apply_filters()
+        self._filter_after = self.after(FILTER_DEBOUNCE_MS, run)
+
     def reset_filters(self):
         self.var_cat.set(i18n.t("all"))
         self.var_query.set("")
-        self.view_items = list(self.items)
+        if self._filter_after is not None:
+            self.after_cancel(self._filter_after)
+            self._filter_after = None
+        self.sort_keys = ()
+        self.sort_reverse = False
+        self._update_sort_headings()
+        self._set_view(array("I", self.store.ids))
         self.refresh_tree()
 
-    def sort_by(self, key):
-        reverse = not self.sort_state.get(key, True)
-        self.view_items.sort(key=lambda it: (it.get(key) or "").lower(), reverse=reverse)
-        self.sort_state[key] = reverse
-        self.refresh_tree()
+    def _note_sort_modifier(self, event):
+        self._sort_add = bool(event.state & 0x0001)   # Shift
 
-    def selected_indices_in_view(self):
-        sel = []
-        for iid in self.tree.selection():
-            vals = self.tree.item(iid, "values")
-            for idx, it in enumerate(self.view_items):
-                if (it["serial"], it["category"], it.get("comment","")) == (vals[0], vals[1], vals[2]):
-                    sel.append(idx)
-                    break
-        return sorted(set(sel), reverse=True)
+    @timed()
+    def sort_by(self, key):
+        """
+        Clic : tri sur key (re-clic : sens inversé). Maj+clic : key devient la clé suivante
+        (déjà présente : sens inversé). Égalités dans l'ordre de la liste.
+        """
+        add, self._sort_add = self._sort_add, False
+        if (self.sort_keys == (key,)) or (add and key in self.sort_keys):
+            self.sort_reverse = not self.sort_reverse
+        elif add:
+            self.sort_keys += (key,)
+        else:
+            self.sort_keys, self.sort_reverse = (key,), False
+        self._update_sort_headings()
+        ids = None if len(self.view) == len(self.store) else self.view   # vue complète : ordre global
+        self._set_view(self.store.order(ids, self.sort_keys, self.sort_reverse), sorted_ids=False)
+        self.refresh_tree(keep_selection=True)   # mêmes items : les ids sélectionnés restent valides
+
+    def _update_sort_headings(self):
+        """Libellés des en-têtes : flèche du sens, rang de la clé si tri multi-colonnes."""
+        arrow = " ▼" if self.sort_reverse else " ▲"
+        for col, label in (("serial", "serial_col"), ("category", "category_col"), ("comment", "comment_col")):
+            text = i18n.t(label)
+            if col in self.sort_keys:
+                text += arrow
+                if len(self.sort_keys) > 1:
+                    text += str(self.sort_keys.index(col) + 1)
+            self.tree.heading(col, text=text)
+
+    def selected_items(self):
+        """Ids sélectionnés (y compris hors de la fenêtre insérée), vivants, dans l'ordre de la vue."""
+        store = self.store
+        ids = [i for i in map(int, self.vt.selected) if store.alive(i)]
+        if self._view_sorted or len(ids) < 2:
+            return sorted(ids)
+        if self._view_pos is None:
+            pos = self._view_pos = array("i", [-1]) * len(store.serials)
+            for p, i in enumerate(self.view):
+                pos[i] = p
+        pos = self._view_pos
+        return sorted(ids, key=lambda i: pos[i] if i < len(pos) else -1)
 
     # ---------- Copie serials ----------
     def copy_selected_serials(self, event=None):
-        serials = []
-        for iid in self.tree.selection():
-            vals = self.tree.item(iid, "values")
-            if vals:
-                serials.append(vals[0])
+        serials = [self.store.serial(i) for i in self.selected_items()]
         if not serials:
             return
         text = "\n".join(serials)
@@ -687,9 +992,8 @@ class App(tb.Window):
     def _tree_focus_row_under_mouse(self, event):
         row_id = self.tree.identify_row(event.y)
         if row_id:
-            if row_id not in self.tree.selection():
-                self.tree.selection_set(row_id)
-                self.tree.focus(row_id)
+            if row_id not in self.vt.selected:
+                self.vt.select_only(row_id)
             self.on_tree_select(None)
             return True
         return False
@@ -703,14 +1007,14 @@ class App(tb.Window):
 
     # ---------- Sélection : pré-remplir commentaire + label ----------
     def on_tree_select(self, event=None):
-        sel_iids = self.tree.selection()
-        if not sel_iids:
+        self.vt.sync_selection()
+        rows = self.selected_items()
+        if not rows:
             self.var_selected_info.set(i18n.t("selected_none"))
             return
 
-        rows = [self.tree.item(iid, "values") for iid in sel_iids]
-        serials = [r[0] for r in rows]
-        comments = [r[2] for r in rows]
+        serials = [self.store.serial(i) for i in rows]
+        comments = [self.store.comment(i) for i in rows]
 
         if len(rows) == 1:
             self.var_selected_info.set(i18n.t("selected_one", serial=serials[0]))
@@ -726,80 +1030,373 @@ class App(tb.Window):
                 if only:
                     self.entry_comment.insert(0, only)
 
+    # ---------- Tâches de fond ----------
+    def start_work(self, job, on_chunk=None, on_done=None, on_error=None) -> bool:
+        """
+        Lance job sur le thread de travail ; refuse si une tâche tourne déjà.
+        Une exception du job est affichée, puis passée à on_error(e) s'il est donné.
+        """
+        after_error = on_error
+
+        def on_error(e):
+            messagebox.showerror(i18n.t("err"), str(e))
+            if after_error is not None:
+                after_error(e)
+        if TIMINGS.enabled:
+            # "App._ingest.<locals>.job" -> "_ingest (job)" : durée sur le thread de travail
+            owner = job.__qualname__.split(".<locals>")[0].rpartition(".")[2]
+            job = TIMINGS.wrap(f"{owner} (job)", job)
+        if not self.work.submit(job, on_chunk=on_chunk, on_done=on_done, on_error=on_error):
+            messagebox.showwarning(i18n.t("warn"), i18n.t("busy"))
+            return False
+        return True
+
+    def cancel_work(self):
+        self.work.cancel()
+        self.var_status.set(i18n.t("cancelling"))
+
+    def _on_work_progress(self, done, total):
+        self.progress.config(maximum=max(1, total), value=done)
+        if self._loading:
+            self.var_status.set(i18n.t("loading_n", n=total))
+        else:
+            self.var_status.set(i18n.t("progress_n", done=done, total=total))
+
+    def _on_work_state(self, busy):
+        state = "disabled" if busy else "normal"
+        for btn in (self.btn_add, self.btn_import, self.btn_merge, self.btn_export,
+                    self.btn_dedupe, self.btn_delete):
+            btn.config(state=state)
+        if decoder_available():
+            self.btn_dec_sel.config(state=state)
+            self.btn_patch_sel.config(state=state)
+        self.btn_cancel.config(state="normal" if busy and not self._loading else "disabled")
+        if busy:
+            self.progress.config(value=0)
+            self.var_status.set("")
+        else:
+            self.var_status.set(i18n.t("cancelled") if self.work.cancelled() else "")
+
+    def _schedule_refresh(self):
+        """Regroupe les rafraîchissements de la table pendant qu'une tâche envoie ses tranches."""
+        if self._refresh_pending:
+            return
+        self._refresh_pending = True
+        def run():
+            self._refresh_pending = False
+            self.apply_filters()
+            self.update_title()
+        self.after(300, run)
+
     # ---------- Actions ----------
+    @timed()
     def add_from_text(self):
         raw = self.txt_input.get("1.0", "end")
-        serials = extract_serials(raw)
-        if not serials:
-            messagebox.showwarning(i18n.t("warn"), i18n.t("no_serial_detected") + "\n" + i18n.t("paste_examples"))
-            return
-
-        auto = True if hasattr(self, "var_auto_decode") and self.var_auto_decode.get() else False
-        enriched = 0
-
-        for code in serials:
-            it = {"serial": code, "comment": "", "category": detect_category(code)}
-            if auto:
-                if try_decode_and_enrich(it):
-                    enriched += 1
-            self.items.append(it)
-
-        self.apply_filters()
-        self.update_title()
-        msg = i18n.t("added_n", n=len(serials))
-        if enriched:
-            msg += "\n" + i18n.t("decrypt_done", n=enriched)
-        messagebox.showinfo(i18n.t("ok"), msg)
+        fh = io.StringIO(raw)
+        self._ingest(fh, len(raw))
 
+    @timed()
     def import_txt(self):
+        """Import direct dans la liste, lu par blocs (sans passer par la zone de texte)."""
         path = filedialog.askopenfilename(title=i18n.t("import_txt"),
                                           filetypes=[("Text","*.txt"),("All files","*.*")])
         if not path:
             return
         try:
-            content = Path(path).read_text(encoding="utf-8", errors="ignore")
+            fh = open(path, "rb")
+            size = os.fstat(fh.fileno()).st_size
         except Exception as e:
             messagebox.showerror(i18n.t("err"), f"{i18n.t('cant_read_file')} {e}")
             return
-        self.txt_input.delete("1.0","end")
-        self.txt_input.insert("1.0", content)
+        self._ingest(fh, size)
 
+    def _ingest(self, fh, total):
+        """
+        Ajoute les serials de fh (voir iter_text_items) par tranches de JOB_CHUNK sur le thread
+        de travail ; avancement = position dans fh sur total. fh est fermé à la fin du job.
+        """
+        auto = True if hasattr(self, "var_auto_decode") and self.var_auto_decode.get() else False
+        mod = load_decoder() if auto else None   # une résolution (mtime) par lot, pas par serial
+        if auto and not bank_core.has_external_decoder:
+            self._sync_decoder_buttons()   # premier import raté
+        dedupe = self.var_dedupe_on_add.get()
+        skipped = 0
+
+        def job(work):
+            added = enriched = 0
+            decode = mod is not None and bank_core.has_external_decoder
+            entries = iter_text_items(iter_file_lines(fh))
+
+            def flush(chunk):
+                nonlocal added, enriched
+                if decode:
+                    decoded = iter_enrich_serials([it["serial"] for it in chunk], mod)
+                    try:
+                        enriched += sum(1 for it, summ in zip(chunk, decoded) if apply_decoded(it, summ))
+                    finally:
+                        decoded.close()
+                added += len(chunk)
+                work.report(fh.tell(), total, chunk)
+
+            try:
+                chunk = []
+                for it in entries:
+                    chunk.append(it)
+                    if len(chunk) >= JOB_CHUNK:
+                        flush(chunk)
+                        chunk = []
+                        if work.cancelled():
+                            break
+                else:
+                    if chunk:
+                        flush(chunk)
+            finally:
+                fh.close()
+            return added, enriched
+
+        def on_chunk(chunk):
+            nonlocal skipped
+            skipped += self._insert_items(chunk, dedupe=dedupe)
+            self._schedule_refresh()
+
+        def on_done(result, cancelled):
+            added, enriched = result
+            self.apply_filters()
+            self.update_title()
+            if not added and not cancelled:
+                messagebox.showwarning(i18n.t("warn"), i18n.t("no_serial_detected") + "\n" + i18n.t("paste_examples"))
+                return
+            msg = i18n.t("added_n", n=added - skipped)
+            if skipped:
+                msg += "\n" + i18n.t("dedupe_skipped", n=skipped)
+            if enriched:
+                msg += "\n" + i18n.t("decrypt_done", n=enriched) + self._decode_cache_note()
+            messagebox.showinfo(i18n.t("ok"), msg)
+
+        if not self.start_work(job, on_chunk=on_chunk, on_done=on_done):
+            fh.close()
+
+    @timed()
     def remove_selected(self):
-        idxs_in_view = self.selected_indices_in_view()
-        if not idxs_in_view:
+        ids = {int(iid) for iid in self.vt.selected}
+        if not ids:
             return
-        to_remove = [self.view_items[i] for i in idxs_in_view]
-        new_items = []
-        for it in self.items:
-            if it not in to_remove:
-                new_items.append(it)
-        self.items = new_items
-        self.apply_filters()
+        self._untrack(ids)
+        # un seul passage sur des entiers (store.ids puis la vue)
+        self.store.remove(ids)
+        self._set_view(array("I", (i for i in self.view if i not in ids)), self._view_sorted)
+        self.refresh_tree(keep_position=True)
+        self.on_tree_select()
         self.update_title()
 
     def add_comment_to_selected(self):
         comment = self.entry_comment.get().strip()
-        idxs_in_view = self.selected_indices_in_view()
-        if not idxs_in_view:
+        sel = self.selected_items()
+        if not sel:
             messagebox.showwarning(i18n.t("warn"), i18n.t("no_selection"))
             return
-        for i in idxs_in_view:
-            self.view_items[i]["comment"] = comment
-        self.refresh_tree()
+        for iid in sel:
+            self.store.set_comment(iid, comment)
+            self.search.update(iid)
+            self.vt.update_row(iid)
+        self._schedule_search_index()
         messagebox.showinfo(i18n.t("ok"), i18n.t("comment_apply_btn"))
 
+    @timed()
     def decrypt_selection_fill_comments(self):
-        sel_idxs = self.selected_indices_in_view()
-        if not sel_idxs:
+        targets = self.selected_items()
+        if not targets:
             return
+        mod = load_decoder()
+        if not (mod and bank_core.has_external_decoder):
+            self._sync_decoder_buttons()   # premier import raté
+            return
+        serials = [self.store.serial(i) for i in targets]   # lus côté Tk
         enriched = 0
-        for i in sel_idxs:
-            it = self.view_items[i]
-            if try_decode_and_enrich(it):
-                enriched += 1
-        self.refresh_tree()
-        messagebox.showinfo(i18n.t("info"), i18n.t("decrypt_done", n=enriched))
 
+        def job(work):
+            # le thread de travail ne fait que décoder ; les items sont modifiés côté Tk (on_chunk)
+            total = len(targets)
+            decoded = iter_enrich_serials(serials, mod)
+            try:
+                for start in range(0, total, JOB_CHUNK):
+                    if work.cancelled():
+                        break
+                    part = targets[start:start + JOB_CHUNK]
+                    work.report(start + len(part), total, [(iid, next(decoded, None)) for iid in part])
+            finally:
+                decoded.close()
+
+        def on_chunk(pairs):
+            nonlocal enriched
+            for iid, dec in pairs:
+                if not self.store.alive(iid):   # retiré entre-temps
+                    continue
+                it = self.store.item(iid)
+                if apply_decoded(it, dec):
+                    enriched += 1
+                    self._set_item(iid, it["comment"], it["category"])
+
+        def on_done(result, cancelled):
+            messagebox.showinfo(i18n.t("info"), i18n.t("decrypt_done", n=enriched) + self._decode_cache_note())
+
+        self.start_work(job, on_chunk=on_chunk, on_done=on_done)
+
+    def patch_selection(self):
+        """Même stat (niveau, rareté...) écrite dans tous les serials sélectionnés (main.iter_patch_serials)."""
+        targets = self.selected_items()
+        if not targets:
+            messagebox.showwarning(i18n.t("warn"), i18n.t("no_selection"))
+            return
+        mod = load_decoder()
+        if not (mod and hasattr(mod, "iter_patch_serials")):
+            messagebox.showwarning(i18n.t("warn"), i18n.t("patch_unsupported"))
+            return
+
+        dlg = tk.Toplevel(self)
+        dlg.title(i18n.t("patch_title"))
+        dlg.transient(self)
+        dlg.resizable(False, False)
+        frm = ttk.Frame(dlg, padding=12)
+        frm.pack(fill="both", expand=True)
+
+        all_label = i18n.t("all")
+        var_field = tk.StringVar(value="level")
+        var_value = tk.StringVar(value="")
+        var_cat = tk.StringVar(value=all_label)
+        ttk.Label(frm, text=i18n.t("patch_field")).grid(row=0, column=0, sticky="w")
+        ttk.Combobox(frm, values=list(mod.STAT_FIELDS), textvariable=var_field, state="readonly",
+                     width=18).grid(row=0, column=1, sticky="ew", padx=6, pady=3)
+        ttk.Label(frm, text=i18n.t("patch_value")).grid(row=1, column=0, sticky="w")
+        ent = ttk.Spinbox(frm, from_=0, to=65535, textvariable=var_value, width=10)
+        ent.grid(row=1, column=1, sticky="w", padx=6, pady=3)
+        ttk.Label(frm, text=i18n.t("category") + ":").grid(row=2, column=0, sticky="w")
+        ttk.Combobox(frm, values=[all_label, "Weapons", "Equipment", "Equipment Alt", "Special Items", "Unknown"],
+                     textvariable=var_cat, state="readonly", width=18).grid(row=2, column=1, sticky="ew", padx=6, pady=3)
+
+        def ok(event=None):
+            try:
+                patch = mod.check_patch({var_field.get(): int(var_value.get())})
+            except ValueError as e:
+                messagebox.showerror(i18n.t("err"), f"{i18n.t('patch_bad_value')}\n{e}", parent=dlg)
+                return
+            cat = var_cat.get()
+            chosen = targets if cat == all_label else [i for i in targets if self.store.category(i) == cat]
+            dlg.destroy()
+            if chosen:
+                self._run_patch(chosen, mod, patch)
+
+        bar = ttk.Frame(frm)
+        bar.grid(row=3, column=0, columnspan=2, sticky="e", pady=(8,0))
+        ttk.Button(bar, text=i18n.t("ok"), command=ok).pack(side="right")
+        ttk.Button(bar, text=i18n.t("cancel"), command=dlg.destroy).pack(side="right", padx=6)
+        dlg.bind("<Return>", ok)
+        dlg.bind("<Escape>", lambda e: dlg.destroy())
+        ent.focus_set()
+        dlg.grab_set()
+
+    def _run_patch(self, targets, mod, patch):
+        serials = [self.store.serial(i) for i in targets]   # lus côté Tk
+        changed = 0
+
+        def job(work):
+            # serials calculés sur le thread de travail (pool de main.py) ; items modifiés côté Tk
+            total = len(targets)
+            patched = mod.iter_patch_serials(serials, patch)
+            try:
+                for start in range(0, total, JOB_CHUNK):
+                    if work.cancelled():
+                        break
+                    part = range(start, min(total, start + JOB_CHUNK))
+                    work.report(part.stop, total, [(targets[k], serials[k], next(patched)) for k in part])
+            finally:
+                patched.close()
+
+        def on_chunk(pairs):
+            nonlocal changed
+            changed += self._replace_serials([(iid, new) for iid, old, new in pairs if new != old])
+
+        def on_done(result, cancelled):
+            self.on_tree_select()
+            messagebox.showinfo(i18n.t("info"), i18n.t("patch_done", n=changed))
+
+        self.start_work(job, on_chunk=on_chunk, on_done=on_done)
+
+    def _replace_serials(self, pairs):
+        """Nouveau serial pour des ids du store : index serial, index de recherche et lignes affichées."""
+        pairs = [(iid, ser) for iid, ser in pairs if self.store.alive(iid)]   # retirés entre-temps
+        ids = [iid for iid, _ in pairs]
+        self._untrack(ids)
+        for iid, ser in pairs:
+            self.store.set_serial(iid, ser)
+        self._track(ids)
+        for iid in ids:
+            self.vt.update_row(iid)
+        return len(ids)
+
+    def show_diagnostics(self):
+        """Fenêtre Diagnostic (F12) : durées par action, cache de décodage, capture cProfile."""
+        if self._diag is not None and self._diag.winfo_exists():
+            self._diag.lift()
+            return
+        dlg = self._diag = tk.Toplevel(self)
+        dlg.title(i18n.t("diag_title"))
+        dlg.geometry("760x420")
+        txt = tk.Text(dlg, wrap="none", font=("TkFixedFont", 9))
+        txt.pack(fill="both", expand=True, padx=8, pady=(8,4))
+
+        def refresh():
+            txt.config(state="normal")
+            txt.delete("1.0", "end")
+            txt.insert("1.0", TIMINGS.report())
+            txt.config(state="disabled")
+
+        def reset():
+            TIMINGS.reset()
+            refresh()
+
+        def profile_next():
+            TIMINGS.profile_next = "*"
+            self.var_status.set(i18n.t("diag_profile_armed"))
+
+        def save():
+            try:
+                path = TIMINGS.save()
+            except Exception as e:
+                messagebox.showerror(i18n.t("err"), f"{i18n.t('write_failed')} {e}", parent=dlg)
+                return
+            messagebox.showinfo(i18n.t("ok"), f"{i18n.t('export_written')}\n{path}", parent=dlg)
+
+        bar = ttk.Frame(dlg)
+        bar.pack(fill="x", padx=8, pady=(0,8))
+        ttk.Button(bar, text=i18n.t("diag_refresh"), command=refresh).pack(side="left")
+        ttk.Button(bar, text=i18n.t("diag_reset"), command=reset).pack(side="left", padx=6)
+        btn_prof = ttk.Button(bar, text=i18n.t("diag_profile_next"), command=profile_next)
+        btn_prof.pack(side="left")
+        ttk.Button(bar, text=i18n.t("diag_save"), command=save).pack(side="right")
+        if not TIMINGS.enabled:
+            btn_prof.config(state="disabled")
+        refresh()
+
+    def _decode_cache_note(self) -> str:
+        cache = bank_core._decode_cache   # None tant qu'aucun décodage complet n'a ouvert le cache
+        if cache is None:
+            return ""
+        return "\n" + i18n.t("cache_stats", hits=cache.hits, misses=cache.misses)
+
+    def _sync_decoder_buttons(self):
+        state = "normal" if decoder_available() else "disabled"
+        self.btn_dec_sel.config(state=state)
+        self.btn_patch_sel.config(state=state)
+        self.chk_auto_decode.config(state=state)
+
+    def reload_decoder(self):
+        """Rechargement explicite de main.py (sinon seulement si son mtime change)."""
+        load_decoder(force_reload=True)
+        self._sync_decoder_buttons()
+        messagebox.showinfo(i18n.t("info"), i18n.t("decoder_reloaded", **DECODER_STATS))
+
+    @timed()
     def deduplicate_items(self):
         """
         Règles:
@@ -807,37 +1404,24 @@ class App(tb.Window):
         - Deux avec commentaire -> garder le premier rencontré
         - Avec commentaire vs sans -> garder celui AVEC commentaire
         """
-        seen = {}
-        removed = 0
-        result = []
-        for it in self.items:
-            ser = it["serial"]
-            if ser not in seen:
-                seen[ser] = it
-                result.append(it)
-            else:
-                kept = seen[ser]
-                has_comment_kept = bool((kept.get("comment") or "").strip())
-                has_comment_new = bool((it.get("comment") or "").strip())
-                if has_comment_new and not has_comment_kept:
-                    idx = result.index(kept)
-                    result[idx] = it
-                    seen[ser] = it
-                    removed += 1
-                else:
-                    removed += 1
-        self.items = result
+        store = self.store
+        dropped, enriched = store.dedupe()
+        for iid in enriched:
+            self.search.update(iid)
+        self._untrack(dropped)
+        removed = len(dropped)
         self.apply_filters()
         self.update_title()
-        messagebox.showinfo(i18n.t("info"), i18n.t("dedupe_removed", removed=removed, total=len(self.items)))
+        messagebox.showinfo(i18n.t("info"), i18n.t("dedupe_removed", removed=removed, total=len(store)))
 
     # ---------- Export / Merge ----------
     def current_view_for_export(self):
-        return list(self.view_items)
+        """Items de la vue (dicts construits à la lecture, sur une copie des colonnes)."""
+        return self.store.frozen().iter_items(array("I", self.view))
 
+    @timed()
     def export_to_file(self):
-        data = self.current_view_for_export()
-        if not data:
+        if not self.view:
             messagebox.showwarning(i18n.t("warn"), i18n.t("nothing_to_export"))
             return
         path_str = filedialog.asksaveasfilename(
@@ -848,53 +1432,119 @@ class App(tb.Window):
         )
         if not path_str:
             return
-        try:
-            write_yaml_manual(
-                Path(path_str),
-                data,
-                state_flags=self.var_sf.get(),
-                with_comments=True,
-                slot_indent=self.var_slot_indent.get(),
-                inner_indent=self.var_inner_indent.get(),
-            )
-        except Exception as e:
-            messagebox.showerror(i18n.t("err"), f"{i18n.t('write_failed')} {e}")
-            return
-        messagebox.showinfo(i18n.t("ok"), f"{i18n.t('export_written')} {path_str}")
+        data = self.current_view_for_export()
+        opts = dict(state_flags=self.var_sf.get(), with_comments=True,
+                    slot_indent=self.var_slot_indent.get(), inner_indent=self.var_inner_indent.get())
+
+        def job(work):
+            if work.cancelled():
+                return False
+            work.report(0, 1)
+            write_yaml_manual(Path(path_str), data, **opts)
+            work.report(1, 1)
+            return True
 
-    def merge_to_bank(self):
-        existing_entries, max_slot, existing_serials = parse_bank_yaml_simple(BANK_PATH)
-
-        merged_items = []
-        for idx in sorted(existing_entries.keys()):
-            ser = existing_entries[idx]["serial"]
-            com = existing_entries[idx].get("comment", "")
-            merged_items.append({"serial": ser, "comment": com, "category": detect_category(ser)})
-
-        new_added = 0
-        for it in self.items:
-            ser = it["serial"]
-            if ser in existing_serials:
-                continue  # commentaire seul ne modifie pas l'existant
-            merged_items.append({"serial": ser, "comment": (it.get("comment") or ""), "category": detect_category(ser)})
-            existing_serials.add(ser)
-            new_added += 1
+        def on_done(written, cancelled):
+            if written:
+                messagebox.showinfo(i18n.t("ok"), f"{i18n.t('export_written')} {path_str}")
 
-        try:
-            write_yaml_manual(
-                BANK_PATH,
-                merged_items,
-                state_flags=self.var_sf.get(),
-                with_comments=True,
-                slot_indent=self.var_slot_indent.get(),
-                inner_indent=self.var_inner_indent.get(),
-            )
-        except Exception as e:
-            messagebox.showerror(i18n.t("err"), f"{i18n.t('write_failed')} {e}")
+        self.start_work(job, on_done=on_done)
+
+    @timed()
+    def merge_to_bank(self):
+        if self.bank.changed_signature() is not None:
+            # bank.yaml modifié ailleurs : la liste d'abord remise à jour, puis la fusion
+            self.reload_bank_changes(then=self.merge_to_bank)
+            return
+        items = self.store.frozen().iter_items()   # instantané : la fusion tourne hors du thread Tk
+        opts = dict(state_flags=self.var_sf.get(),
+                    slot_indent=self.var_slot_indent.get(), inner_indent=self.var_inner_indent.get())
+
+        def job(work):
+            work.report(0, 1)
+            res = self.bank.merge(items, cancelled=work.cancelled, **opts)
+            work.report(1, 1)
+            return res
+
+        def on_done(res, cancelled):
+            if res is None:
+                return
+            new_added, mode = res
+            msg = f"{i18n.t('merge_done')} {BANK_PATH}\n{i18n.t('merge_new_added')} {new_added}"
+            if mode == "append":
+                msg += "\n" + i18n.t("merge_appended")
+            messagebox.showinfo(i18n.t("ok"), msg)
+
+        self.start_work(job, on_done=on_done)
+
+    # ---------- Surveillance de bank.yaml ----------
+    def _watch_bank(self):
+        """
+        Tour de surveillance (after) : stat() de bank.yaml ; un changement est relu quand taille
+        et mtime n'ont plus bougé d'un tour à l'autre (écriture terminée) et qu'aucune tâche ne tourne.
+        """
+        self.after(WATCH_POLL_MS, self._watch_bank)
+        if not self.var_watch.get() or self.work.busy:
+            self._watch_seen = None
+            return
+        signature = self.bank.changed_signature()
+        if signature is None or signature != self._watch_seen:
+            self._watch_seen = signature
             return
+        self._watch_seen = None
+        self.reload_bank_changes()
 
-        messagebox.showinfo(i18n.t("ok"), f"{i18n.t('merge_done')} {BANK_PATH}\n{i18n.t('merge_new_added')} {new_added}")
+    def reload_bank_changes(self, then=None):
+        """Relit bank.yaml (la fin seulement s'il a juste grandi) sur le thread de travail et applique le diff."""
+        def job(work):
+            return self.bank.reload_changes()
+
+        def on_done(diff, cancelled):
+            if diff:
+                self._apply_bank_diff(diff)
+            if then is not None:
+                then()
+
+        self.start_work(job, on_done=on_done)
+
+    @timed()
+    def _apply_bank_diff(self, diff):
+        """
+        Slots ajoutés -> items en fin de liste ; slots retirés -> un item de ce serial retiré (le
+        premier, d'ordinaire celui venu du bank) ; commentaire changé -> reporté sur cet item.
+        """
+        store = self.store
+        taken = set()
+
+        def pick(serial):
+            return next((iid for iid in store.group(serial) if iid not in taken), None)
+
+        added = [e for _, e in diff.added]
+        removed = [e for _, e in diff.removed]
+        for _, old, new in diff.changed:
+            if old["serial"] != new["serial"]:
+                removed.append(old)
+                added.append(new)
+            else:
+                iid = pick(new["serial"])
+                if iid is not None:
+                    self._set_item(iid, new.get("comment", ""), store.category(iid))
+        gone = []
+        for entry in removed:
+            iid = pick(entry["serial"])
+            if iid is not None:
+                taken.add(iid)
+                gone.append(iid)
+        self._untrack(gone)
+        store.remove(gone)
+        self.vt.selected -= {str(iid) for iid in gone}
+        self._track(array("I", (store.append(e["serial"], e.get("comment", "")) for e in added)))
+        self.apply_filters()
+        self.update_title()
+        self.var_status.set(i18n.t("bank_reloaded", added=len(added), removed=len(gone)))
 
 if __name__ == "__main__":
+    import multiprocessing
+    multiprocessing.freeze_support()   # exe PyInstaller : workers de main.decode_many
     app = App()
     app.mainloop()
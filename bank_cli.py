@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Bank maintenance from the command line, without the GUI (nothing here imports tkinter).
+
+    python bank_cli.py import [INPUT ...] [-o OUT]
+    python bank_cli.py dedupe [INPUT ...] [-o OUT]
+    python bank_cli.py enrich [INPUT ...] [-o OUT]
+    python bank_cli.py export [INPUT ...] [-o OUT] [--category CAT] [--with-comment | --without-comment] [--contains TEXT]
+    python bank_cli.py merge  [INPUT ...] [--bank PATH]
+
+INPUT is a text dump (@U... lines and/or YAML `serial:` blocks) or '-' for stdin,
+the default. import, dedupe, enrich and export write YAML slots to OUT, or to
+stdout; comments found in YAML inputs are kept. merge adds the serials that are
+not in the bank yet to bank.yaml (next to the app unless --bank is given).
+
+Exit status: 0 ok, 1 no serial found (or nothing left to export), 2 usage error,
+3 read/write error, 4 decoder (main.py) unavailable for enrich.
+"""
+import argparse
+import os
+import sys
+from pathlib import Path
+
+import bank_core
+
+EXIT_OK, EXIT_EMPTY, EXIT_USAGE, EXIT_IO, EXIT_NO_DECODER = 0, 1, 2, 3, 4
+
+CATEGORIES = ["Weapons", "Equipment", "Equipment Alt", "Special Items", "Unknown"]
+
+
+def read_items(paths):
+    """Items of every input, streamed line by line (one pass, no whole-file read)."""
+    items = []
+    for path in paths or ["-"]:
+        if path == "-":
+            items.extend(bank_core.iter_text_items(bank_core.iter_file_lines(sys.stdin.buffer)))
+            continue
+        with open(path, "rb") as fh:
+            items.extend(bank_core.iter_text_items(bank_core.iter_file_lines(fh)))
+    return items
+
+
+def write_items(items, args):
+    opts = dict(state_flags=args.state_flags, with_comments=not args.no_comments,
+                slot_indent=args.slot_indent, inner_indent=args.inner_indent)
+    if args.output and args.output != "-":
+        bank_core.write_yaml_manual(Path(args.output), items, **opts)
+        return
+    out = sys.stdout
+    for line in bank_core.yaml_slot_lines(items, 0, **opts):
+        out.write(line + "\n")
+    out.flush()
+
+
+def note(msg):
+    print(msg, file=sys.stderr)
+
+
+def cmd_import(args, items):
+    write_items(items, args)
+    note(f"{len(items)} serial(s)")
+    return EXIT_OK
+
+
+def cmd_dedupe(args, items):
+    kept, removed = bank_core.dedupe_items(items)
+    write_items(kept, args)
+    note(f"{removed} duplicate(s) removed, {len(kept)} unique")
+    return EXIT_OK
+
+
+def cmd_enrich(args, items):
+    mod = bank_core.load_decoder()
+    if not (mod and bank_core.has_external_decoder):
+        note("decoder (main.py) not available")
+        return EXIT_NO_DECODER
+    enriched = bank_core.decode_and_enrich_many(items, mod)
+    write_items(items, args)
+    note(f"{enriched} item(s) enriched")
+    return EXIT_OK
+
+
+def cmd_export(args, items):
+    has_comment = True if args.with_comment else False if args.without_comment else None
+    view = bank_core.filter_items(items, category=args.category, has_comment=has_comment, query=args.contains)
+    if not view:
+        note("nothing to export")
+        return EXIT_EMPTY
+    write_items(view, args)
+    note(f"{len(view)} serial(s) exported")
+    return EXIT_OK
+
+
+def cmd_merge(args, items):
+    bank = Path(args.bank) if args.bank else bank_core.BANK_PATH
+    bank_file = bank_core.BankFile(bank)
+    new_added, mode = bank_file.merge(
+        items, state_flags=args.state_flags, slot_indent=args.slot_indent, inner_indent=args.inner_indent)
+    if bank_file.journal_result == "replayed":
+        note(f"{bank}: an interrupted merge was completed from its journal")
+    elif bank_file.journal_result == "discarded":
+        note(f"warning: {bank}: journal of an interrupted merge discarded (incomplete, or bank changed since)")
+    note(f"{bank}: {new_added} new serial(s) ({mode})")
+    return EXIT_OK
+
+
+def build_parser():
+    ap = argparse.ArgumentParser(prog="bank_cli.py", description=__doc__.strip().splitlines()[0])
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("inputs", nargs="*", metavar="INPUT", help="text dump, or - for stdin (default)")
+    common.add_argument("--state-flags", type=int, default=bank_core.STATE_FLAGS_DEFAULT)
+    common.add_argument("--slot-indent", type=int, default=0)
+    common.add_argument("--inner-indent", type=int, default=2)
+
+    output = argparse.ArgumentParser(add_help=False)
+    output.add_argument("-o", "--output", help="YAML file to write (default: stdout)")
+    output.add_argument("--no-comments", action="store_true", help="write serials without their comments")
+
+    sub.add_parser("import", parents=[common, output], help="extract serials into YAML slots").set_defaults(run=cmd_import)
+    sub.add_parser("dedupe", parents=[common, output], help="drop duplicate serials, keeping comments").set_defaults(run=cmd_dedupe)
+    sub.add_parser("enrich", parents=[common, output], help="fill comments and categories via main.py").set_defaults(run=cmd_enrich)
+
+    p = sub.add_parser("export", parents=[common, output], help="write the filtered view")
+    p.add_argument("--category", choices=CATEGORIES)
+    group = p.add_mutually_exclusive_group()
+    group.add_argument("--with-comment", action="store_true")
+    group.add_argument("--without-comment", action="store_true")
+    p.add_argument("--contains", default="", help="substring of the serial or the comment (case-insensitive)")
+    p.set_defaults(run=cmd_export)
+
+    p = sub.add_parser("merge", parents=[common], help="add new serials to bank.yaml")
+    p.add_argument("--bank", help=f"bank file (default: {bank_core.BANK_PATH})")
+    p.set_defaults(run=cmd_merge)
+    return ap
+
+
+def main_cli(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        items = read_items(args.inputs)
+        if not items:
+            note("no serial detected")
+            return EXIT_EMPTY
+        return args.run(args, items)
+    except BrokenPipeError:
+        # stdout closed early (e.g. piped into head): not an error
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return EXIT_OK
+    except OSError as e:
+        note(f"error: {e}")
+        return EXIT_IO
+    except KeyboardInterrupt:
+        return 130
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
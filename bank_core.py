@@ -0,0 +1,1763 @@
+# -*- coding: utf-8 -*-
+"""
+Cœur du Bank Builder sans interface : chemins et config, décodeur externe (main.py)
+et son cache, lecture / écriture de bank.yaml, extraction et enrichissement des serials.
+Pas d'import de tkinter ici : Bank_builder.pyw (fenêtre) et bank_cli.py (ligne de
+commande) s'appuient dessus. sqlite3 et hashlib ne sont importés qu'au premier usage
+(cache de décodage, empreintes de main.py et du journal de bank.yaml), pas au démarrage.
+"""
+
+import codecs
+import functools
+import json
+import mmap
+import os
+import re
+import shutil
+import struct
+import tempfile
+import sys
+from pathlib import Path
+import importlib
+import importlib.util
+import threading
+import time
+from array import array
+from collections import deque
+
+
+# ---------- Utils chemins (compatibles PyInstaller) ----------
+def resource_path(relpath: str | Path) -> Path:
+    """Chemin réel d'une ressource embarquée (--add-data) ou locale."""
+    base = Path(getattr(sys, "_MEIPASS", Path(__file__).resolve().parent))
+    return base / relpath
+
+def app_dir() -> Path:
+    """Dossier de l'exe si gelé, sinon dossier du script."""
+    if getattr(sys, "frozen", False):
+        return Path(sys.executable).resolve().parent
+    return Path(__file__).resolve().parent
+
+APP_DIR = app_dir()
+
+# ---------- Config ----------
+BANK_FILENAME = "bank.yaml"
+BANK_PATH = APP_DIR / BANK_FILENAME  # bank.yaml à côté de l'exe
+STATE_FLAGS_DEFAULT = 1
+BANK_BACKUPS = 3     # bank.yaml.bak1 (plus récente) .. bakN, tournées à chaque réécriture complète
+BANK_JOURNAL = True  # journal des ajouts en fin de bank.yaml, rejoué au démarrage après un crash
+BANK_SNAPSHOT = True # bank.yaml.snap : copie binaire (mmap) pour ouvrir un gros bank sans le re-parser
+
+# ----- (Optionnel) Kill switch du décodeur externe -----
+DISABLE_DECODER = False
+
+# ----- Cache disque des résultats du décodeur (à côté de bank.yaml) -----
+DISABLE_DECODE_CACHE = False
+DECODE_CACHE_PATH = APP_DIR / "bank.decode_cache.sqlite"
+DECODE_CACHE_MAX = 500_000   # entrées ; au-delà, éviction des moins récemment utilisées
+
+# ----- Mesures (diagnostic) -----
+TIMINGS_LOG = APP_DIR / "bank_builder_timings.log"
+STARTUP_LOG = APP_DIR / "bank_builder_startup.log"   # Bank_builder.pyw --startup-profile
+
+class Timings:
+    """
+    Durées par action : nb d'appels, total, p50 / p95 (sur les MAX_SAMPLES dernières).
+    Inactif, timed() et l'instrumentation du décodeur ne posent aucune enveloppe : coût nul.
+    Activé au lancement (Bank_builder.pyw --timings, ou BANK_BUILDER_TIMINGS=1).
+    profile_next : nom d'action (ou "*") dont le prochain appel passe sous cProfile.
+    """
+    MAX_SAMPLES = 2000
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.stats = {}      # nom -> [nb, total (s), deque des dernières durées]
+        self.profiles = {}   # nom -> texte pstats de la dernière capture
+        self.profile_next = None
+        self._lock = threading.Lock()
+
+    def record(self, name: str, secs: float):
+        with self._lock:
+            st = self.stats.get(name)
+            if st is None:
+                st = self.stats[name] = [0, 0.0, deque(maxlen=self.MAX_SAMPLES)]
+            st[0] += 1
+            st[1] += secs
+            st[2].append(secs)
+
+    def wrap(self, name: str, fn):
+        """fn chronométrée sous name (appelable depuis n'importe quel thread)."""
+        @functools.wraps(fn)
+        def timed_call(*args, **kwargs):
+            if self.profile_next in (name, "*"):
+                self.profile_next = None
+                return self._profile(name, fn, args, kwargs)
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.record(name, time.perf_counter() - t0)
+        return timed_call
+
+    def _profile(self, name, fn, args, kwargs):
+        import cProfile, io, pstats
+        prof = cProfile.Profile()
+        try:
+            prof.enable()
+        except ValueError:   # un autre profileur tourne déjà : simple mesure
+            prof = None
+        t0 = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self.record(name, time.perf_counter() - t0)
+            if prof is not None:
+                prof.disable()
+                out = io.StringIO()
+                pstats.Stats(prof, stream=out).sort_stats("cumulative").print_stats(30)
+                self.profiles[name] = out.getvalue()
+
+    def rows(self):
+        """(nom, nb, total, p50, p95) en secondes, par total décroissant."""
+        with self._lock:
+            snapshot = [(name, st[0], st[1], sorted(st[2])) for name, st in self.stats.items()]
+        out = []
+        for name, count, total, samples in snapshot:
+            n = len(samples)
+            out.append((name, count, total, samples[(n - 1) // 2], samples[max(0, -(-n * 95 // 100) - 1)]))
+        out.sort(key=lambda r: -r[2])
+        return out
+
+    def reset(self):
+        with self._lock:
+            self.stats.clear()
+            self.profiles.clear()
+
+    def report(self) -> str:
+        """Tableau des durées, taux de succès du cache de décodage, profils capturés."""
+        lines = []
+        if not self.enabled:
+            lines.append("Timings off (start with --timings or BANK_BUILDER_TIMINGS=1).")
+        else:
+            lines.append(f"{'action':<36}{'count':>8}{'total ms':>12}{'p50 ms':>10}{'p95 ms':>10}")
+            for name, count, total, p50, p95 in self.rows():
+                lines.append(f"{name:<36}{count:>8}{total * 1e3:>12.1f}{p50 * 1e3:>10.2f}{p95 * 1e3:>10.2f}")
+        cache = _decode_cache
+        if cache is not None:
+            asked = cache.hits + cache.misses
+            rate = f", {cache.hits / asked:.1%} hit rate" if asked else ""
+            lines.append(f"Decode cache: {cache.hits} hit(s), {cache.misses} miss(es){rate}")
+        lines.append(f"Decoder: {DECODER_STATS['loads']} load(s), {DECODER_STATS['reloads']} reload(s)")
+        for name, text in self.profiles.items():
+            lines += ["", f"cProfile: {name}", text.rstrip()]
+        return "\n".join(lines) + "\n"
+
+    def save(self, path: Path = None) -> Path:
+        """Ajoute report() horodaté au journal (TIMINGS_LOG par défaut)."""
+        path = Path(path or TIMINGS_LOG)
+        with open(path, "a", encoding="utf-8") as fh:
+            fh.write(f"=== {time.strftime('%Y-%m-%d %H:%M:%S')} ===\n{self.report()}\n")
+        return path
+
+TIMINGS = Timings(enabled=os.environ.get("BANK_BUILDER_TIMINGS", "") not in ("", "0"))
+
+def timed(name: str = None):
+    """Décorateur : mesure chaque appel si TIMINGS est actif à la définition, sinon fn telle quelle."""
+    def deco(fn):
+        return TIMINGS.wrap(name or fn.__name__, fn) if TIMINGS.enabled else fn
+    return deco
+
+def _instrument_decoder(mod):
+    """decode_item_serial / decode_batch de main.py chronométrés (appels dans ce processus)."""
+    for attr in ("decode_item_serial", "decode_batch"):
+        fn = getattr(mod, attr, None)
+        if fn is not None and not hasattr(fn, "__wrapped__"):
+            setattr(mod, attr, TIMINGS.wrap(attr, fn))
+
+# ----- Intégration du décodeur externe (main.py) avec reload -----
+ext_decoder = None
+has_external_decoder = False
+_decoder_mtime = None
+_decoder_version = None   # empreinte de main.py : invalide le cache disque
+# Compteurs : combien d'imports / de reloads de main.py depuis le lancement
+DECODER_STATS = {"loads": 0, "reloads": 0}
+
+def _decoder_source_mtime(mod):
+    """mtime du fichier source du décodeur (None si inconnu, ex. exe gelé)."""
+    try:
+        return Path(mod.__file__).stat().st_mtime
+    except Exception:
+        return None
+
+def _decoder_fingerprint(mod) -> str:
+    """DECODER_VERSION de main.py s'il existe, sinon sha1 de son source."""
+    version = getattr(mod, "DECODER_VERSION", None)
+    if version:
+        return str(version)
+    import hashlib
+    try:
+        return hashlib.sha1(Path(mod.__file__).read_bytes()).hexdigest()
+    except Exception:
+        return "unknown"
+
+def load_decoder(force_reload: bool = False):
+    """
+    Charge main.py une seule fois par session et expose has_external_decoder (désactivable).
+    Recharge seulement si force_reload=True (action utilisateur) ou si le mtime de main.py a changé.
+    """
+    global ext_decoder, has_external_decoder, _decoder_mtime, _decoder_version
+    if DISABLE_DECODER:
+        ext_decoder = None
+        has_external_decoder = False
+        return None
+    try:
+        if ext_decoder is None:
+            ext_decoder = importlib.import_module("main")   # main.py à côté (ou embarqué)
+            DECODER_STATS["loads"] += 1
+            _decoder_mtime = _decoder_source_mtime(ext_decoder)
+            _decoder_version = _decoder_fingerprint(ext_decoder)
+        else:
+            mtime = _decoder_source_mtime(ext_decoder)
+            if force_reload or mtime != _decoder_mtime:
+                importlib.reload(ext_decoder)               # hot-reload
+                DECODER_STATS["reloads"] += 1
+                _decoder_mtime = mtime
+                _decoder_version = _decoder_fingerprint(ext_decoder)
+        has_external_decoder = hasattr(ext_decoder, "decode_item_serial")
+        if TIMINGS.enabled:
+            _instrument_decoder(ext_decoder)
+    except Exception:
+        ext_decoder = None
+        has_external_decoder = False
+    return ext_decoder
+
+def decoder_available() -> bool:
+    """
+    main.py utilisable ? Déjà chargé : has_external_decoder. Sinon, seulement s'il est
+    trouvable (sans l'importer : l'import attend le premier décodage).
+    """
+    if DISABLE_DECODER:
+        return False
+    if ext_decoder is not None:
+        return has_external_decoder
+    try:
+        return importlib.util.find_spec("main") is not None
+    except (ImportError, ValueError):
+        return False
+
+def get_decoder():
+    """Décodeur déjà résolu (sans stat ni reload) ; le charge au premier appel."""
+    if ext_decoder is None:
+        return load_decoder()
+    return ext_decoder
+
+# map des catégories (clé en minuscules) -> libellés UI
+DECODER_CAT_MAP = {
+    "weapon": "Weapons",
+    "equipment": "Equipment",
+    "equipment_alt": "Equipment Alt",
+    "weapon_special": "Special Items",
+    "special": "Special Items",
+    "utility": "Special Items",
+    "consumable": "Special Items",
+    "decode_failed": "Unknown",
+    "unknown": "Unknown",
+}
+
+# serial[3] -> item_category du décodeur (copie de main.ITEM_CATEGORIES : le builder marche sans main.py).
+# detect_category passe par DECODER_CAT_MAP : même catégorie avant et après décodage.
+SERIAL_TYPE_CATEGORY = {
+    "r": "weapon", "e": "equipment", "d": "equipment_alt",
+    "w": "weapon_special", "u": "utility", "f": "consumable", "!": "special",
+}
+
+# ----- Résumés décodés + cache persistant -----
+SUMMARY_FIELDS = ("weapon_name", "item_category", "confidence",
+                  "primary_stat", "secondary_stat", "level", "rarity", "manufacturer", "item_class")
+_STAT_FIELDS = SUMMARY_FIELDS[3:]
+
+def decoded_summary(decoded):
+    """Ce que le builder garde d'un DecodedItem (dict sur SUMMARY_FIELDS), None si pas de résultat."""
+    if not decoded:
+        return None
+    summary = {k: getattr(decoded, k, None) for k in SUMMARY_FIELDS[:3]}
+    stats = getattr(decoded, "stats", None)
+    for k in _STAT_FIELDS:
+        summary[k] = getattr(stats, k, None)
+    return summary
+
+class DecodeCache:
+    """
+    Cache SQLite serial -> résumé décodé. Vidé si la version du décodeur change,
+    borné à max_entries (éviction LRU via un compteur d'usage), compteurs hits/misses.
+    Utilisable depuis le thread de travail (connexion partagée sous verrou).
+    """
+    BATCH = 500   # nb max de paramètres par requête IN (...)
+
+    def __init__(self, path: Path, version: str, max_entries: int = DECODE_CACHE_MAX):
+        import sqlite3
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        cols = ", ".join(SUMMARY_FIELDS)
+        self._db.execute(f"CREATE TABLE IF NOT EXISTS decoded (serial TEXT PRIMARY KEY, {cols}, used INTEGER)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS decoded_used ON decoded(used)")
+        self._tick = self._db.execute("SELECT COALESCE(MAX(used), 0) FROM decoded").fetchone()[0]
+        self.version = None
+        self.set_version(version)
+
+    def set_version(self, version: str):
+        """Change de version de décodeur : les entrées d'une autre version sont jetées."""
+        with self._lock:
+            row = self._db.execute("SELECT value FROM meta WHERE key='version'").fetchone()
+            if row is None or row[0] != version:
+                self._db.execute("DELETE FROM decoded")
+                self._db.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (version,))
+                self._db.commit()
+            self.version = version
+
+    def get_many(self, serials) -> dict:
+        """serial -> résumé pour les serials présents ; met à jour leur rang LRU."""
+        found = {}
+        serials = list(dict.fromkeys(serials))
+        with self._lock:
+            self._tick += 1
+            for start in range(0, len(serials), self.BATCH):
+                part = serials[start:start + self.BATCH]
+                marks = ",".join("?" * len(part))
+                rows = self._db.execute(
+                    f"SELECT serial, {', '.join(SUMMARY_FIELDS)} FROM decoded WHERE serial IN ({marks})", part)
+                for row in rows:
+                    found[row[0]] = dict(zip(SUMMARY_FIELDS, row[1:]))
+            if found:
+                self._db.executemany("UPDATE decoded SET used=? WHERE serial=?",
+                                     ((self._tick, s) for s in found))
+                self._db.commit()
+            self.hits += len(found)
+            self.misses += len(serials) - len(found)
+        return found
+
+    def put_many(self, summaries: dict):
+        """Enregistre serial -> résumé puis évince les plus anciens au-delà de max_entries."""
+        if not summaries:
+            return
+        with self._lock:
+            self._tick += 1
+            marks = ",".join("?" * (len(SUMMARY_FIELDS) + 2))
+            self._db.executemany(
+                f"INSERT OR REPLACE INTO decoded VALUES ({marks})",
+                ((s, *(summ.get(k) for k in SUMMARY_FIELDS), self._tick) for s, summ in summaries.items()))
+            excess = self._db.execute("SELECT COUNT(*) FROM decoded").fetchone()[0] - self.max_entries
+            if excess > 0:
+                self._db.execute(
+                    "DELETE FROM decoded WHERE serial IN (SELECT serial FROM decoded ORDER BY used LIMIT ?)",
+                    (excess,))
+            self._db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM decoded").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "entries": entries}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+_decode_cache = None
+
+def get_decode_cache():
+    """Cache ouvert à la demande, aligné sur la version courante du décodeur (None si désactivé/indispo)."""
+    global _decode_cache
+    if DISABLE_DECODE_CACHE or _decoder_version is None:
+        return None
+    try:
+        if _decode_cache is None:
+            _decode_cache = DecodeCache(DECODE_CACHE_PATH, _decoder_version)
+        elif _decode_cache.version != _decoder_version:
+            _decode_cache.set_version(_decoder_version)
+    except Exception:
+        _decode_cache = None
+    return _decode_cache
+
+# --------- Découpage des traitements ---------
+JOB_CHUNK = 2000   # taille des tranches (écritures du cache, envois au thread Tk)
+READ_CHUNK = 1 << 20   # octets lus à la fois dans les dumps texte
+
+# --------- Fonctions utilitaires ---------
+def detect_category(serial: str) -> str:
+    if len(serial) < 4 or not serial.startswith("@Ug"):
+        return "Unknown"
+    return DECODER_CAT_MAP.get(SERIAL_TYPE_CATEGORY.get(serial[3], "unknown"), "Unknown")
+
+def escape_yaml_single_quoted(val: str) -> str:
+    return val.replace("'", "''")
+
+_RE_QUOTED_VALUE = re.compile(r"""['"](.*)['"]\s*(#\s*(.*))?$""")
+
+class BankScan:
+    """
+    Rapport de lecture de bank.yaml :
+    - errors = [(n° de ligne, message)] pour les slots mal formés
+    - forme du fichier : canonical reste True si chaque slot est exactement ce qu'écrirait
+      write_yaml_manual (slots 0..N-1 dans l'ordre, 3 lignes, même indentation partout)
+    """
+    def __init__(self):
+        self.errors = []
+        self.canonical = True
+        self.slots = 0
+        self.slot_indent = None    # indentations relevées sur le 1er slot
+        self.inner_indent = None
+        self.state_flags = set()
+        self.ends_with_newline = True
+        self.newlines = None       # fins de ligne rencontrées (TextIOWrapper.newlines)
+
+    def check_block(self, lines, idx, ser, sf, comment):
+        """Compare les lignes brutes d'un slot à ce qu'écrirait write_yaml_manual."""
+        if not self.canonical:
+            return
+        if ser is None or len(lines) != 3 or idx != self.slots:
+            self.canonical = False
+            return
+        if self.slot_indent is None:
+            first, second = lines[0], lines[1]
+            self.slot_indent = first[:len(first) - len(first.lstrip(" "))]
+            self.inner_indent = second[:len(second) - len(second.lstrip(" "))]
+        tail = f" # {comment}" if comment else ""
+        expected = (f"{self.slot_indent}slot_{idx}:",
+                    f"{self.inner_indent}serial: '{ser}'{tail}",
+                    f"{self.inner_indent}state_flags: {sf}")
+        if tuple(l.rstrip("\n") for l in lines) != expected:
+            self.canonical = False
+            return
+        self.slots += 1
+        self.state_flags.add(sf)
+
+    def can_append(self, state_flags, slot_indent, inner_indent) -> bool:
+        """Vrai si ajouter des slot_N en fin de fichier donne le même contenu qu'une réécriture complète."""
+        if not self.canonical or self.errors or not self.ends_with_newline:
+            return False
+        if self.newlines not in (None, "\n", "\r\n"):
+            return False
+        if self.slots == 0:
+            return True
+        return (self.slot_indent == " " * max(0, int(slot_indent))
+                and self.inner_indent == " " * max(0, int(slot_indent) + int(inner_indent))
+                and self.state_flags == {int(state_flags)})
+
+def _split_serial_value(val: str):
+    """Valeur de 'serial:' -> (serial, commentaire inline)."""
+    if len(val) > 1 and val[0] in "'\"" and val[-1] in "'\"":
+        return val[1:-1], ""   # cas courant, même résultat que _RE_QUOTED_VALUE (.* glouton)
+    mq = _RE_QUOTED_VALUE.match(val)
+    if mq:
+        return mq.group(1), (mq.group(3) or "").strip()
+    if " #" in val:
+        ser, c = val.split(" #", 1)
+        return ser.strip(), c.strip()
+    return val.strip(), ""
+
+def iter_bank_entries(lines, scan: BankScan = None):
+    """
+    Lecture en un seul passage (itérable de lignes, ex. fichier ouvert) du format:
+    slot_X:
+      serial: '...'
+      state_flags: N
+    Génère (slot, {"serial","state_flags","comment"}, n° de ligne du slot).
+    Tests par préfixe plutôt que regex ; les slots sans serial, doublons et serials
+    hors slot sont signalés dans scan.errors.
+    """
+    errors = scan.errors if scan is not None else None
+    block = [] if scan is not None else None   # lignes brutes du slot courant (forme canonique)
+    seen_slots = {}
+    idx = None
+    slot_line = 0
+    ser = None
+    sf = STATE_FLAGS_DEFAULT
+    comment = ""
+    line = "\n"
+
+    for lineno, line in enumerate(lines, 1):
+        if block is not None:
+            block.append(line)
+        s = line.strip()
+        key = s[:5]
+        if key == "slot_":
+            head, colon, tail = s[5:].partition(":")
+            head = head.rstrip()
+            if colon and not tail and head.isdecimal():
+                if block is not None:
+                    block.pop()
+                    if idx is not None:
+                        scan.check_block(block, idx, ser, sf, comment)
+                    elif block:
+                        scan.canonical = False   # lignes avant le premier slot
+                    block = [line]
+                if idx is not None:
+                    if ser is not None:
+                        if errors is not None and idx in seen_slots:
+                            errors.append((slot_line, f"slot_{idx}: duplicate of line {seen_slots[idx]}"))
+                        seen_slots[idx] = slot_line
+                        yield idx, {"serial": ser, "state_flags": sf, "comment": comment}, slot_line
+                    elif errors is not None:
+                        errors.append((slot_line, f"slot_{idx}: no serial"))
+                idx, slot_line, ser, sf, comment = int(head), lineno, None, STATE_FLAGS_DEFAULT, ""
+        elif key == "seria":
+            if s[5:6] != "l":
+                continue
+            rest = s[6:].lstrip()
+            if rest[:1] != ":":
+                continue
+            val = rest[1:].strip()
+            if not val:
+                continue
+            if idx is None:
+                if errors is not None:
+                    errors.append((lineno, "serial outside of a slot"))
+            elif ser is None:
+                ser, comment = _split_serial_value(val)
+        elif key == "state" and idx is not None:
+            if s[5:11] != "_flags":
+                continue
+            rest = s[11:].lstrip()
+            if rest[:1] != ":":
+                continue
+            val = rest[1:].strip()
+            if val.isdecimal():
+                sf = int(val)
+
+    if block is not None:
+        scan.ends_with_newline = line.endswith("\n")
+        if idx is not None:
+            scan.check_block(block, idx, ser, sf, comment)
+        elif block:
+            scan.canonical = False
+    if idx is not None:
+        if ser is not None:
+            if errors is not None and idx in seen_slots:
+                errors.append((slot_line, f"slot_{idx}: duplicate of line {seen_slots[idx]}"))
+            yield idx, {"serial": ser, "state_flags": sf, "comment": comment}, slot_line
+        elif errors is not None:
+            errors.append((slot_line, f"slot_{idx}: no serial"))
+
+def parse_bank_yaml_simple(path: Path, scan: BankScan = None):
+    """
+    Parse simple du format:
+    slot_X:
+      serial: '...'
+      state_flags: N
+    Supporte commentaire inline après serial: serial: '...' # xxx
+    Lecture en flux (iter_bank_entries) ; scan optionnel pour récupérer les erreurs.
+    """
+    entries = {}
+    existing_serials = set()
+    max_slot = -1
+    if not path.exists():
+        return entries, -1, existing_serials
+    try:
+        with open(path, encoding="utf-8") as fh:
+            for idx, entry, _ in iter_bank_entries(fh, scan):
+                entries[idx] = entry
+                existing_serials.add(entry["serial"])
+                if idx > max_slot:
+                    max_slot = idx
+            if scan is not None:
+                scan.newlines = fh.newlines
+    except Exception:
+        if scan is not None:
+            scan.canonical = False
+        return {}, -1, set()
+    return entries, max_slot, existing_serials
+
+def yaml_slot_lines(ordered_items, start_slot=0, state_flags=STATE_FLAGS_DEFAULT, with_comments=True,
+                     slot_indent=0, inner_indent=2):
+    """Lignes (sans fin de ligne) des blocs slot_N, numérotés à partir de start_slot."""
+    s = " " * max(0, int(slot_indent))
+    i = " " * max(0, int(slot_indent) + int(inner_indent))
+    for idx, it in enumerate(ordered_items, start_slot):
+        serial_val = it["serial"]
+        comment = (it.get("comment") or "").strip()
+        yield f"{s}slot_{idx}:"
+        if with_comments and comment:
+            yield f"{i}serial: '{escape_yaml_single_quoted(serial_val)}' # {comment}"
+        else:
+            yield f"{i}serial: '{escape_yaml_single_quoted(serial_val)}'"
+        yield f"{i}state_flags: {int(state_flags)}"
+
+def _fsync_dir(path: Path):
+    """Rend durable un rename dans le dossier (POSIX ; sans objet sous Windows)."""
+    if os.name == "nt":
+        return
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def rotate_backups(path: Path, count: int):
+    """path.bak1 -> bak2 ... -> bak<count>, puis l'état actuel de path -> bak1."""
+    if count <= 0 or not path.exists():
+        return
+    for k in range(count - 1, 0, -1):
+        src = path.with_name(f"{path.name}.bak{k}")
+        if src.exists():
+            os.replace(src, path.with_name(f"{path.name}.bak{k + 1}"))
+    bak1 = path.with_name(f"{path.name}.bak1")
+    try:
+        if bak1.exists():
+            bak1.unlink()
+        os.link(path, bak1)   # lien dur : instantané, l'ancien contenu survit au os.replace qui suit
+    except OSError:
+        shutil.copy2(path, bak1)
+
+def atomic_write_lines(path: Path, lines, backups: int = 0):
+    """
+    Écrit lines (sans fin de ligne) dans un temporaire du même dossier via un writer bufferisé,
+    fsync puis os.replace : path contient l'ancien contenu complet ou le nouveau, jamais un fichier tronqué.
+    """
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with open(fd, "w", encoding="utf-8", buffering=1 << 20) as fh:
+            for line in lines:
+                fh.write(line)
+                fh.write("\n")
+            fh.flush()
+            os.fsync(fh.fileno())
+        if path.exists():
+            shutil.copymode(path, tmp)
+        else:
+            os.chmod(tmp, 0o644)
+        rotate_backups(path, backups)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    _fsync_dir(path.parent)
+
+def write_yaml_manual(path: Path, ordered_items, state_flags=STATE_FLAGS_DEFAULT, with_comments=True,
+                      slot_indent=0, inner_indent=2, backups=0):
+    """
+    ordered_items: liste d'objets {"serial","comment","category"}
+    slot_indent: nb d'espaces avant 'slot_X:'
+    inner_indent: nb d'espaces supplémentaires pour 'serial' et 'state_flags'
+    backups: nb de sauvegardes path.bakN à conserver (écriture atomique dans tous les cas)
+    """
+    atomic_write_lines(path, yaml_slot_lines(ordered_items, 0, state_flags, with_comments,
+                                              slot_indent, inner_indent), backups=backups)
+
+JOURNAL_TAIL = 1 << 16   # octets de bank.yaml avant l'ajout dont le journal garde l'empreinte
+
+def _journal_path(path: Path) -> Path:
+    return path.with_name(path.name + ".journal")
+
+def _tail_digest(fh, base: int) -> str:
+    """sha256 des JOURNAL_TAIL octets qui précèdent base (la fin du fichier avant l'ajout)."""
+    import hashlib
+    start = max(0, base - JOURNAL_TAIL)
+    fh.seek(start)
+    return hashlib.sha256(fh.read(base - start)).hexdigest()
+
+def append_yaml_slots(path: Path, items, start_slot: int, state_flags=STATE_FLAGS_DEFAULT, with_comments=True,
+                      slot_indent=0, inner_indent=2, newline=None, journal=BANK_JOURNAL):
+    """
+    Ajoute les blocs slot_<start_slot>... en fin de fichier sans toucher au reste.
+    newline: fin de ligne du fichier existant (None = celle du système, comme write_yaml_manual).
+    journal: écrit d'abord (taille avant ajout, empreinte de la fin du fichier, octets à ajouter)
+    dans path.journal, rejoué par replay_bank_journal si l'ajout est interrompu.
+    Renvoie les lignes écrites.
+    """
+    lines = [l + "\n" for l in yaml_slot_lines(items, start_slot, state_flags, with_comments,
+                                                 slot_indent, inner_indent)]
+    data = "".join(lines)
+    nl = newline or os.linesep
+    if nl != "\n":
+        data = data.replace("\n", nl)
+    raw = data.encode("utf-8")
+
+    with open(path, "ab"):
+        pass   # crée le fichier s'il n'existe pas
+    base = path.stat().st_size
+    jpath = _journal_path(path)
+    if journal:
+        with open(path, "rb") as fh:
+            tail = _tail_digest(fh, base)
+        with open(jpath, "wb") as jf:
+            header = {"size": base, "length": len(raw), "tail_sha256": tail}
+            jf.write(json.dumps(header).encode("ascii") + b"\n" + raw)
+            jf.flush()
+            os.fsync(jf.fileno())
+    with open(path, "r+b") as fh:
+        fh.seek(base)
+        fh.write(raw)
+        fh.truncate()
+        fh.flush()
+        os.fsync(fh.fileno())
+    if journal:
+        jpath.unlink()
+    return lines
+
+def replay_bank_journal(path: Path):
+    """
+    Termine ou écarte un ajout interrompu (voir append_yaml_slots).
+    Le journal n'est rejoué que si bank.yaml est encore le fichier pour lequel il a été écrit :
+    même fin avant l'ajout (empreinte) et, au-delà, rien d'autre qu'un début des octets prévus.
+    Renvoie "replayed", "discarded" (journal incomplet ou fichier modifié depuis) ou None si pas de journal.
+    """
+    jpath = _journal_path(path)
+    if not jpath.exists():
+        return None
+    result = "discarded"
+    try:
+        header, _, raw = jpath.read_bytes().partition(b"\n")
+        meta = json.loads(header)
+        base, length, tail = int(meta["size"]), int(meta["length"]), str(meta["tail_sha256"])
+        if len(raw) == length and path.exists() and base <= path.stat().st_size <= base + length:
+            with open(path, "r+b") as fh:
+                if _tail_digest(fh, base) == tail and raw.startswith(fh.read()):
+                    fh.seek(base)
+                    fh.write(raw)
+                    fh.truncate()
+                    fh.flush()
+                    os.fsync(fh.fileno())
+                    result = "replayed"
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    try:
+        jpath.unlink()
+    except OSError:
+        pass
+    return result
+
+# --------- Snapshot binaire de bank.yaml ---------
+def snapshot_path(path: Path) -> Path:
+    return path.with_name(path.name + ".snap")
+
+class BankSnapshot:
+    """
+    Copie binaire de bank.yaml, lue via mmap :
+      en-tête (magic, taille + mtime_ns de bank.yaml au moment du parse, nb de lignes, offsets)
+      | slots (int64) | catégories (1 octet, code dans CATEGORIES)
+      | tables de chaînes UTF-8 (serials, commentaires), chacune terminée par "\n"
+        (jamais présent dans une valeur YAML d'une ligne ; write() le refuse)
+      | erreurs de lecture (JSON).
+    Pas d'accès ligne à ligne : ItemStore indexe tous les serials au chargement, donc
+    serials() / comments() décodent chacun leur table d'un bloc, sans objet intermédiaire.
+    bank.yaml reste la référence : open() refuse un snapshot dont la taille ou le mtime
+    enregistrés ne sont plus ceux du fichier (il est alors reconstruit après un parse).
+    """
+    MAGIC = b"BBSNAP\x00\x03"
+    CATEGORIES = ("Unknown", "Weapons", "Equipment", "Equipment Alt", "Special Items")
+    _HEADER = struct.Struct("<8sQqQ5Q")
+
+    def __init__(self, path: Path, fh, mm, count, offsets):
+        self.path = path
+        self.count = count
+        self._fh = fh
+        self._mm = mm
+        self._view = memoryview(mm)
+        off_slots, off_cats, off_ser, off_com, off_meta = offsets
+        self._slots = self._view[off_slots:off_cats].cast("q")
+        self._cats = self._view[off_cats:off_ser]
+        self._ser = (off_ser, off_com)
+        self._com = (off_com, off_meta)
+        self._meta = (off_meta, len(mm))
+
+    @classmethod
+    def open(cls, path: Path, signature):
+        """Snapshot ouvert si son en-tête correspond à signature (taille, mtime_ns de bank.yaml), sinon None."""
+        try:
+            fh = open(path, "rb")
+        except OSError:
+            return None
+        try:
+            head = fh.read(cls._HEADER.size)
+            if len(head) < cls._HEADER.size:
+                raise ValueError("short header")
+            magic, size, mtime_ns, count, *offsets = cls._HEADER.unpack(head)
+            if magic != cls.MAGIC or (size, mtime_ns) != tuple(signature):
+                raise ValueError("stale snapshot")
+            mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+            expected = [cls._HEADER.size, count * 8, count]
+            sizes = [offsets[0]] + [b - a for a, b in zip(offsets, offsets[1:3])]
+            if sizes != expected or not offsets[2] <= offsets[3] <= offsets[4] <= len(mm):
+                mm.close()
+                raise ValueError("bad offsets")
+            return cls(path, fh, mm, count, offsets)
+        except (OSError, ValueError, struct.error):
+            fh.close()
+            return None
+
+    @classmethod
+    def write(cls, path: Path, signature, entries, errors=()):
+        """
+        Écrit (atomiquement) le snapshot de entries {slot: {"serial","comment",...}} pour signature.
+        ValueError si un serial ou un commentaire contient un saut de ligne (séparateur des tables).
+        """
+        order = sorted(entries)
+        serials = [entries[idx]["serial"] for idx in order]
+        comments = [entries[idx].get("comment") or "" for idx in order]
+        codes = {name: code for code, name in enumerate(cls.CATEGORIES)}
+        slots = array("q", order)
+        cats = bytes(codes.get(detect_category(ser), 0) for ser in serials)
+
+        def table(values):
+            blob = "".join(v + "\n" for v in values)
+            if blob.count("\n") != len(values):
+                raise ValueError("line break in a snapshot string")
+            return blob.encode("utf-8")
+
+        ser_blob = table(serials)
+        com_blob = table(comments)
+        meta = json.dumps({"errors": [list(e) for e in errors]}).encode("utf-8")
+        parts = (slots, cats, ser_blob, com_blob, meta)
+        offsets = []
+        pos = cls._HEADER.size
+        for part in parts:
+            offsets.append(pos)
+            pos += len(part) * getattr(part, "itemsize", 1)
+        size, mtime_ns = signature
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+        try:
+            with open(fd, "wb") as fh:
+                fh.write(cls._HEADER.pack(cls.MAGIC, size, mtime_ns, len(order), *offsets))
+                for part in parts:
+                    fh.write(part)
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+
+    def __len__(self):
+        return self.count
+
+    def _table(self, table):
+        """Chaînes d'une table ; ValueError si leur nombre ne correspond pas à l'en-tête."""
+        start, end = table
+        values = str(self._mm[start:end], "utf-8").split("\n")
+        if values.pop() or len(values) != self.count:
+            raise ValueError("corrupt snapshot table")
+        return values
+
+    def slots(self):
+        return self._slots.tolist()
+
+    def category_codes(self) -> bytes:
+        return bytes(self._cats)
+
+    def serials(self):
+        return self._table(self._ser)
+
+    def comments(self):
+        return self._table(self._com)
+
+    def rows(self):
+        """(slot, serial, commentaire, catégorie) dans l'ordre des slots."""
+        labels = self.CATEGORIES
+        return zip(self.slots(), self.serials(), self.comments(), (labels[c] for c in self._cats))
+
+    @property
+    def errors(self):
+        start, end = self._meta
+        try:
+            return [tuple(e) for e in json.loads(bytes(self._mm[start:end]) or b"{}").get("errors", [])]
+        except ValueError:
+            return []
+
+    def close(self):
+        if self._mm is None:
+            return
+        for view in (self._slots, self._cats, self._view):
+            view.release()
+        self._mm.close()
+        self._fh.close()
+        self._mm = None
+
+class BankDiff:
+    """
+    Changements de bank.yaml entre deux lectures, par slot :
+    added / removed = [(slot, entrée)], changed = [(slot, ancienne entrée, nouvelle entrée)].
+    mode : "append" (seule la fin du fichier relue) ou "full" (parse complet).
+    """
+    def __init__(self, mode):
+        self.mode = mode
+        self.added = []
+        self.removed = []
+        self.changed = []
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed)
+
+class BankFile:
+    """
+    bank.yaml tel que lu en dernier : entrées, serials, max_slot et forme (BankScan).
+    refresh() ne relit le fichier que si sa taille ou son mtime ont changé depuis ;
+    reload_changes() fait de même pour une modification externe et renvoie ce qui a changé.
+    """
+    TAIL_CHECK = 256   # octets de fin de fichier comparés pour reconnaître un simple ajout
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.entries = {}
+        self.max_slot = -1
+        self.serials = set()
+        self.scan = BankScan()
+        self.signature = None
+        self.journal_result = None   # résultat de replay_bank_journal au dernier load()
+        self._loaded = False
+        self._tail = b""             # TAIL_CHECK derniers octets lus (signature[0] = fin)
+
+    def _stat(self):
+        try:
+            st = self.path.stat()
+            return st.st_size, st.st_mtime_ns
+        except OSError:
+            return None
+
+    def load(self, replay=True):
+        if replay:
+            self.journal_result = replay_bank_journal(self.path)
+        scan = BankScan()
+        signature = self._stat()   # avant la lecture : une écriture concurrente forcera un re-parse
+        self.entries, self.max_slot, self.serials = parse_bank_yaml_simple(self.path, scan)
+        self.scan = scan
+        self.signature = signature
+        self._tail = self._read_tail(signature)
+        self._loaded = True
+        return self.entries
+
+    def _read_tail(self, signature) -> bytes:
+        if signature is None:
+            return b""
+        size = signature[0]
+        try:
+            with open(self.path, "rb") as fh:
+                fh.seek(max(0, size - self.TAIL_CHECK))
+                return fh.read(min(size, self.TAIL_CHECK))
+        except OSError:
+            return b""
+
+    def changed_signature(self):
+        """(taille, mtime_ns) actuels de bank.yaml s'ils diffèrent de la dernière lecture, sinon None (absent compris)."""
+        signature = self._stat()
+        return None if signature == self.signature else signature
+
+    def reload_changes(self):
+        """
+        Relit bank.yaml modifié par un autre programme et renvoie un BankDiff (None si inchangé).
+        Si le fichier a seulement grandi (l'ancienne fin est intacte et commençait un slot), seuls les
+        octets ajoutés sont parsés ; sinon parse complet comparé slot par slot à l'état précédent
+        (lu dans le snapshot si entries n'a pas encore été chargé). Le journal n'est pas rejoué :
+        il peut appartenir à une écriture en cours d'un autre programme. Un bank.yaml absent
+        n'est pas un changement.
+        """
+        signature = self._stat()
+        if signature == self.signature or signature is None:
+            return None   # fichier absent : souvent un éditeur qui le remplace, on attend qu'il revienne
+        if self._loaded:
+            diff = self._reload_tail(signature)
+            if diff is not None:
+                return diff
+            old = self.entries
+        else:
+            old = self._snapshot_entries()
+        self.load(replay=False)
+        diff = BankDiff("full")
+        new = self.entries
+        for idx, entry in new.items():
+            before = old.get(idx)
+            if before is None:
+                diff.added.append((idx, entry))
+            elif before["serial"] != entry["serial"] or before.get("comment", "") != entry.get("comment", ""):
+                diff.changed.append((idx, before, entry))
+        diff.removed = [(idx, entry) for idx, entry in old.items() if idx not in new]
+        diff.added.sort(key=lambda e: e[0])
+        diff.removed.sort(key=lambda e: e[0])
+        return diff
+
+    def _snapshot_entries(self) -> dict:
+        """Entrées du dernier état lu via open_snapshot() (le snapshot porte encore l'ancienne signature)."""
+        snap = BankSnapshot.open(snapshot_path(self.path), self.signature) if self.signature else None
+        if snap is None:
+            return {}
+        try:
+            return {idx: {"serial": ser, "state_flags": STATE_FLAGS_DEFAULT, "comment": com}
+                    for idx, ser, com, _ in snap.rows()}
+        except ValueError:
+            return {}
+        finally:
+            snap.close()
+
+    def _reload_tail(self, signature):
+        """Cas du simple ajout en fin de fichier : BankDiff "append", ou None s'il faut tout relire."""
+        old = self.signature
+        if (old is None or signature is None or signature[0] <= old[0] or not self.scan.ends_with_newline
+                or self.scan.newlines not in (None, "\n", "\r\n")):
+            return None
+        try:
+            with open(self.path, "rb") as fh:
+                fh.seek(max(0, old[0] - len(self._tail)))
+                if fh.read(len(self._tail)) != self._tail:
+                    return None
+                raw = fh.read(signature[0] - old[0])
+            text = raw.decode("utf-8")
+        except (OSError, UnicodeDecodeError):
+            return None
+        lines = text.replace("\r\n", "\n").splitlines(keepends=True)
+        first = next((l.strip() for l in lines if l.strip()), "")
+        if not first.startswith("slot_"):
+            return None   # les lignes ajoutées complètent le dernier slot
+        added = [(idx, entry) for idx, entry, _ in iter_bank_entries(lines)]
+        if any(idx in self.entries for idx, _ in added) or len({idx for idx, _ in added}) != len(added):
+            return None   # slots réécrits : le parse complet tranche comme parse_bank_yaml_simple
+        self._note_appended(lines, self.scan.slots)
+        self.signature = signature   # celle vue avant la lecture, comme load()
+        diff = BankDiff("append")
+        diff.added = added
+        return diff
+
+    def refresh(self):
+        if not self._loaded or self._stat() != self.signature:
+            self.load()
+
+    def open_snapshot(self):
+        """
+        Ouverture rapide : rejoue le journal puis ouvre bank.yaml.snap s'il correspond au fichier
+        (taille + mtime). Sinon parse complet et snapshot réécrit. Avec un snapshot à jour,
+        entries / serials ne sont lus qu'au premier refresh() (fusion) ; scan.errors vient du snapshot.
+        Renvoie le BankSnapshot ouvert, ou None (pas de bank, BANK_SNAPSHOT coupé, écriture impossible) :
+        entries est alors chargé.
+        """
+        self.journal_result = replay_bank_journal(self.path)
+        signature = self._stat()
+        if not BANK_SNAPSHOT or signature is None:
+            self.load(replay=False)
+            return None
+        snap_path = snapshot_path(self.path)
+        snap = BankSnapshot.open(snap_path, signature)
+        if snap is not None:
+            self.scan = BankScan()
+            self.scan.errors = snap.errors
+            self.signature = signature   # entries pas encore lu (_loaded reste faux)
+            return snap
+        self.load(replay=False)
+        if self.signature is None:
+            return None
+        try:
+            BankSnapshot.write(snap_path, self.signature, self.entries, self.scan.errors)
+        except (OSError, ValueError):
+            return None
+        return BankSnapshot.open(snap_path, self.signature)
+
+    def read_columns(self, report=None):
+        """
+        (serials, commentaires, codes de BankSnapshot.CATEGORIES) dans l'ordre des slots, pour
+        ItemStore.load_columns ; via open_snapshot() (parse complet si besoin).
+        report(n) : appelé avec le nb de serials dès qu'il est connu.
+        """
+        snap = self.open_snapshot()
+        if snap is not None:
+            try:
+                if report:
+                    report(len(snap))
+                return snap.serials(), snap.comments(), snap.category_codes()
+            except ValueError:
+                self.load(replay=False)   # tables incohérentes avec l'en-tête : parse complet
+            finally:
+                snap.close()
+        ordered = [e for _, e in sorted(self.entries.items())]
+        if report:
+            report(len(ordered))
+        codes = {name: code for code, name in enumerate(BankSnapshot.CATEGORIES)}
+        return ([e["serial"] for e in ordered], [e.get("comment", "") for e in ordered],
+                bytes(codes.get(detect_category(e["serial"]), 0) for e in ordered))
+
+    def merge(self, items, state_flags=STATE_FLAGS_DEFAULT, slot_indent=0, inner_indent=2,
+              cancelled=None, incremental=True):
+        """
+        Ajoute au bank les serials absents (un commentaire seul ne modifie pas l'existant).
+        Si le fichier a déjà la forme qu'écrirait write_yaml_manual avec ces options, seuls les
+        nouveaux slot_N sont ajoutés à partir de max_slot + 1 ; sinon réécriture complète.
+        Renvoie (nb de nouveaux serials, "append" | "rewrite"), ou None si annulé avant écriture.
+        """
+        self.refresh()
+        new_items = []
+        known = self.serials   # tenu à jour par load() / _note_appended(), pas de re-parse ici
+        added = set()
+        for it in items:
+            ser = it["serial"]
+            if ser in known or ser in added:
+                continue
+            added.add(ser)
+            new_items.append({"serial": ser, "comment": (it.get("comment") or "")})
+
+        if cancelled and cancelled():
+            return None
+        opts = dict(state_flags=state_flags, with_comments=True, slot_indent=slot_indent, inner_indent=inner_indent)
+
+        if incremental and self.scan.can_append(state_flags, slot_indent, inner_indent):
+            if new_items:
+                start = self.max_slot + 1
+                lines = append_yaml_slots(self.path, new_items, start, newline=self.scan.newlines, **opts)
+                self._note_appended(lines, start)
+            return len(new_items), "append"
+
+        merged_items = [{"serial": e["serial"], "comment": e.get("comment", "")}
+                        for _, e in sorted(self.entries.items())]
+        merged_items.extend(new_items)
+        write_yaml_manual(self.path, merged_items, backups=BANK_BACKUPS, **opts)
+        self.load()
+        return len(new_items), "rewrite"
+
+    def _note_appended(self, lines, start_slot):
+        """Met à jour l'état connu avec les lignes ajoutées (relues comme le ferait un parse)."""
+        tail = BankScan()
+        tail.slots = start_slot
+        tail.slot_indent, tail.inner_indent = self.scan.slot_indent, self.scan.inner_indent
+        for idx, entry, _ in iter_bank_entries(lines, tail):
+            self.entries[idx] = entry
+            self.serials.add(entry["serial"])
+            self.max_slot = max(self.max_slot, idx)
+        self.scan.canonical = self.scan.canonical and tail.canonical and not tail.errors
+        self.scan.slots = tail.slots
+        self.scan.slot_indent, self.scan.inner_indent = tail.slot_indent, tail.inner_indent
+        self.scan.state_flags |= tail.state_flags
+        self.scan.ends_with_newline = tail.ends_with_newline
+        if self.scan.newlines is None:
+            self.scan.newlines = os.linesep
+        self.signature = self._stat()
+        self._tail = self._read_tail(self.signature)
+
+_RE_YAML_SERIAL = re.compile(r"""serial\s*:\s*(?:'([^']*)'|"([^"]*)"|([^\s#]+))""", re.IGNORECASE)
+_RE_RAW_SERIAL = re.compile(r"@U\S+")
+
+def iter_file_lines(fh, chunk_size: int = READ_CHUNK):
+    """
+    Lignes (sans fin de ligne) d'un fichier ouvert, lu par blocs de chunk_size.
+    Binaire : décodé en UTF-8 au fil de l'eau (octets invalides ignorés, BOM retiré).
+    Mémoire bornée par un bloc + la plus longue ligne, quelle que soit la taille du fichier.
+    """
+    decoder = None
+    tail = ""
+    while True:
+        block = fh.read(chunk_size)
+        if isinstance(block, bytes):
+            if decoder is None:
+                decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="ignore")
+            text = decoder.decode(block, final=not block)
+        else:
+            text = block
+        if text:
+            lines = (tail + text).split("\n")
+            tail = lines.pop()
+            for line in lines:
+                yield line.rstrip("\r")
+        if not block:
+            break
+    if tail:
+        yield tail.rstrip("\r")
+
+def iter_text_serials(lines, seen: set = None):
+    """
+    Un seul passage sur un itérable de lignes (voir iter_file_lines) ; génère (serial, commentaire)
+    dans l'ordre du texte, sans doublon :
+    - blocs YAML: serial: '...'/ "..." / non-quoted, commentaire `# ...` en fin de ligne
+    - lignes brutes: @U.... (commentaire ` # ...` ignoré)
+    seen: serials déjà vus (partagé entre plusieurs sources), complété au passage.
+    """
+    if seen is None:
+        seen = set()
+    for line in lines:
+        if ":" in line and "serial" in line.lower():
+            for m in _RE_YAML_SERIAL.finditer(line):
+                val = (m.group(1) or m.group(2) or m.group(3) or "").strip()
+                if val and val not in seen:
+                    seen.add(val)
+                    rest = line[m.end():].lstrip()
+                    yield val, (rest[1:].strip() if rest[:1] == "#" else "")
+        line = line.strip()
+        if not line.startswith("@U"):
+            continue
+        if " #" in line:
+            line = line.split(" #", 1)[0].strip()
+        if _RE_RAW_SERIAL.fullmatch(line) and line not in seen:
+            seen.add(line)
+            yield line, ""
+
+def iter_text_items(lines, seen: set = None):
+    """Items {"serial","comment","category"} de iter_text_serials(lines, seen), au fil de l'eau."""
+    for ser, comment in iter_text_serials(lines, seen):
+        yield {"serial": ser, "comment": comment, "category": detect_category(ser)}
+
+def extract_serials(blob: str):
+    """Serials d'un texte (voir iter_text_serials), dans l'ordre d'apparition."""
+    return [ser for ser, _ in iter_text_serials(blob.splitlines())]
+
+def dedupe_items(items):
+    """
+    Dédoublonnage par serial (règles du bouton Dédupliquer) : la première occurrence reste
+    en place et, si elle n'a pas de commentaire, reprend celui (et la catégorie) du premier
+    doublon commenté. Renvoie (items gardés, nb retirés).
+    """
+    first = {}
+    result = []
+    for it in items:
+        kept = first.get(it["serial"])
+        if kept is None:
+            first[it["serial"]] = it
+            result.append(it)
+        elif (it.get("comment") or "").strip() and not (kept.get("comment") or "").strip():
+            kept["comment"] = it["comment"]
+            kept["category"] = it.get("category", kept.get("category"))
+    return result, len(items) - len(result)
+
+def filter_items(items, category=None, has_comment=None, query=""):
+    """Filtres de la vue : catégorie, avec/sans commentaire, sous-chaîne (serial ou commentaire)."""
+    q = (query or "").strip().lower()
+    out = []
+    for it in items:
+        if category is not None and it.get("category") != category:
+            continue
+        comment = it.get("comment") or ""
+        if has_comment is not None and bool(comment.strip()) != has_comment:
+            continue
+        if q and q not in it["serial"].lower() and q not in comment.lower():
+            continue
+        out.append(it)
+    return out
+
+class ItemStore:
+    """
+    Liste d'items du builder rangée en colonnes plutôt qu'en dicts :
+      serials (liste, id -> serial), cats (bytearray, id -> code de catégorie internée),
+      comments (dict creux id -> commentaire non vide), ids (array "I" des ids vivants, croissants
+      = ordre de la liste).
+    L'id d'un item est sa position dans les colonnes : stable, jamais réutilisé ; un item retiré
+    laisse un trou (serial None). Index serial -> ids tenu à jour à chaque mutation (first / group).
+    Les vues sont des array("I") d'ids ; item() / iter_items() rendent des dicts à la demande.
+    Tris (order) : clés normalisées par colonne et permutations triées gardées en cache, chacune
+    marquée des versions (ajout / retrait, puis par colonne) qu'elle a lues.
+    """
+    CATEGORIES = BankSnapshot.CATEGORIES   # mêmes codes que le snapshot : chargement direct
+    SORT_COLUMNS = ("serial", "category", "comment")
+
+    def __init__(self):
+        self.serials = []
+        self.cats = bytearray()
+        self.comments = {}
+        self.ids = array("I")
+        self.labels = list(self.CATEGORIES)
+        self._codes = {label: code for code, label in enumerate(self.labels)}
+        self._first = {}   # serial -> premier id vivant
+        self._dups = {}    # serial -> deque des ids suivants (doublons seulement ; retraits paresseux)
+        self._versions = dict.fromkeys(("ids",) + self.SORT_COLUMNS, 0)
+        self._sort_keys = {}    # colonne -> (version, clés indexées par id)
+        self._sort_cache = {}   # tuple de colonnes -> (versions, array("I") des ids triés)
+
+    def _touch(self, *what):
+        for name in what:
+            self._versions[name] += 1
+
+    def __len__(self):
+        return len(self.ids)
+
+    def code(self, label) -> int:
+        """Code (interné) d'une catégorie ; une catégorie inconnue reçoit le code suivant."""
+        code = self._codes.get(label)
+        if code is None:
+            code = self._codes[label] = len(self.labels)
+            self.labels.append(label)
+        return code
+
+    def find_code(self, label):
+        """Code d'une catégorie déjà vue, None sinon (sans l'interner)."""
+        return self._codes.get(label)
+
+    # --- ajout ---
+    def _index_serial(self, serial, iid):
+        first = self._first.setdefault(serial, iid)
+        if first != iid:
+            dups = self._dups.get(serial)
+            if dups is None:
+                dups = self._dups[serial] = deque()
+            dups.append(iid)
+
+    def append(self, serial: str, comment: str = "", category: str = None) -> int:
+        iid = len(self.serials)
+        self.serials.append(serial)
+        self.cats.append(self.code(category or detect_category(serial)))
+        if comment and comment.strip():
+            self.comments[iid] = comment
+        self.ids.append(iid)
+        self._index_serial(serial, iid)
+        self._touch("ids")
+        return iid
+
+    def load_columns(self, serials, comments, codes):
+        """Ajout en bloc (ex. BankSnapshot) : serials, commentaires et codes de CATEGORIES, alignés."""
+        start = len(self.serials)
+        self.serials.extend(serials)
+        self.cats.extend(codes)
+        for iid, c in enumerate(comments, start):
+            if c:
+                self.comments[iid] = c
+        self.ids.extend(range(start, len(self.serials)))
+        first, index = self._first, self._index_serial
+        for iid in range(start, len(self.serials)):
+            serial = self.serials[iid]
+            if serial in first:
+                index(serial, iid)
+            else:
+                first[serial] = iid
+        self._touch("ids")
+        return range(start, len(self.serials))
+
+    # --- lecture ---
+    def alive(self, iid) -> bool:
+        return 0 <= iid < len(self.serials) and self.serials[iid] is not None
+
+    def serial(self, iid) -> str:
+        return self.serials[iid]
+
+    def comment(self, iid) -> str:
+        return self.comments.get(iid, "")
+
+    def category(self, iid) -> str:
+        return self.labels[self.cats[iid]]
+
+    def values(self, iid):
+        """(serial, catégorie, commentaire) : colonnes de la table."""
+        return self.serials[iid], self.labels[self.cats[iid]], self.comments.get(iid, "")
+
+    def item(self, iid) -> dict:
+        return {"id": iid, "serial": self.serials[iid], "comment": self.comments.get(iid, ""),
+                "category": self.labels[self.cats[iid]]}
+
+    def iter_items(self, ids=None):
+        """Dicts {"serial","comment","category"} des ids (tous par défaut), construits au fil de l'eau."""
+        serials, comments, cats, labels = self.serials, self.comments, self.cats, self.labels
+        for iid in (self.ids if ids is None else ids):
+            yield {"serial": serials[iid], "comment": comments.get(iid, ""), "category": labels[cats[iid]]}
+
+    def first(self, serial):
+        """Premier id vivant portant ce serial, None s'il n'y en a pas."""
+        return self._first.get(serial)
+
+    def group(self, serial):
+        """Ids vivants portant ce serial, dans l'ordre de la liste."""
+        first = self._first.get(serial)
+        if first is None:
+            return []
+        dups = self._dups.get(serial)
+        if not dups:
+            return [first]
+        serials = self.serials
+        live = [iid for iid in dups if serials[iid] == serial]
+        if len(live) != len(dups):
+            self._dups[serial] = deque(live)   # purge des retraits paresseux
+        return [first] + live
+
+    def frozen(self) -> "ItemStore":
+        """Copie des colonnes (pointeurs, pas les chaînes) pour lire les items depuis un job."""
+        copy = ItemStore.__new__(ItemStore)
+        copy.serials = list(self.serials)
+        copy.cats = bytearray(self.cats)
+        copy.comments = dict(self.comments)
+        copy.ids = array("I", self.ids)
+        copy.labels = list(self.labels)
+        copy._codes = dict(self._codes)
+        copy._first = copy._dups = None   # sans l'index des serials (first / group indisponibles)
+        copy._versions = dict(self._versions)
+        copy._sort_keys, copy._sort_cache = {}, {}
+        return copy
+
+    # --- modification ---
+    def set_comment(self, iid, comment: str):
+        if comment and comment.strip():
+            if self.comments.get(iid) == comment:
+                return
+            self.comments[iid] = comment
+        elif self.comments.pop(iid, None) is None:
+            return
+        self._touch("comment")
+
+    def set_category(self, iid, label: str):
+        code = self.code(label)
+        if self.cats[iid] != code:
+            self.cats[iid] = code
+            self._touch("category")
+
+    def update(self, iid, item: dict):
+        """Reporte commentaire et catégorie d'un dict (ex. après apply_decoded)."""
+        self.set_comment(iid, item.get("comment") or "")
+        if item.get("category"):
+            self.set_category(iid, item["category"])
+
+    def _unindex_serial(self, serial, iid):
+        """
+        À appeler avant que serials[iid] ne change. Un id suivant n'est pas cherché dans la deque :
+        il y reste, périmé (serials[id] != serial), jusqu'à ce qu'il arrive en tête ou que group()
+        purge la deque. Chaque retrait est donc en O(1) amorti, même pour k doublons.
+        """
+        if self._first.get(serial) != iid:
+            return
+        dups, serials = self._dups.get(serial), self.serials
+        while dups:
+            nxt = dups.popleft()
+            if serials[nxt] == serial:
+                self._first[serial] = nxt
+                if not dups:
+                    del self._dups[serial]
+                return
+        del self._first[serial]
+        self._dups.pop(serial, None)
+
+    def set_serial(self, iid, serial: str):
+        old = self.serials[iid]
+        if old == serial:
+            return
+        self._unindex_serial(old, iid)
+        # group() avant l'affectation : une trace périmée de iid sous ce serial reste écartée
+        group = sorted(self.group(serial) + [iid])   # ordre de la liste
+        self.serials[iid] = serial
+        self._touch("serial")
+        self._first[serial] = group[0]
+        if len(group) > 1:
+            self._dups[serial] = deque(group[1:])
+
+    def remove(self, ids):
+        """Retire des ids (un passage sur ids vivants) ; renvoie le nb retiré."""
+        gone = {iid for iid in ids if self.alive(iid)}
+        if not gone:
+            return 0
+        for iid in gone:
+            self._unindex_serial(self.serials[iid], iid)
+            self.serials[iid] = None
+            self.comments.pop(iid, None)
+        self.ids = array("I", (iid for iid in self.ids if iid not in gone))
+        self._touch("ids")
+        return len(gone)
+
+    def dedupe(self):
+        """
+        Dédoublonnage par serial (mêmes règles que dedupe_items) en un passage : group() donne
+        chaque groupe dans l'ordre de la liste ; la première occurrence reste en place et reprend
+        commentaire et catégorie du premier doublon commenté si elle n'en a pas.
+        Renvoie (ids retirés, ids dont le commentaire a changé).
+        """
+        dropped, enriched = [], []
+        serials, comments, first, dups = self.serials, self.comments, self._first, self._dups
+        for iid in self.ids:
+            serial = serials[iid]
+            if first[serial] != iid:
+                dropped.append(iid)
+                continue
+            if serial in dups and not comments.get(iid, "").strip():   # group() : doublons seulement
+                donor = next((g for g in self.group(serial) if comments.get(g, "").strip()), None)
+                if donor is not None:
+                    self.set_comment(iid, self.comment(donor))
+                    self.set_category(iid, self.category(donor))
+                    enriched.append(iid)
+        self.remove(dropped)
+        return dropped, enriched
+
+    # --- tri ---
+    def sort_keys(self, column):
+        """Clés de tri de column indexées par id (minuscules ; rang du libellé pour category)."""
+        version = self._versions[column]
+        cached = self._sort_keys.get(column)
+        if cached is not None and cached[0] == (version, len(self.serials)):
+            return cached[1]
+        if column == "serial":
+            keys = [s.lower() if s is not None else "" for s in self.serials]
+        elif column == "comment":
+            keys = [""] * len(self.serials)
+            for iid, c in self.comments.items():
+                keys[iid] = c.lower()
+        elif column == "category":
+            ranks = sorted(range(len(self.labels)), key=lambda c: self.labels[c].lower())
+            table = bytearray(256)
+            for rank, code in enumerate(ranks):
+                table[code] = rank
+            keys = self.cats.translate(table)   # un octet par id
+        else:
+            raise KeyError(column)
+        self._sort_keys[column] = ((version, len(self.serials)), keys)
+        return keys
+
+    def _sort_ids(self, ids, columns):
+        """ids triés (stable) sur columns, la première colonne d'abord."""
+        out = list(ids)
+        for column in reversed(columns):
+            out.sort(key=self.sort_keys(column).__getitem__)
+        return array("I", out)
+
+    def sorted_ids(self, columns):
+        """Tous les ids vivants triés sur columns (permutation en cache jusqu'à la prochaine mutation)."""
+        columns = tuple(columns)
+        versions = tuple(self._versions[c] for c in ("ids",) + columns)
+        cached = self._sort_cache.get(columns)
+        if cached is not None and cached[0] == versions:
+            return cached[1]
+        if len(columns) > 1:
+            # ordre stable : on part de la permutation (en cache) des colonnes suivantes
+            order = self._sort_ids(self.sorted_ids(columns[1:]), columns[:1])
+        else:
+            order = self._sort_ids(self.ids, columns)
+        self._sort_cache = {cols: entry for cols, entry in self._sort_cache.items()   # périmées : jetées
+                            if entry[0] == tuple(self._versions[c] for c in ("ids",) + cols)}
+        self._sort_cache[columns] = (versions, order)
+        return order
+
+    def order(self, ids, columns, reverse=False):
+        """
+        ids (None = tous) dans l'ordre de tri de columns. Une vue filtrée est tirée de la
+        permutation globale en cache, sauf si elle est assez petite pour être triée directement.
+        reverse ne recopie rien (ReversedIds) : les égalités sortent alors à rebours de la liste.
+        """
+        if not columns:
+            order = self.ids if ids is None else ids
+        elif ids is None:
+            order = self.sorted_ids(columns)
+        elif len(ids) * 16 < len(self.ids):
+            order = self._sort_ids(ids, columns)
+        else:
+            mask = bytearray(len(self.serials))
+            for iid in ids:
+                mask[iid] = 1
+            order = array("I", (iid for iid in self.sorted_ids(columns) if mask[iid]))
+        return ReversedIds(order) if reverse else order
+
+class ReversedIds:
+    """Séquence d'ids lue à rebours, sans copie (tri descendant en O(1))."""
+    __slots__ = ("base",)
+
+    def __init__(self, base):
+        self.base = base
+
+    def __len__(self):
+        return len(self.base)
+
+    def __getitem__(self, i):
+        n = len(self.base)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError(i)
+        return self.base[n - 1 - i]
+
+    def __iter__(self):
+        return reversed(self.base)
+
+# --------- Index de recherche ---------
+class SearchIndex:
+    """
+    Index de recherche sur un ItemStore : index inversé de trigrammes (serial et commentaire
+    en minuscules). Catégorie et présence d'un commentaire se lisent dans les colonnes du store.
+    Les trigrammes des nouveaux ids sont calculés par index_pending() (par tranches, dans l'app
+    pendant les temps morts de Tk) ; tant qu'il en reste beaucoup, match() parcourt les textes.
+    Les listes de trigrammes ne font que grandir : un id retiré ou un commentaire remplacé
+    y laisse une trace, éliminée par la vérification finale `q in texte`. Au-delà d'autant
+    de traces que d'items, remove() / update() vident l'index et remettent tous les ids en
+    attente : la reconstruction se fait alors par index_pending(), jamais dans match().
+    """
+    SYNC_MAX = 2000   # en dessous, match() indexe lui-même les ids en attente
+
+    def __init__(self, store):
+        self.store = store
+        self.grams = {}            # trigramme -> array("I") d'ids
+        self.pending = array("I")  # ids dont les trigrammes restent à calculer
+        self._stale = 0
+
+    def add(self, ids):
+        self.pending.extend(ids)
+
+    def remove(self, ids):
+        self._note_stale(len(ids))
+
+    def update(self, iid):
+        """Commentaire de iid modifié (le serial passe par remove / add)."""
+        comment = self.store.comment(iid).lower()
+        if comment:
+            self._add_grams(iid, comment)
+        self._note_stale(1)
+
+    def _note_stale(self, n):
+        self._stale += n
+        if self._stale > len(self.store):
+            self.grams = {}
+            self.pending = array("I", self.store.ids)
+            self._stale = 0
+
+    def _add_grams(self, iid, s):
+        grams = self.grams
+        for g in {s[i:i + 3] for i in range(len(s) - 2)}:
+            post = grams.get(g)
+            if post is None:
+                post = grams[g] = array("I")
+            post.append(iid)
+
+    def index_pending(self, limit=None) -> bool:
+        """Calcule les trigrammes d'au plus limit ids en attente ; True s'il en reste."""
+        store = self.store
+        n = len(self.pending) if limit is None else min(limit, len(self.pending))
+        serials, comments = store.serials, store.comments
+        for iid in self.pending[:n]:
+            serial = serials[iid]
+            if serial is not None:
+                self._add_grams(iid, serial.lower())
+                comment = comments.get(iid)
+                if comment:
+                    self._add_grams(iid, comment.lower())
+        del self.pending[:n]
+        return bool(self.pending)
+
+    def match(self, q: str):
+        """Ids (croissants) dont le serial ou le commentaire contient q (déjà en minuscules)."""
+        serials, comments = self.store.serials, self.store.comments
+        if len(self.pending) <= self.SYNC_MAX:
+            self.index_pending()
+        if len(q) < 3 or self.pending:
+            return [i for i in self.store.ids if q in serials[i].lower() or q in comments.get(i, "").lower()]
+        rarest = None
+        for i in range(len(q) - 2):
+            post = self.grams.get(q[i:i + 3])
+            if post is None:
+                return []
+            if rarest is None or len(post) < len(rarest):
+                rarest = post
+        out = set()
+        for iid in rarest:
+            serial = serials[iid]
+            if serial is not None and (q in serial.lower() or q in comments.get(iid, "").lower()):
+                out.add(iid)
+        return sorted(out)
+
+    def search(self, category=None, has_comment=None, query=""):
+        """array("I") des ids vivants (ordre de la liste) remplissant les critères ; None si aucun critère."""
+        if category is None and has_comment is None and not query:
+            return None
+        ids = self.match(query) if query else self.store.ids
+        cats, comments = self.store.cats, self.store.comments
+        if category is not None:
+            code = self.store.find_code(category)
+            if code is None:
+                return array("I")
+            ids = [i for i in ids if cats[i] == code]
+        if has_comment is not None:
+            ids = [i for i in ids if (i in comments) == has_comment]
+        return array("I", ids)
+
+def try_decode_and_enrich(item: dict, mod=None) -> bool:
+    """
+    Essaye main.classify_serial(serial) (sinon décodage complet, via le cache disque) :
+      - si weapon_name et commentaire vide -> commentaire
+      - si item_category -> catégorie (mappée)
+    mod: décodeur déjà résolu (sinon get_decoder(), sans reload).
+    """
+    return decode_and_enrich_many([item], mod) == 1
+
+def apply_decoded(item: dict, summary) -> bool:
+    """Applique un résumé décodé (weapon_name -> commentaire vide, item_category -> catégorie)."""
+    if not summary:
+        return False
+
+    changed = False
+
+    wn = summary.get("weapon_name")
+    if wn and not (item.get("comment") or "").strip():
+        item["comment"] = str(wn).strip()
+        changed = True
+
+    dec_cat = summary.get("item_category")
+    if isinstance(dec_cat, str) and dec_cat.strip():
+        key = dec_cat.strip().lower()
+        mapped = DECODER_CAT_MAP.get(key, "Unknown")
+        if item.get("category") != mapped:
+            item["category"] = mapped
+            changed = True
+
+    return changed
+
+def decode_and_enrich_many(items, mod=None) -> int:
+    """
+    Version lot de try_decode_and_enrich (voir iter_enrich_serials), résultats dans l'ordre.
+    Renvoie le nb d'items modifiés.
+    """
+    if mod is None:
+        mod = get_decoder()
+    if not (mod and hasattr(mod, "decode_item_serial")):
+        return 0
+    targets = [it for it in items if it.get("serial")]
+    decoded = iter_enrich_serials([it["serial"] for it in targets], mod)
+    return sum(1 for it, summ in zip(targets, decoded) if apply_decoded(it, summ))
+
+def iter_enrich_serials(serials, mod):
+    """
+    Ce qu'apply_decoded lit (weapon_name, item_category) dans l'ordre des serials.
+    main.classify_serial suffit (préfixe du serial, sans codec ni cache) ; un main.py
+    plus ancien sans classify_serial repasse par iter_decode_serials, seul utilisateur du
+    cache disque : sans lui, chaque session redécoderait toute la bank.
+    """
+    classify = getattr(mod, "classify_serial", None)
+    if classify is None:
+        yield from iter_decode_serials(serials, mod)
+        return
+    for serial in serials:
+        try:
+            c = classify(serial)
+        except Exception:
+            yield None
+            continue
+        yield {"weapon_name": c.weapon_name, "item_category": c.item_category}
+
+def _iter_decode_raw(serials, mod):
+    if hasattr(mod, "iter_decode_many"):
+        yield from mod.iter_decode_many(serials)
+        return
+    for serial in serials:
+        try:
+            yield mod.decode_item_serial(serial)
+        except Exception:
+            yield None
+
+def iter_decode_serials(serials, mod):
+    """
+    Résumés décodés (decoded_summary) dans l'ordre des serials, None si échec.
+    Le cache disque répond d'abord ; seuls les absents passent par main.iter_decode_many
+    (pool de processus) et sont ajoutés au cache. Fermer le générateur annule le reste.
+    """
+    cache = get_decode_cache()
+    known = cache.get_many(serials) if cache is not None else {}
+    decoded = _iter_decode_raw([s for s in dict.fromkeys(serials) if s not in known], mod)
+    pending = {}   # nouveaux résumés pas encore écrits dans le cache
+    try:
+        for serial in serials:
+            if serial not in known:
+                summ = decoded_summary(next(decoded, None))
+                known[serial] = summ
+                if summ is not None:
+                    pending[serial] = summ
+                if cache is not None and len(pending) >= JOB_CHUNK:
+                    cache.put_many(pending)
+                    pending = {}
+            yield known[serial]
+    finally:
+        decoded.close()
+        if cache is not None:
+            cache.put_many(pending)
@@ -0,0 +1,475 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the serial codec, the bank.yaml parser and writer, serial
+extraction from pastes, deduplication and the app's item store (loading,
+sorting, search index).
+
+    python bench.py [codec] [parse] [write] [extract] [dedupe] [store] [--sizes 1k,100k,1m]
+                    [--repeat R] [--check K] [--seed S] [--json OUT] [--compare BASE] [--tolerance T]
+
+Every section runs headlessly on synthetic data of each size: banks of N slots
+(~10% duplicate serials, ~30% comments), pastes of N entries (raw @U lines
+mixed with YAML slots) and N serials for the codec. Each row reports the best
+of R runs as ops/s and the peak memory traced by tracemalloc during one extra
+run. Sizes of 1M run once. The reference implementations are timed up to 100k.
+
+Before timing, each fast path is checked against its reference implementation
+on K random inputs; any mismatch aborts the run with exit status 1.
+--json saves the results with the run's environment. --compare reads such a
+file and exits with status 2 if any row lost more than T (default 0.25) of its
+ops/s, so runs can be compared across changes.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from array import array
+from pathlib import Path
+
+import bank_core
+import main
+
+SECTIONS = ["codec", "parse", "write", "extract", "dedupe", "store"]
+REFERENCE_MAX = 100_000   # reference implementations are not timed above this size
+TYPE_CHARS = "redwuf!"
+
+
+def random_serial(rng: random.Random) -> str:
+    body = "".join(rng.choices(main.SERIAL_CHARS, k=rng.randint(20, 60)))
+    return "@Ug" + rng.choice(TYPE_CHARS) + body
+
+
+def random_blob(rng: random.Random) -> str:
+    """Arbitrary text: alphabet chars mixed with chars the codec must skip."""
+    pool = main.SERIAL_CHARS + " \t'\"@,.:|\\é€あ"
+    blob = "".join(rng.choice(pool) for _ in range(rng.randint(0, 80)))
+    return ("@Ug" + blob) if rng.random() < 0.5 else blob
+
+
+def check_codec(rng: random.Random, count: int) -> int:
+    failures = 0
+    for _ in range(count):
+        serial = random_serial(rng) if rng.random() < 0.5 else random_blob(rng)
+        fast = main.bit_pack_decode(serial)
+        ref = main._bit_pack_decode_reference(serial)
+        if fast != ref:
+            failures += 1
+            print(f"decode mismatch: {serial!r}")
+            continue
+
+        data, prefix, positions, offsets = fast
+        payload = serial[len(prefix):]
+        # Re-encode the original bytes, then shorter/longer/mutated buffers.
+        candidates = [data, data[:rng.randint(0, len(data))],
+                      data + bytes(rng.randrange(256) for _ in range(rng.randint(1, 4))),
+                      bytes(rng.randrange(256) for _ in range(len(data)))]
+        for buf in candidates:
+            got = main.bit_pack_encode(buf, prefix, payload, positions, offsets)
+            want = main._bit_pack_encode_reference(buf, prefix, payload, positions, offsets)
+            if got != want:
+                failures += 1
+                print(f"encode mismatch: {serial!r} / {buf.hex()}")
+        if main.bit_pack_encode(data, prefix, payload, positions, offsets) != serial:
+            failures += 1
+            print(f"round-trip mismatch: {serial!r}")
+    return failures
+
+
+_ITEM_FIELDS = ("serial", "item_type", "item_category", "length", "stats", "confidence",
+                "original_binary", "original_prefix", "weapon_name")
+
+def check_batch(rng: random.Random, count: int) -> int:
+    """decode_batch (NumPy path when installed) against decode_item_serial."""
+    serials = [random_serial(rng) if rng.random() < 0.5 else random_blob(rng) for _ in range(count)]
+    failures = 0
+    for serial, got in zip(serials, main.decode_batch(serials)):
+        want = main.decode_item_serial(serial)
+        if any(getattr(got, f) != getattr(want, f) for f in _ITEM_FIELDS):
+            failures += 1
+            print(f"batch mismatch: {serial!r}")
+    return failures
+
+
+def measure(fn, setup, repeat: int):
+    """Best time of fn(setup()) over repeat runs, then peak traced memory of one more run."""
+    best = float("inf")
+    for _ in range(repeat):
+        arg = setup()
+        t0 = time.perf_counter()
+        fn(arg)
+        best = min(best, time.perf_counter() - t0)
+    arg = setup()
+    tracemalloc.start()
+    try:
+        fn(arg)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+def each(fn):
+    def run(items):
+        for it in items:
+            fn(it)
+    return run
+
+
+class Report:
+    def __init__(self, repeat: int):
+        self.repeat = repeat
+        self.rows = []
+
+    def add(self, section: str, name: str, size: int, ops: int, fn, setup):
+        secs, peak = measure(fn, setup, 1 if size >= 1_000_000 else self.repeat)
+        row = {"section": section, "name": name, "size": size, "ops": ops, "seconds": secs,
+               "ops_per_sec": ops / secs if secs else None, "peak_bytes": peak}
+        self.rows.append(row)
+        rate = f"{row['ops_per_sec']:>12,.0f}" if secs else f"{'-':>12}"
+        print(f"  {name:<32} {rate} ops/s  {secs * 1e6 / max(1, ops):>9.2f} us/op"
+              f"  peak {peak / 1e6:>8.1f} MB", flush=True)
+
+
+def bench_codec(report: Report, size: int, rng: random.Random):
+    serials = [random_serial(rng) for _ in range(size)]
+    decoded = [main.bit_pack_decode(s) for s in serials]
+    encode_args = [(d, p, s[len(p):], pos, off) for s, (d, p, pos, off) in zip(serials, decoded)]
+    del decoded
+    given = lambda: serials
+    if size <= REFERENCE_MAX:
+        report.add("codec", "bit_pack_decode (reference)", size, size, each(main._bit_pack_decode_reference), given)
+    report.add("codec", "bit_pack_decode", size, size, each(main.bit_pack_decode), given)
+    if size <= REFERENCE_MAX:
+        report.add("codec", "bit_pack_encode (reference)", size, size,
+                   each(lambda a: main._bit_pack_encode_reference(*a)), lambda: encode_args)
+    report.add("codec", "bit_pack_encode", size, size, each(lambda a: main.bit_pack_encode(*a)), lambda: encode_args)
+    report.add("codec", "decode_item_serial", size, size, each(main.decode_item_serial), given)
+    batch = "decode_batch (numpy)" if main.np is not None else "decode_batch (no numpy)"
+
+    def batches(ss):   # results dropped block by block, like the per-serial rows
+        for i in range(0, len(ss), main.BATCH_ROWS):
+            main.decode_batch(ss[i:i + main.BATCH_ROWS])
+    report.add("codec", batch, size, size, batches, given)
+
+
+def _parse_bank_yaml_reference(path: Path, state_flags_default=1):
+    """parse_bank_yaml_simple as it was before the streaming parser (regex per line)."""
+    entries = {}
+    existing_serials = set()
+    max_slot = -1
+    if not path.exists():
+        return entries, -1, existing_serials
+    try:
+        lines = path.read_text(encoding="utf-8").splitlines()
+    except Exception:
+        return entries, -1, existing_serials
+
+    i = 0
+    while i < len(lines):
+        line = lines[i].rstrip()
+        m_slot = re.match(r"\s*slot_(\d+)\s*:\s*$", line)
+        if m_slot:
+            idx = int(m_slot.group(1))
+            ser = None
+            sf = state_flags_default
+            comment = ""
+            j = i + 1
+            while j < len(lines):
+                l2 = lines[j].rstrip()
+                if re.match(r"\s*slot_(\d+)\s*:\s*$", l2):
+                    break
+                m_ser = re.match(r"\s*serial\s*:\s*(.+?)\s*$", l2)
+                if m_ser and ser is None:
+                    val = m_ser.group(1)
+                    mq = re.match(r"""['"](.*)['"]\s*(#\s*(.*))?$""", val)
+                    if mq:
+                        ser = mq.group(1)
+                        if mq.group(3):
+                            comment = mq.group(3).strip()
+                    else:
+                        if " #" in val:
+                            ser, c = val.split(" #", 1)
+                            ser = ser.strip()
+                            comment = c.strip()
+                        else:
+                            ser = val.strip()
+                m_sf = re.match(r"\s*state_flags\s*:\s*(\d+)\s*$", l2)
+                if m_sf:
+                    sf = int(m_sf.group(1))
+                j += 1
+            if ser is not None:
+                entries[idx] = {"serial": ser, "state_flags": sf, "comment": comment}
+                existing_serials.add(ser)
+                if idx > max_slot:
+                    max_slot = idx
+            i = j
+        else:
+            i += 1
+    return entries, max_slot, existing_serials
+
+
+def write_synthetic_bank(path: Path, slots: int, rng: random.Random, messy: bool = False):
+    """Bank of `slots` slots, ~10% duplicate serials and ~30% comments; messy adds malformed lines."""
+    serials = []
+    with open(path, "w", encoding="utf-8", newline="\n") as fh:
+        for idx in range(slots):
+            if serials and rng.random() < 0.1:
+                serial = rng.choice(serials)
+            else:
+                serial = random_serial(rng).replace("'", "")
+                serials.append(serial)
+            comment = f" # item {idx}" if rng.random() < 0.3 else ""
+            if messy:
+                roll = rng.random()
+                if roll < 0.05:
+                    fh.write(f"slot_{idx}:\n  state_flags: {rng.randint(0, 99)}\n")
+                    continue
+                if roll < 0.10:
+                    fh.write(rng.choice(["# note\n", "\n", "serial: '@Ugorphan'\n", "slot_x:\n",
+                                         "  serial:\n", "\tslot_3 :  \n", "  serial : \"@Ugdq\" #c\n",
+                                         "  serial: @Ugbare # c2\n", "  state_flags : 7 \n",
+                                         "  serials: '@Ugno'\n", "  seriaX: '@Ugno'\n",
+                                         "  state_flagsX: 4\n", "  state_flags: x\n",
+                                         "  serial: 'a' # it's\n", "slot_1: x\n"]))
+                    continue
+            fh.write(f"slot_{idx}:\n  serial: '{serial}'{comment}\n  state_flags: 1\n")
+
+
+def check_parser(rng: random.Random, count: int) -> int:
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "bank.yaml"
+        for _ in range(count):
+            write_synthetic_bank(path, rng.randint(0, 40), rng, messy=True)
+            expected = _parse_bank_yaml_reference(path, bank_core.STATE_FLAGS_DEFAULT)
+            if bank_core.parse_bank_yaml_simple(path) != expected:
+                failures += 1
+                print("parse mismatch:\n" + path.read_text(encoding="utf-8"))
+    return failures
+
+
+def synthetic_paste(entries: int, rng: random.Random) -> str:
+    """What users paste: raw @U lines and YAML slots, ~10% repeated serials, some comments."""
+    lines = []
+    serials = []
+    for idx in range(entries):
+        if serials and rng.random() < 0.1:
+            serial = rng.choice(serials)
+        else:
+            serial = random_serial(rng).replace("'", "")
+            serials.append(serial)
+        if rng.random() < 0.5:
+            lines.append(serial + (" # note" if rng.random() < 0.1 else ""))
+        else:
+            comment = f" # item {idx}" if rng.random() < 0.3 else ""
+            lines.append(f"slot_{idx}:\n  serial: '{serial}'{comment}\n  state_flags: 1")
+    return "\n".join(lines) + "\n"
+
+
+def bank_items(path: Path):
+    entries, _, _ = bank_core.parse_bank_yaml_simple(path)
+    return [{"serial": e["serial"], "comment": e["comment"], "category": bank_core.detect_category(e["serial"])}
+            for _, e in sorted(entries.items())]
+
+
+def bench_bank(report: Report, sections, size: int, rng: random.Random, tmp: Path):
+    path = tmp / "bank.yaml"
+    write_synthetic_bank(path, size, rng)
+    if "parse" in sections:
+        print(f"  (bank: {os.path.getsize(path) / 1e6:.1f} MB)")
+        if size <= REFERENCE_MAX:
+            report.add("parse", "parse_bank_yaml (reference)", size, size, _parse_bank_yaml_reference, lambda: path)
+        report.add("parse", "parse_bank_yaml_simple", size, size, bank_core.parse_bank_yaml_simple, lambda: path)
+    if not {"write", "dedupe", "store"} & set(sections):
+        return
+    items = bank_items(path)
+    if "write" in sections:
+        out = tmp / "out.yaml"
+        report.add("write", "write_yaml_manual", size, len(items),
+                   lambda its: bank_core.write_yaml_manual(out, its), lambda: items)
+    if "dedupe" in sections:
+        # dedupe_items sets comments on the kept items: fresh copies for every run
+        report.add("dedupe", "dedupe_items", size, len(items), bank_core.dedupe_items,
+                   lambda: [dict(it) for it in items])
+        # the Dedupe button: ItemStore.dedupe on the loaded bank (a fresh store for every run)
+        report.add("dedupe", "ItemStore.dedupe", size, len(items), bank_core.ItemStore.dedupe,
+                   lambda: load_store(items))
+    if "store" in sections:
+        bench_store(report, size, items, rng)
+
+
+def store_columns(items):
+    codes = {name: code for code, name in enumerate(bank_core.ItemStore.CATEGORIES)}
+    return ([it["serial"] for it in items], [it["comment"] for it in items],
+            bytes(codes.get(it["category"], 0) for it in items))
+
+
+def load_store(items) -> bank_core.ItemStore:
+    store = bank_core.ItemStore()
+    store.load_columns(*store_columns(items))
+    return store
+
+
+def search_queries(items, rng: random.Random, count: int = 50):
+    """Substrings of serials and comments as typed in the filter box, plus misses."""
+    queries = []
+    for _ in range(count):
+        it = rng.choice(items)
+        text = (it["comment"] if it["comment"] and rng.random() < 0.3 else it["serial"]).lower()
+        start = rng.randrange(max(1, len(text) - 6))
+        queries.append(text[start:start + rng.randint(3, 8)] if rng.random() < 0.9 else "zzq")
+    return queries
+
+
+def bench_store(report: Report, size: int, items, rng: random.Random):
+    """What the app does with a loaded bank: ItemStore load, column sorts, search index build and queries."""
+    columns = store_columns(items)
+    report.add("store", "ItemStore.load_columns", size, len(items),
+               lambda cols: bank_core.ItemStore().load_columns(*cols), lambda: columns)
+    for cols in (("serial",), ("category", "serial"), ("comment",)):
+        # a fresh store for every run: the sort caches start empty
+        report.add("store", f"sorted_ids ({', '.join(cols)})", size, len(items),
+                   lambda store, cols=cols: store.sorted_ids(cols), lambda: load_store(items))
+    store = load_store(items)
+    subset = array("I", (iid for iid in store.ids if rng.random() < 0.1))
+    report.add("store", "order (10% view, serial)", size, len(subset),
+               lambda s: s.order(subset, ("serial",)), lambda: load_store(items))
+
+    def new_index():
+        index = bank_core.SearchIndex(store)
+        index.add(store.ids)
+        return index
+    report.add("store", "SearchIndex.index_pending", size, len(items),
+               bank_core.SearchIndex.index_pending, new_index)
+    index = new_index()
+    index.index_pending()
+    queries = search_queries(items, rng)
+    report.add("store", "SearchIndex.search", size, len(queries),
+               lambda idx: [idx.search(query=q) for q in queries], lambda: index)
+
+
+def bench_extract(report: Report, size: int, rng: random.Random, tmp: Path):
+    blob = synthetic_paste(size, rng)
+    report.add("extract", "extract_serials", size, size, bank_core.extract_serials, lambda: blob)
+    path = tmp / "paste.txt"
+    path.write_text(blob, encoding="utf-8")
+
+    def from_file(p):
+        with open(p, "rb") as fh:
+            for _ in bank_core.iter_text_serials(bank_core.iter_file_lines(fh)):
+                pass
+    report.add("extract", "iter_text_serials (file)", size, size, from_file, lambda: path)
+
+
+def parse_size(text: str) -> int:
+    text = text.strip().lower()
+    mult = {"k": 1_000, "m": 1_000_000}.get(text[-1:], 1)
+    return int(float(text[:-1] if mult > 1 else text) * mult)
+
+
+def environment(args) -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=Path(__file__).resolve().parent, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "time": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "numpy": getattr(main.np, "__version__", None),
+        "seed": args.seed,
+        "repeat": args.repeat,
+    }
+
+
+def compare(rows, baseline_path: Path, tolerance: float) -> int:
+    """Rows slower than the baseline by more than tolerance (share of ops/s lost)."""
+    base = json.loads(baseline_path.read_text(encoding="utf-8"))
+    known = {(r["section"], r["name"], r["size"]): r for r in base.get("results", [])}
+    print(f"\ncompared with {baseline_path} ({base.get('environment', {}).get('commit') or '?'}):")
+    regressions = 0
+    for row in rows:
+        old = known.get((row["section"], row["name"], row["size"]))
+        if not old or not old.get("ops_per_sec") or not row["ops_per_sec"]:
+            continue
+        ratio = row["ops_per_sec"] / old["ops_per_sec"]
+        mem = row["peak_bytes"] / old["peak_bytes"] if old.get("peak_bytes") else 1.0
+        flag = ""
+        if ratio < 1 - tolerance:
+            regressions += 1
+            flag = "  <-- slower"
+        print(f"  {row['name']:<32} {row['size']:>9,}  speed x{ratio:.2f}  memory x{mem:.2f}{flag}")
+    return regressions
+
+
+def main_cli(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("sections", nargs="*", metavar="SECTION", help=f"{', '.join(SECTIONS)} (default: all)")
+    ap.add_argument("--sizes", default="1k,100k,1m", help="comma-separated sizes (k/m suffixes)")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--check", type=int, default=2000)
+    ap.add_argument("--seed", type=int, default=1234)
+    ap.add_argument("--json", metavar="OUT", help="save the results as JSON")
+    ap.add_argument("--compare", metavar="BASE", help="JSON of an earlier run to compare with")
+    ap.add_argument("--tolerance", type=float, default=0.25)
+    args = ap.parse_args(argv)
+    sections = args.sections or SECTIONS
+    unknown = sorted(set(sections) - set(SECTIONS))
+    if unknown:
+        ap.error(f"unknown section(s): {', '.join(unknown)}")
+    try:
+        sizes = [parse_size(s) for s in args.sizes.split(",") if s.strip()]
+    except ValueError:
+        ap.error(f"invalid --sizes: {args.sizes!r}")
+
+    rng = random.Random(args.seed)
+    if "codec" in sections:
+        failures = check_codec(rng, args.check) + check_batch(rng, args.check)
+        if failures:
+            print(f"{failures} codec mismatch(es) against the reference implementation")
+            return 1
+        print(f"codec check: {args.check} random inputs match the reference")
+    if "parse" in sections:
+        failures = check_parser(rng, max(1, args.check // 10))
+        if failures:
+            print(f"{failures} parser mismatch(es) against the reference implementation")
+            return 1
+        print(f"parser check: {max(1, args.check // 10)} random banks match the reference")
+
+    report = Report(max(1, args.repeat))
+    for size in sizes:
+        print(f"\n== {size:,} ==")
+        with tempfile.TemporaryDirectory() as tmp:
+            if "codec" in sections:
+                bench_codec(report, size, random.Random(f"{args.seed}/codec/{size}"))
+            if {"parse", "write", "dedupe", "store"} & set(sections):
+                bench_bank(report, sections, size, random.Random(f"{args.seed}/bank/{size}"), Path(tmp))
+            if "extract" in sections:
+                bench_extract(report, size, random.Random(f"{args.seed}/paste/{size}"), Path(tmp))
+
+    if args.json:
+        out = {"environment": environment(args), "sizes": sizes, "results": report.rows}
+        Path(args.json).write_text(json.dumps(out, indent=2) + "\n", encoding="utf-8")
+        print(f"\nresults written to {args.json}")
+    if args.compare:
+        regressions = compare(report.rows, Path(args.compare), args.tolerance)
+        if regressions:
+            print(f"{regressions} row(s) slower than the baseline by more than {args.tolerance:.0%}")
+            return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -1,11 +1,22 @@
-import tkinter as tk
-from tkinter import ttk, messagebox, Toplevel, filedialog
+try:
+    import tkinter as tk
+    from tkinter import ttk, messagebox, Toplevel, filedialog
+except ImportError:  # Python without Tk: the codec still works, only GearNGunEditor needs it
+    tk = None
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Union, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Union, Tuple
+from concurrent.futures import ProcessPoolExecutor
+import os
+import pickle
 import struct
 from pathlib import Path
 import datetime
 
+try:
+    import numpy as np
+except ImportError:  # optional: decode_batch falls back to decode_item_serial
+    np = None
+
 @dataclass
 class ItemStats:
     primary_stat: Optional[int] = None
@@ -16,21 +27,68 @@ class ItemStats:
     item_class: Optional[int] = None
     flags: Optional[List[int]] = None
 
-@dataclass
 class DecodedItem:
-    serial: str
-    item_type: str
-    item_category: str
-    length: int
-    stats: ItemStats
-    raw_fields: Dict[str, Union[int, List[int]]]
-    confidence: str
-    original_binary: bytes
-    original_prefix: str
-    original_payload: str
-    data_positions: List[int]
-    char_offsets: List[int]
-    weapon_name: Optional[str] = None
+    # raw_fields (Raw Data window, save_to_text, encoder) and the payload/positions/offsets
+    # the encoder needs are rebuilt from original_binary / serial on first access, so a
+    # decoded bank kept in memory only holds the bytes and the stats.
+    __slots__ = ('serial', 'item_type', 'item_category', 'length', 'stats', 'confidence',
+                 'original_binary', 'original_prefix', 'weapon_name',
+                 '_raw_fields', '_payload', '_positions', '_offsets')
+
+    def __init__(self, serial: str, item_type: str, item_category: str, length: int, stats: ItemStats,
+                 raw_fields: Optional[Dict[str, Union[int, List[int]]]] = None, confidence: str = "low",
+                 original_binary: bytes = b'', original_prefix: str = '', original_payload: Optional[str] = None,
+                 data_positions: Optional[List[int]] = None, char_offsets: Optional[List[int]] = None,
+                 weapon_name: Optional[str] = None):
+        self.serial = serial
+        self.item_type = item_type
+        self.item_category = item_category
+        self.length = length
+        self.stats = stats
+        self.confidence = confidence
+        self.original_binary = original_binary
+        self.original_prefix = original_prefix
+        self.weapon_name = weapon_name
+        self._raw_fields = raw_fields
+        self._payload = original_payload
+        self._positions = data_positions
+        self._offsets = char_offsets
+
+    @property
+    def raw_fields(self) -> Dict[str, Union[int, List[int]]]:
+        if self._raw_fields is None:
+            self._raw_fields = extract_fields(self.original_binary)
+        return self._raw_fields
+
+    @raw_fields.setter
+    def raw_fields(self, value):
+        self._raw_fields = value
+
+    @property
+    def original_payload(self) -> str:
+        if self._payload is None:
+            self._payload = self.serial[len(self.original_prefix):]
+        return self._payload
+
+    @property
+    def data_positions(self) -> List[int]:
+        if self._positions is None:
+            self._load_layout()
+        return self._positions
+
+    @property
+    def char_offsets(self) -> List[int]:
+        if self._offsets is None:
+            self._load_layout()
+        return self._offsets
+
+    def _load_layout(self):
+        _, _, self._positions, self._offsets = bit_pack_decode(self.serial)
+
+    def __repr__(self):
+        return (f"DecodedItem(serial={self.serial!r}, item_type={self.item_type!r}, "
+                f"item_category={self.item_category!r}, length={self.length}, stats={self.stats!r}, "
+                f"confidence={self.confidence!r}, weapon_name={self.weapon_name!r})")
 
 WEAPON_NAMES = {
     'd_t@': 'Jakobs Shotgun',
@@ -47,19 +105,108 @@ WEAPON_NAMES = {
     'y>^2}': 'Order Sniper'
 }
 
+# code -> (position in WEAPON_NAMES, name); a serial is looked up once per code length.
+_WEAPON_CODES = {code: (rank, name) for rank, (code, name) in enumerate(WEAPON_NAMES.items())}
+_WEAPON_CODE_LENGTHS = sorted({len(code) for code in WEAPON_NAMES})
+
 def get_weapon_name(serial: str) -> Optional[str]:
     if not serial.startswith('@Ug'):
         return None
-    
-    prefix = serial[3:12]
-    
-    for code, name in WEAPON_NAMES.items():
-        if prefix.startswith(code):
-            return name
-    
-    return None
+
+    best = None
+    for n in _WEAPON_CODE_LENGTHS:
+        hit = _WEAPON_CODES.get(serial[3:3 + n])
+        if hit is not None and (best is None or hit[0] < best[0]):
+            best = hit   # first match in WEAPON_NAMES order, as a linear scan would give
+
+    return best[1] if best else None
+
+# serial[3] -> item_category given by decode_item_serial
+ITEM_CATEGORIES = {
+    'r': 'weapon',
+    'e': 'equipment',
+    'd': 'equipment_alt',
+    'w': 'weapon_special',
+    'u': 'utility',
+    'f': 'consumable',
+    '!': 'special'
+}
+
+@dataclass
+class SerialClass:
+    item_type: str
+    item_category: str
+    weapon_name: Optional[str] = None
+
+def classify_serial(serial: str) -> SerialClass:
+    """Type, category and weapon name as decode_item_serial reports them, without the bit codec."""
+    item_type = serial[3] if len(serial) >= 4 and serial.startswith('@Ug') else '?'
+    return SerialClass(item_type, ITEM_CATEGORIES.get(item_type, 'unknown'), get_weapon_name(serial))
+
+SERIAL_CHARS = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/=!$%&*()[]{}~`^_<>?#;'
+
+# ord(c) -> index in SERIAL_CHARS (-1 when the character carries no data)
+_DECODE_TABLE = [-1] * 256
+for _i, _c in enumerate(SERIAL_CHARS):
+    _DECODE_TABLE[ord(_c)] = _i
+del _i, _c
 
 def bit_pack_decode(serial: str) -> Tuple[bytes, str, List[int], List[int]]:
+    table = _DECODE_TABLE
+
+    if serial.startswith('@Ug'):
+        original_prefix = '@Ug'
+        payload = serial[3:]
+    else:
+        original_prefix = ''
+        payload = serial
+
+    acc = 0
+    nbits = 0
+    data_positions = []
+    char_offsets = []
+    for idx, c in enumerate(payload):
+        o = ord(c)
+        if o < 256:
+            val = table[o]
+            if val >= 0:
+                acc = (acc << 6) | (val & 63)
+                nbits += 6
+                data_positions.append(idx)
+                char_offsets.append(val >> 6)
+
+    pad = -nbits % 8
+    byte_data = (acc << pad).to_bytes((nbits + pad) // 8, 'big')
+
+    return byte_data, original_prefix, data_positions, char_offsets
+
+def bit_pack_encode(modified_data: bytes, original_prefix: str, original_payload: str, data_positions: List[int], char_offsets: List[int]) -> str:
+    chars = SERIAL_CHARS
+
+    count = len(data_positions)
+    target_bit_length = count * 6
+    data_bit_length = len(modified_data) * 8
+    acc = int.from_bytes(modified_data, 'big')
+    if data_bit_length > target_bit_length:
+        acc >>= data_bit_length - target_bit_length
+    else:
+        acc <<= target_bit_length - data_bit_length
+
+    new_payload_list = list(original_payload)
+    shift = target_bit_length
+    for idx in range(count):
+        shift -= 6
+        val = (acc >> shift) & 63
+        if char_offsets[idx] == 1 and val <= 20:
+            new_payload_list[data_positions[idx]] = chars[val + 64]
+        else:
+            new_payload_list[data_positions[idx]] = chars[val]
+
+    return original_prefix + ''.join(new_payload_list)
+
+# String-based implementations the codec above replaced; kept as the
+# reference for bench.py's round-trip check until they are retired.
+def _bit_pack_decode_reference(serial: str) -> Tuple[bytes, str, List[int], List[int]]:
     chars = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/=!$%&*()[]{}~`^_<>?#;'
     char_map = {c: i for i, c in enumerate(chars)}
 
@@ -91,7 +238,7 @@ def bit_pack_decode(serial: str) -> Tuple[bytes, str, List[int], List[int]]:
 
     return bytes(byte_data), original_prefix, data_positions, char_offsets
 
-def bit_pack_encode(modified_data: bytes, original_prefix: str, original_payload: str, data_positions: List[int], char_offsets: List[int]) -> str:
+def _bit_pack_encode_reference(modified_data: bytes, original_prefix: str, original_payload: str, data_positions: List[int], char_offsets: List[int]) -> str:
     chars = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/=!$%&*()[]{}~`^_<>?#;'
 
     bit_string = ''.join(format(byte, '08b') for byte in modified_data)
@@ -122,60 +269,66 @@ def bit_pack_encode(modified_data: bytes, original_prefix: str, original_payload
 
     return new_serial
 
-def extract_fields(data: bytes) -> Dict[str, Union[int, List[int]]]:
-    fields = {}
+# Raw fields cover the first 20 bytes: up to ten little-endian u16 and twenty bytes.
+_U32_LE = struct.Struct('<I')
+_U32_BE = struct.Struct('>I')
+_U32_LE_3 = struct.Struct('<3I')
+_U16_LE = struct.Struct('<H')
+_U16_RUNS = [struct.Struct(f'<{n}H') for n in range(11)]
+_VAL16_KEYS = [f'val16_at_{i}' for i in range(0, 20, 2)]
+_BYTE_KEYS = [f'byte_{i}' for i in range(20)]
+
+def _val16_at(data: bytes, i: int) -> Optional[int]:
+    """raw_fields['val16_at_<i>'] (i even) without building raw_fields; None when absent."""
+    if i < 20 and i + 1 < len(data):
+        return _U16_LE.unpack_from(data, i)[0]
+    return None
 
-    if len(data) >= 4:
-        fields['header_le'] = struct.unpack('<I', data[:4])[0]
-        fields['header_be'] = struct.unpack('>I', data[:4])[0]
+def _byte_at(data: bytes, i: int) -> Optional[int]:
+    """raw_fields['byte_<i>'] without building raw_fields; None when absent."""
+    if i < 20 and i < len(data):
+        return data[i]
+    return None
 
-    if len(data) >= 8:
-        fields['field2_le'] = struct.unpack('<I', data[4:8])[0]
+def _potential_stats(data: bytes) -> List[Tuple[int, int]]:
+    vals = _U16_RUNS[min(10, len(data) // 2)].unpack_from(data)
+    return [(2 * k, v) for k, v in enumerate(vals) if 100 <= v <= 10000]
 
-    if len(data) >= 12:
-        fields['field3_le'] = struct.unpack('<I', data[8:12])[0]
+def extract_fields(data: bytes) -> Dict[str, Union[int, List[int]]]:
+    fields = {}
+    n = len(data)
 
-    stats_16 = []
-    for i in range(0, min(len(data)-1, 20), 2):
-        val16 = struct.unpack('<H', data[i:i+2])[0]
-        fields[f'val16_at_{i}'] = val16
-        if 100 <= val16 <= 10000:
-            stats_16.append((i, val16))
+    if n >= 4:
+        fields['header_le'] = _U32_LE.unpack_from(data)[0]
+        fields['header_be'] = _U32_BE.unpack_from(data)[0]
 
-    fields['potential_stats'] = stats_16
+    if n >= 12:
+        _, fields['field2_le'], fields['field3_le'] = _U32_LE_3.unpack_from(data)
+    elif n >= 8:
+        fields['field2_le'] = _U32_LE.unpack_from(data, 4)[0]
 
-    flags = []
-    for i in range(min(len(data), 20)):
-        byte_val = data[i]
-        fields[f'byte_{i}'] = byte_val
-        if byte_val < 100:
-            flags.append((i, byte_val))
+    vals = _U16_RUNS[min(10, n // 2)].unpack_from(data)
+    fields.update(zip(_VAL16_KEYS, vals))
+    fields['potential_stats'] = [(2 * k, v) for k, v in enumerate(vals) if 100 <= v <= 10000]
 
-    fields['potential_flags'] = flags
+    head = data[:20]
+    fields.update(zip(_BYTE_KEYS, head))
+    fields['potential_flags'] = [(i, b) for i, b in enumerate(head) if b < 100]
 
     return fields
 
 def decode_weapon(data: bytes, serial: str, original_prefix: str, payload: str, data_positions: List[int], char_offsets: List[int]) -> DecodedItem:
-    fields = extract_fields(data)
-    stats = ItemStats()
-
-    if 'val16_at_0' in fields:
-        stats.primary_stat = fields['val16_at_0']
-
-    if 'val16_at_12' in fields:
-        stats.secondary_stat = fields['val16_at_12']
-
-    if 'byte_4' in fields:
-        stats.manufacturer = fields['byte_4']
-
-    if 'byte_8' in fields:
-        stats.item_class = fields['byte_8']
-
-    if 'byte_1' in fields:
-        stats.rarity = fields['byte_1']
+    stats = ItemStats(
+        primary_stat=_val16_at(data, 0),
+        secondary_stat=_val16_at(data, 12),
+        manufacturer=_byte_at(data, 4),
+        item_class=_byte_at(data, 8),
+        rarity=_byte_at(data, 1),
+    )
 
-    if 'byte_13' in fields and fields['byte_13'] in [2, 34]:
-        stats.level = fields['byte_13']
+    level = _byte_at(data, 13)
+    if level in (2, 34):
+        stats.level = level
 
     weapon_name = get_weapon_name(serial)
     
@@ -187,41 +340,25 @@ def decode_weapon(data: bytes, serial: str, original_prefix: str, payload: str,
         item_category='weapon',
         length=len(data),
         stats=stats,
-        raw_fields=fields,
         confidence=confidence,
         original_binary=data,
         original_prefix=original_prefix,
-        original_payload=payload,
-        data_positions=data_positions,
-        char_offsets=char_offsets,
         weapon_name=weapon_name
     )
 
 def decode_equipment_e(data: bytes, serial: str, original_prefix: str, payload: str, data_positions: List[int], char_offsets: List[int]) -> DecodedItem:
-    fields = extract_fields(data)
-    stats = ItemStats()
-
-    if 'val16_at_2' in fields:
-        stats.primary_stat = fields['val16_at_2']
-
-    if 'val16_at_8' in fields:
-        stats.secondary_stat = fields['val16_at_8']
-
-    if 'val16_at_10' in fields and len(data) > 38:
-        stats.level = fields['val16_at_10']
-
-    if 'byte_1' in fields:
-        stats.manufacturer = fields['byte_1']
-
-    if 'byte_3' in fields:
-        stats.item_class = fields['byte_3']
-
-    if 'byte_9' in fields:
-        stats.rarity = fields['byte_9']
+    stats = ItemStats(
+        primary_stat=_val16_at(data, 2),
+        secondary_stat=_val16_at(data, 8),
+        level=_val16_at(data, 10) if len(data) > 38 else None,
+        manufacturer=_byte_at(data, 1),
+        item_class=_byte_at(data, 3),
+        rarity=_byte_at(data, 9),
+    )
 
     weapon_name = get_weapon_name(serial)
     
-    confidence = "high" if 'byte_1' in fields and fields['byte_1'] == 49 else "medium"
+    confidence = "high" if stats.manufacturer == 49 else "medium"
 
     return DecodedItem(
         serial=serial,
@@ -229,41 +366,25 @@ def decode_equipment_e(data: bytes, serial: str, original_prefix: str, payload:
         item_category='equipment',
         length=len(data),
         stats=stats,
-        raw_fields=fields,
         confidence=confidence,
         original_binary=data,
         original_prefix=original_prefix,
-        original_payload=payload,
-        data_positions=data_positions,
-        char_offsets=char_offsets,
         weapon_name=weapon_name
     )
 
 def decode_equipment_d(data: bytes, serial: str, original_prefix: str, payload: str, data_positions: List[int], char_offsets: List[int]) -> DecodedItem:
-    fields = extract_fields(data)
-    stats = ItemStats()
-
-    if 'val16_at_4' in fields:
-        stats.primary_stat = fields['val16_at_4']
-
-    if 'val16_at_8' in fields:
-        stats.secondary_stat = fields['val16_at_8']
-
-    if 'val16_at_10' in fields:
-        stats.level = fields['val16_at_10']
-
-    if 'byte_5' in fields:
-        stats.manufacturer = fields['byte_5']
-
-    if 'byte_6' in fields:
-        stats.item_class = fields['byte_6']
-
-    if 'byte_14' in fields:
-        stats.rarity = fields['byte_14']
+    stats = ItemStats(
+        primary_stat=_val16_at(data, 4),
+        secondary_stat=_val16_at(data, 8),
+        level=_val16_at(data, 10),
+        manufacturer=_byte_at(data, 5),
+        item_class=_byte_at(data, 6),
+        rarity=_byte_at(data, 14),
+    )
 
     weapon_name = get_weapon_name(serial)
     
-    confidence = "high" if 'byte_5' in fields and fields['byte_5'] == 15 else "medium"
+    confidence = "high" if stats.manufacturer == 15 else "medium"
 
     return DecodedItem(
         serial=serial,
@@ -271,59 +392,36 @@ def decode_equipment_d(data: bytes, serial: str, original_prefix: str, payload:
         item_category='equipment_alt',
         length=len(data),
         stats=stats,
-        raw_fields=fields,
         confidence=confidence,
         original_binary=data,
         original_prefix=original_prefix,
-        original_payload=payload,
-        data_positions=data_positions,
-        char_offsets=char_offsets,
         weapon_name=weapon_name
     )
 
 def decode_other_type(data: bytes, serial: str, item_type: str, original_prefix: str, payload: str, data_positions: List[int], char_offsets: List[int]) -> DecodedItem:
-    fields = extract_fields(data)
-    stats = ItemStats()
+    stats = ItemStats(
+        manufacturer=_byte_at(data, 1),
+        rarity=_byte_at(data, 2),
+        item_class=_byte_at(data, 3),
+        level=_val16_at(data, 10),
+    )
 
-    potential_stats = fields.get('potential_stats', [])
+    potential_stats = _potential_stats(data)
     if potential_stats:
         stats.primary_stat = potential_stats[0][1] if len(potential_stats) > 0 else None
         stats.secondary_stat = potential_stats[1][1] if len(potential_stats) > 1 else None
 
-    if 'byte_1' in fields:
-        stats.manufacturer = fields['byte_1']
-
-    if 'byte_2' in fields:
-        stats.rarity = fields['byte_2']
-
-    if 'byte_3' in fields:
-        stats.item_class = fields['byte_3']
-
-    if 'val16_at_10' in fields:
-        stats.level = fields['val16_at_10']
-
     weapon_name = get_weapon_name(serial)
-    
-    category_map = {
-        'w': 'weapon_special',
-        'u': 'utility',
-        'f': 'consumable',
-        '!': 'special'
-    }
 
     return DecodedItem(
         serial=serial,
         item_type=item_type,
-        item_category=category_map.get(item_type, 'unknown'),
+        item_category=ITEM_CATEGORIES.get(item_type, 'unknown'),
         length=len(data),
         stats=stats,
-        raw_fields=fields,
         confidence="low",
         original_binary=data,
         original_prefix=original_prefix,
-        original_payload=payload,
-        data_positions=data_positions,
-        char_offsets=char_offsets,
         weapon_name=weapon_name
     )
 
@@ -364,6 +462,149 @@ def decode_item_serial(serial: str) -> DecodedItem:
             weapon_name=None
         )
 
+# Below this many serials a process pool costs more than it saves.
+DECODE_MANY_THRESHOLD = 2000
+
+def iter_decode_many(serials: Iterable[str], workers: Optional[int] = None, chunksize: Optional[int] = None) -> Iterator[DecodedItem]:
+    serials = list(serials)
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    done = 0
+    if workers > 1 and len(serials) >= DECODE_MANY_THRESHOLD:
+        if chunksize is None:
+            chunksize = max(1, min(2000, len(serials) // (workers * 4)))
+        executor = None
+        try:
+            executor = ProcessPoolExecutor(max_workers=workers)
+            chunks = [serials[i:i + chunksize] for i in range(0, len(serials), chunksize)]
+            for items in executor.map(decode_batch, chunks):
+                for item in items:
+                    yield item
+                    done += 1
+        except (OSError, RuntimeError, pickle.PicklingError):
+            pass  # pool unavailable or broken: finish in-process
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+
+    for start in range(done, len(serials), BATCH_ROWS):
+        yield from decode_batch(serials[start:start + BATCH_ROWS])
+
+def decode_many(serials: Iterable[str], workers: Optional[int] = None, chunksize: Optional[int] = None) -> List[DecodedItem]:
+    return list(iter_decode_many(serials, workers=workers, chunksize=chunksize))
+
+# Batch decoding with NumPy: serials become rows of a padded matrix of 6-bit symbols,
+# regrouped into bytes with array ops; the fixed-offset stats are column slices.
+BATCH_ROWS = 4096   # rows per matrix, bounds memory on big banks
+
+if np is not None:
+    _SYMBOL_LUT = np.full(256, -1, dtype=np.int16)
+    for _i, _c in enumerate(SERIAL_CHARS):
+        _SYMBOL_LUT[ord(_c)] = _i
+    del _i, _c
+
+def _batch_bytes(payloads: List[str]):
+    """bit_pack_decode for many payloads: (byte matrix n x w, zero padded; byte length per row)."""
+    n = len(payloads)
+    lens = np.fromiter(map(len, payloads), dtype=np.int64, count=n)
+    codes = np.frombuffer(''.join(payloads).encode('utf-32-le', 'surrogatepass'), dtype=np.uint32)
+    sym = _SYMBOL_LUT[np.where(codes < 256, codes, 0)]   # chr(0) is not a serial char
+    keep = sym >= 0
+    rows = np.repeat(np.arange(n), lens)[keep]
+    sym = (sym[keep] & 63).astype(np.uint8)
+
+    counts = np.bincount(rows, minlength=n)
+    starts = np.cumsum(counts) - counts
+    cols = np.arange(len(rows)) - starts[rows]
+    width = max(20, int(counts.max(initial=0)) * 6 // 8 + 3)   # at least the 20 raw-field bytes
+    symbols = np.zeros((n, (width + 2) // 3 * 4), dtype=np.uint8)   # ceil(width / 3) groups of 4
+    symbols[rows, cols] = sym
+
+    s = symbols.reshape(n, -1, 4)
+    out = np.empty((n, s.shape[1], 3), dtype=np.uint8)
+    out[:, :, 0] = (s[:, :, 0] << 2) | (s[:, :, 1] >> 4)
+    out[:, :, 1] = (s[:, :, 1] << 4) | (s[:, :, 2] >> 2)
+    out[:, :, 2] = (s[:, :, 2] << 6) | s[:, :, 3]
+    return out.reshape(n, -1), (counts * 6 + 7) // 8
+
+def _column(values, present):
+    """Array column -> list of int, None where the scalar decoder finds no value."""
+    return [v if ok else None for v, ok in zip(values.tolist(), present.tolist())]
+
+def _batch_items(serials: List[str]) -> List[DecodedItem]:
+    prefixes = ['@Ug' if s.startswith('@Ug') else '' for s in serials]
+    data, lengths = _batch_bytes([s[len(p):] for s, p in zip(serials, prefixes)])
+    width = data.shape[1]
+    blob = data.tobytes()
+
+    u16 = data[:, 0:20:2].astype(np.int64) | (data[:, 1:20:2].astype(np.int64) << 8)
+    has_u16 = np.arange(1, 20, 2) < lengths[:, None]
+    has_byte = np.arange(20) < lengths[:, None]
+    def val16(i):
+        return _column(u16[:, i // 2], has_u16[:, i // 2])
+    def byte(i):
+        return _column(data[:, i], has_byte[:, i])
+
+    # decode_other_type: first two u16 in 100..10000 among the first min(10, n // 2)
+    hit = has_u16 & (u16 >= 100) & (u16 <= 10000)
+    rank = np.cumsum(hit, axis=1)
+    first = _column(np.where(hit & (rank == 1), u16, 0).sum(axis=1), rank[:, -1] >= 1)
+    second = _column(np.where(hit & (rank == 2), u16, 0).sum(axis=1), rank[:, -1] >= 2)
+
+    b1, b2, b3, b4, b5, b6, b8, b9, b13, b14 = (byte(i) for i in (1, 2, 3, 4, 5, 6, 8, 9, 13, 14))
+    v0, v2, v4, v8, v10, v12 = (val16(i) for i in (0, 2, 4, 8, 10, 12))
+    lens = lengths.tolist()
+
+    items = []
+    for k, serial in enumerate(serials):
+        n = lens[k]
+        item_type = serial[3] if len(serial) >= 4 and prefixes[k] else '?'
+        if item_type == 'r':
+            stats = ItemStats(primary_stat=v0[k], secondary_stat=v12[k], manufacturer=b4[k],
+                              item_class=b8[k], rarity=b1[k])
+            if b13[k] in (2, 34):
+                stats.level = b13[k]
+            category, confidence = 'weapon', "high" if n in [24, 26] else "medium"
+        elif item_type == 'e':
+            stats = ItemStats(primary_stat=v2[k], secondary_stat=v8[k], level=v10[k] if n > 38 else None,
+                              manufacturer=b1[k], item_class=b3[k], rarity=b9[k])
+            category, confidence = 'equipment', "high" if stats.manufacturer == 49 else "medium"
+        elif item_type == 'd':
+            stats = ItemStats(primary_stat=v4[k], secondary_stat=v8[k], level=v10[k],
+                              manufacturer=b5[k], item_class=b6[k], rarity=b14[k])
+            category, confidence = 'equipment_alt', "high" if stats.manufacturer == 15 else "medium"
+        else:
+            stats = ItemStats(manufacturer=b1[k], rarity=b2[k], item_class=b3[k], level=v10[k],
+                              primary_stat=first[k], secondary_stat=second[k])
+            category, confidence = ITEM_CATEGORIES.get(item_type, 'unknown'), "low"
+        items.append(DecodedItem(
+            serial=serial,
+            item_type=item_type,
+            item_category=category,
+            length=n,
+            stats=stats,
+            confidence=confidence,
+            original_binary=blob[k * width:k * width + n],
+            original_prefix=prefixes[k],
+            weapon_name=get_weapon_name(serial)
+        ))
+    return items
+
+def decode_batch(serials: Iterable[str]) -> List[DecodedItem]:
+    """decode_item_serial over a list, vectorized with NumPy when it is installed (same results)."""
+    serials = list(serials)
+    if np is None:
+        return [decode_item_serial(s) for s in serials]
+    items = []
+    for start in range(0, len(serials), BATCH_ROWS):
+        chunk = serials[start:start + BATCH_ROWS]
+        if all(isinstance(s, str) for s in chunk):
+            items.extend(_batch_items(chunk))
+        else:  # non-str input: the scalar decoder reports it item by item
+            items.extend(decode_item_serial(s) for s in chunk)
+    return items
+
 def encode_item_serial(decoded_item: DecodedItem) -> str:
     try:
         data = bytearray(decoded_item.original_binary)
@@ -484,6 +725,110 @@ def encode_item_serial(decoded_item: DecodedItem) -> str:
     except Exception as e:
         return decoded_item.serial
 
+# Where encode_item_serial writes each stat, per item type and in its write order:
+# (field, byte offset, size). Other types keep primary/secondary on their first two
+# potential_stats, found in the decoded bytes.
+STAT_FIELDS = ('primary_stat', 'secondary_stat', 'level', 'rarity', 'manufacturer', 'item_class')
+STAT_LAYOUT = {
+    'r': (('primary_stat', 0, 2), ('secondary_stat', 12, 2), ('rarity', 1, 1),
+          ('manufacturer', 4, 1), ('item_class', 8, 1), ('level', 13, 1)),
+    'e': (('primary_stat', 2, 2), ('secondary_stat', 8, 2), ('manufacturer', 1, 1),
+          ('item_class', 3, 1), ('rarity', 9, 1), ('level', 10, 2)),
+    'd': (('primary_stat', 4, 2), ('secondary_stat', 8, 2), ('manufacturer', 5, 1),
+          ('item_class', 6, 1), ('rarity', 14, 1), ('level', 10, 2)),
+}
+_OTHER_LAYOUT = (('manufacturer', 1, 1), ('rarity', 2, 1), ('item_class', 3, 1), ('level', 10, 2))
+
+def _stat_layout(item_type: str, data: bytes):
+    layout = STAT_LAYOUT.get(item_type)
+    if layout is None:
+        potential = _potential_stats(data)[:2]
+        layout = tuple((field, pos, 2) for field, (pos, _) in zip(('primary_stat', 'secondary_stat'), potential))
+        layout += _OTHER_LAYOUT
+    return layout
+
+def check_patch(patch: Dict[str, int]) -> Dict[str, int]:
+    """Validate a stat patch ({field: value}, fields from STAT_FIELDS); ValueError otherwise."""
+    for field, value in patch.items():
+        if field not in STAT_FIELDS:
+            raise ValueError(f"unknown stat field: {field!r}")
+        if not isinstance(value, int) or isinstance(value, bool) or not 0 <= value <= 0xFFFF:
+            raise ValueError(f"{field} must be an integer between 0 and 65535, got {value!r}")
+    return patch
+
+def patch_serial(serial: str, patch: Dict[str, int], item_types: Optional[Iterable[str]] = None) -> str:
+    """
+    encode_item_serial of the decoded serial with the patched stats, in one decode and one
+    encode: each field is written straight into the byte buffer at its STAT_LAYOUT offset.
+    Items whose type is not in item_types are returned unchanged, and so are items where a
+    value does not fit its slot (as encode_item_serial does). ValueError if check_patch rejects patch.
+    """
+    check_patch(patch)
+    data, prefix, positions, offsets = bit_pack_decode(serial)
+    item_type = serial[3] if len(serial) >= 4 and prefix else '?'
+    if item_types is not None and item_type not in item_types:
+        return serial
+
+    buf = bytearray(data)
+    modified = False
+    for field, pos, size in _stat_layout(item_type, data):
+        value = patch.get(field)
+        if value is None or pos + size > len(data):
+            continue
+        if size == 2:
+            if value == _U16_LE.unpack_from(data, pos)[0]:
+                continue
+            _U16_LE.pack_into(buf, pos, value)
+        else:
+            if value == data[pos]:
+                continue
+            if value > 0xFF:
+                return serial
+            buf[pos] = value
+        modified = True
+
+    if not modified:
+        return serial
+    return bit_pack_encode(bytes(buf), prefix, serial[len(prefix):], positions, offsets)
+
+def _patch_chunk(args) -> List[str]:
+    serials, patch, item_types = args
+    return [patch_serial(s, patch, item_types) for s in serials]
+
+def iter_patch_serials(serials: Iterable[str], patch: Dict[str, int], item_types: Optional[Iterable[str]] = None,
+                       workers: Optional[int] = None, chunksize: Optional[int] = None) -> Iterator[str]:
+    """patch_serial over many serials, in order; big lists go through a process pool like iter_decode_many."""
+    check_patch(patch)
+    serials = list(serials)
+    item_types = None if item_types is None else frozenset(item_types)
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    done = 0
+    if workers > 1 and len(serials) >= DECODE_MANY_THRESHOLD:
+        if chunksize is None:
+            chunksize = max(1, min(2000, len(serials) // (workers * 4)))
+        executor = None
+        try:
+            executor = ProcessPoolExecutor(max_workers=workers)
+            chunks = [(serials[i:i + chunksize], patch, item_types) for i in range(0, len(serials), chunksize)]
+            for patched in executor.map(_patch_chunk, chunks):
+                for serial in patched:
+                    yield serial
+                    done += 1
+        except (OSError, RuntimeError, pickle.PicklingError):
+            pass  # pool unavailable or broken: finish in-process
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+
+    for serial in serials[done:]:
+        yield patch_serial(serial, patch, item_types)
+
+def patch_serials(serials: Iterable[str], patch: Dict[str, int], item_types: Optional[Iterable[str]] = None,
+                  workers: Optional[int] = None, chunksize: Optional[int] = None) -> List[str]:
+    return list(iter_patch_serials(serials, patch, item_types, workers=workers, chunksize=chunksize))
+
 class GearNGunEditor:
     def __init__(self, root):
         self.root = root
@@ -0,0 +1,65 @@
+"""Reference model for the ItemStore / SearchIndex tests: the item list as plain dicts."""
+from bank_core import ItemStore, detect_category
+
+SERIALS = [f"@Ug{t}{body}" for t in "redw!" for body in ("Alpha9", "beta_Q", "GAMMA7x")]
+COMMENTS = ["", "", "  ", "gun", "Shield mk2", "legendary Gun", "beta"]
+CATEGORIES = ItemStore.CATEGORIES + ("Custom",)
+
+
+class Model:
+    """id -> {"serial","comment","category"}, alive ids in list order."""
+
+    def __init__(self):
+        self.rows = {}
+        self.alive = []
+
+    def append(self, iid, serial, comment, category):
+        self.rows[iid] = {"serial": serial, "comment": comment if comment.strip() else "",
+                          "category": category or detect_category(serial)}
+        self.alive.append(iid)
+
+    def group(self, serial):
+        return [i for i in self.alive if self.rows[i]["serial"] == serial]
+
+    def search(self, category, has_comment, query):
+        return [i for i in self.alive
+                if (category is None or self.rows[i]["category"] == category)
+                and (has_comment is None or bool(self.rows[i]["comment"]) == has_comment)
+                and (query in self.rows[i]["serial"].lower() or query in self.rows[i]["comment"].lower())]
+
+
+def mutate(rng, store, model, index=None):
+    """One random append / remove / edit, applied to store, model and (if given) a SearchIndex."""
+    roll = rng.random()
+    if roll < 0.45 or not model.alive:
+        serial, comment = rng.choice(SERIALS), rng.choice(COMMENTS)
+        category = rng.choice((None,) + CATEGORIES)
+        iid = store.append(serial, comment, category)
+        model.append(iid, serial, comment, category)
+        if index is not None:
+            index.add([iid])
+        return
+    iid = rng.choice(model.alive)
+    if roll < 0.6:
+        gone = rng.sample(model.alive, rng.randint(1, min(4, len(model.alive))))
+        assert store.remove(gone + gone[:1]) == len(gone)
+        model.alive = [i for i in model.alive if i not in gone]
+        if index is not None:
+            index.remove(gone)
+    elif roll < 0.75:
+        comment = rng.choice(COMMENTS)
+        store.set_comment(iid, comment)
+        model.rows[iid]["comment"] = comment if comment.strip() else ""
+        if index is not None:
+            index.update(iid)
+    elif roll < 0.9:
+        serial = rng.choice(SERIALS)
+        store.set_serial(iid, serial)
+        model.rows[iid]["serial"] = serial
+        if index is not None:
+            index.remove([iid])
+            index.add([iid])
+    else:
+        category = rng.choice(CATEGORIES)
+        store.set_category(iid, category)
+        model.rows[iid]["category"] = category
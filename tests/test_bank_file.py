@@ -0,0 +1,237 @@
+import os
+
+import pytest
+
+import bank_core
+
+
+def make_items(start, count):
+    return [{"serial": f"@Ugr{i:05d}Abc", "comment": f"item {i}" if i % 3 == 0 else ""}
+            for i in range(start, start + count)]
+
+
+def slots(entries):
+    return {idx: (e["serial"], e.get("comment", "")) for idx, e in entries.items()}
+
+
+def bump_mtime(path):
+    """Same-size edits can land in the same mtime tick: move the mtime forward explicitly."""
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10_000_000))
+
+
+@pytest.mark.parametrize("slot_indent, inner_indent", [(0, 2), (2, 4)])
+def test_append_writes_the_same_bytes_as_a_rewrite(tmp_path, slot_indent, inner_indent):
+    opts = dict(slot_indent=slot_indent, inner_indent=inner_indent)
+    first = make_items(0, 20)
+    batches = [make_items(15, 10) + make_items(18, 3), make_items(40, 5)]   # duplicates included
+    appended, rewritten, reference = (tmp_path / name for name in ("a.yaml", "r.yaml", "ref.yaml"))
+    bank_core.write_yaml_manual(appended, first, **opts)
+    bank_core.write_yaml_manual(rewritten, first, **opts)
+    bank_a, bank_r = bank_core.BankFile(appended), bank_core.BankFile(rewritten)
+    expected = list(first)
+    for batch in batches:
+        added, mode = bank_a.merge(batch, **opts)
+        assert mode == "append"
+        assert bank_r.merge(batch, incremental=False, **opts) == (added, "rewrite")
+        known = {it["serial"] for it in expected}
+        new = [it for it in dict((it["serial"], it) for it in batch).values() if it["serial"] not in known]
+        assert added == len(new)
+        expected += new
+        bank_core.write_yaml_manual(reference, expected, **opts)
+        assert appended.read_bytes() == rewritten.read_bytes() == reference.read_bytes()
+    assert slots(bank_a.entries) == slots(bank_core.BankFile(appended).load())
+
+
+def test_a_hand_edited_bank_is_rewritten(tmp_path):
+    path = tmp_path / "bank.yaml"
+    bank_core.write_yaml_manual(path, make_items(0, 3))
+    path.write_text(path.read_text(encoding="utf-8").replace("  serial:", "    serial:", 1), encoding="utf-8")
+    bank = bank_core.BankFile(path)
+    assert bank.merge(make_items(3, 2)) == (2, "rewrite")
+    assert [e["serial"] for _, e in sorted(bank.entries.items())] == [it["serial"] for it in make_items(0, 5)]
+
+
+def crash_on_fsync(monkeypatch, path, call, keep):
+    """Make the call-th fsync fail after truncating path to keep bytes (simulated power cut)."""
+    real = os.fsync
+    calls = []
+
+    def fsync(fd):
+        calls.append(fd)
+        if len(calls) == call:
+            os.truncate(path, keep)
+            raise OSError("simulated crash")
+        real(fd)
+
+    monkeypatch.setattr(os, "fsync", fsync)
+
+
+@pytest.mark.parametrize("written", [0.0, 0.5, 1.0])
+def test_truncated_append_is_replayed_from_the_journal(tmp_path, monkeypatch, written):
+    path, reference = tmp_path / "bank.yaml", tmp_path / "ref.yaml"
+    bank_core.write_yaml_manual(path, make_items(0, 10))
+    bank_core.write_yaml_manual(reference, make_items(0, 10))
+    bank_core.append_yaml_slots(reference, make_items(10, 5), 10)
+    base, full = path.stat().st_size, reference.stat().st_size
+    with monkeypatch.context() as m:
+        crash_on_fsync(m, path, call=2, keep=base + int((full - base) * written))   # 2nd: bank.yaml
+        with pytest.raises(OSError):
+            bank_core.append_yaml_slots(path, make_items(10, 5), 10)
+    assert (tmp_path / "bank.yaml.journal").exists()
+    bank = bank_core.BankFile(path)
+    bank.load()
+    assert bank.journal_result == "replayed"
+    assert path.read_bytes() == reference.read_bytes()
+    assert not (tmp_path / "bank.yaml.journal").exists()
+    assert len(bank.entries) == 15
+
+
+def test_incomplete_journal_is_discarded(tmp_path, monkeypatch):
+    path = tmp_path / "bank.yaml"
+    bank_core.write_yaml_manual(path, make_items(0, 10))
+    before = path.read_bytes()
+    journal = tmp_path / "bank.yaml.journal"
+    with monkeypatch.context() as m:
+        crash_on_fsync(m, path, call=1, keep=len(before))   # 1st: the journal itself
+        with pytest.raises(OSError):
+            bank_core.append_yaml_slots(path, make_items(10, 5), 10)
+    journal.write_bytes(journal.read_bytes()[:-7])
+    assert bank_core.replay_bank_journal(path) == "discarded"
+    assert path.read_bytes() == before
+    assert not journal.exists()
+
+
+
+@pytest.mark.parametrize("edit", ["tail", "appended"])
+def test_journal_of_another_bank_yaml_is_discarded(tmp_path, monkeypatch, edit):
+    path = tmp_path / "bank.yaml"
+    bank_core.write_yaml_manual(path, make_items(0, 10))
+    base = path.stat().st_size
+    with monkeypatch.context() as m:
+        crash_on_fsync(m, path, call=2, keep=base + 40)
+        with pytest.raises(OSError):
+            bank_core.append_yaml_slots(path, make_items(10, 5), 10)
+    data = path.read_bytes()
+    if edit == "tail":   # bank.yaml replaced by another tool before the restart (same size)
+        data = data.replace(b"@Ugr00009Abc", b"@Ugr00009Xyz")
+    else:                # the half-written slot is not the one the journal holds
+        data = data[:base] + data[base:].replace(b"slot_10", b"slot_99")
+    path.write_bytes(data)
+    bank = bank_core.BankFile(path)
+    bank.load()
+    assert bank.journal_result == "discarded"
+    assert path.read_bytes() == data
+    assert not (tmp_path / "bank.yaml.journal").exists()
+
+
+def test_rewrite_is_atomic_and_rotates_backups(tmp_path, monkeypatch):
+    path = tmp_path / "bank.yaml"
+    versions = []
+    for n in range(1, 5):
+        bank_core.write_yaml_manual(path, make_items(0, n), backups=2)
+        versions.append(path.read_bytes())
+    assert (tmp_path / "bank.yaml.bak1").read_bytes() == versions[-2]
+    assert (tmp_path / "bank.yaml.bak2").read_bytes() == versions[-3]
+    assert not (tmp_path / "bank.yaml.bak3").exists()
+
+    def fail(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(os, "replace", fail)
+    with pytest.raises(OSError):
+        bank_core.write_yaml_manual(path, make_items(0, 9))
+    assert path.read_bytes() == versions[-1]
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["bank.yaml", "bank.yaml.bak1", "bank.yaml.bak2"]
+
+
+def test_snapshot_is_used_only_while_bank_yaml_is_unchanged(tmp_path):
+    path = tmp_path / "bank.yaml"
+    items = make_items(0, 30)
+    bank_core.write_yaml_manual(path, items)
+    snap = bank_core.BankFile(path).open_snapshot()   # parse + snapshot written
+    snap.close()
+
+    bank = bank_core.BankFile(path)
+    snap = bank.open_snapshot()
+    assert bank.entries == {}   # read from the snapshot, no parse
+    rows = list(snap.rows())
+    assert [(slot, ser, com) for slot, ser, com, _ in rows] == [
+        (i, it["serial"], it["comment"]) for i, it in enumerate(items)]
+    assert [cat for *_, cat in rows] == [bank_core.detect_category(it["serial"]) for it in items]
+    assert snap.slots() == list(range(len(items)))
+    snap.close()
+
+    path.write_bytes(path.read_bytes().replace(b"@Ugr00007Abc", b"@Ugr00007Xyz"))   # same size
+    bump_mtime(path)
+    signature = bank_core.BankFile(path)._stat()
+    assert bank_core.BankSnapshot.open(bank_core.snapshot_path(path), signature) is None
+    serials, _, _ = bank_core.BankFile(path).read_columns()
+    assert serials[7] == "@Ugr00007Xyz"   # parsed again, snapshot rebuilt
+    assert bank_core.BankSnapshot.open(bank_core.snapshot_path(path), signature) is not None
+
+
+def test_corrupt_snapshot_falls_back_to_a_parse(tmp_path):
+    path = tmp_path / "bank.yaml"
+    bank_core.write_yaml_manual(path, make_items(0, 10))
+    bank_core.BankFile(path).open_snapshot().close()
+    snap_path = bank_core.snapshot_path(path)
+    snap_path.write_bytes(snap_path.read_bytes()[:100])
+    bank = bank_core.BankFile(path)
+    serials, comments, _ = bank.read_columns()
+    assert len(bank.entries) == 10
+    assert serials == [it["serial"] for it in make_items(0, 10)]
+    assert comments == [it["comment"] for it in make_items(0, 10)]
+
+
+def test_snapshot_refuses_line_breaks(tmp_path):
+    snap_path = tmp_path / "bank.yaml.snap"
+    entries = {0: {"serial": "@Ugr1", "comment": "two\nlines"}}
+    with pytest.raises(ValueError):
+        bank_core.BankSnapshot.write(snap_path, (10, 0), entries)
+    assert list(tmp_path.iterdir()) == []   # nothing half-written
+
+
+def test_reload_changes_reads_only_an_appended_tail(tmp_path):
+    path = tmp_path / "bank.yaml"
+    bank_core.write_yaml_manual(path, make_items(0, 10))
+    bank = bank_core.BankFile(path)
+    bank.load()
+    assert bank.reload_changes() is None
+    bank_core.BankFile(path).merge(make_items(10, 3))   # another program appends
+    diff = bank.reload_changes()
+    assert diff.mode == "append" and not diff.removed and not diff.changed
+    assert [e["serial"] for _, e in diff.added] == [it["serial"] for it in make_items(10, 3)]
+    assert slots(bank.entries) == slots(bank_core.BankFile(path).load())
+    assert bank.reload_changes() is None
+
+
+def test_reload_changes_diffs_a_rewritten_bank(tmp_path):
+    path = tmp_path / "bank.yaml"
+    items = make_items(0, 10)
+    bank_core.write_yaml_manual(path, items)
+    bank = bank_core.BankFile(path)
+    bank.load()
+    edited = items[:4] + [dict(items[4], comment="renamed")] + items[5:8]
+    bank_core.write_yaml_manual(path, edited)
+    bump_mtime(path)
+    diff = bank.reload_changes()
+    assert diff.mode == "full"
+    assert [(idx, old["comment"], new["comment"]) for idx, old, new in diff.changed] == [(4, "", "renamed")]
+    assert [idx for idx, _ in diff.removed] == [8, 9] and not diff.added
+    assert slots(bank.entries) == slots(bank_core.BankFile(path).load())
+
+
+def test_reload_changes_after_starting_from_the_snapshot(tmp_path):
+    path = tmp_path / "bank.yaml"
+    bank_core.write_yaml_manual(path, make_items(0, 6))
+    bank_core.BankFile(path).open_snapshot().close()
+    bank = bank_core.BankFile(path)
+    bank.read_columns()
+    assert bank.entries == {}   # entries not read yet
+    bank_core.write_yaml_manual(path, make_items(0, 3) + make_items(10, 4))
+    bump_mtime(path)
+    diff = bank.reload_changes()
+    assert [idx for idx, _, _ in diff.changed] == [3, 4, 5]
+    assert [idx for idx, _ in diff.added] == [6]
+    assert not diff.removed
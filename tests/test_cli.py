@@ -0,0 +1,47 @@
+import bank_cli
+import bank_core
+
+PASTE = """slot_0:
+  serial: '@Ugr00001Abc' # first
+  state_flags: 1
+@Ugr00002Abc
+@Ugr00001Abc
+junk line
+"""
+
+
+def test_import_writes_yaml_slots(tmp_path, capsys):
+    src = tmp_path / "dump.txt"
+    src.write_text(PASTE, encoding="utf-8")
+    assert bank_cli.main_cli(["import", str(src)]) == bank_cli.EXIT_OK
+    out = capsys.readouterr().out
+    assert out == ("slot_0:\n  serial: '@Ugr00001Abc' # first\n  state_flags: 1\n"
+                   "slot_1:\n  serial: '@Ugr00002Abc'\n  state_flags: 1\n")
+
+
+def test_dedupe_across_inputs(tmp_path, capsys):
+    a, b = tmp_path / "a.txt", tmp_path / "b.txt"
+    a.write_text("@Ugr00001Abc\n", encoding="utf-8")
+    b.write_text(PASTE, encoding="utf-8")
+    out = tmp_path / "out.yaml"
+    assert bank_cli.main_cli(["dedupe", str(a), str(b), "-o", str(out)]) == bank_cli.EXIT_OK
+    entries, _, _ = bank_core.parse_bank_yaml_simple(out)
+    assert [(e["serial"], e["comment"]) for _, e in sorted(entries.items())] == [
+        ("@Ugr00001Abc", "first"), ("@Ugr00002Abc", "")]
+    assert "1 duplicate(s) removed" in capsys.readouterr().err
+
+
+def test_merge_adds_only_new_serials(tmp_path):
+    bank = tmp_path / "bank.yaml"
+    bank_core.write_yaml_manual(bank, [{"serial": "@Ugr00002Abc", "comment": ""}])
+    src = tmp_path / "dump.txt"
+    src.write_text(PASTE, encoding="utf-8")
+    assert bank_cli.main_cli(["merge", str(src), "--bank", str(bank)]) == bank_cli.EXIT_OK
+    entries, _, _ = bank_core.parse_bank_yaml_simple(bank)
+    assert [e["serial"] for _, e in sorted(entries.items())] == ["@Ugr00002Abc", "@Ugr00001Abc"]
+
+
+def test_no_serial_is_exit_status_1(tmp_path):
+    src = tmp_path / "empty.txt"
+    src.write_text("nothing here\n", encoding="utf-8")
+    assert bank_cli.main_cli(["import", str(src)]) == bank_cli.EXIT_EMPTY
@@ -0,0 +1,92 @@
+import random
+
+import pytest
+
+import main
+
+TYPE_CHARS = "redwuf!"
+
+
+def random_serial(rng):
+    return "@Ug" + rng.choice(TYPE_CHARS) + "".join(rng.choices(main.SERIAL_CHARS, k=rng.randint(20, 60)))
+
+
+def random_blob(rng):
+    """Arbitrary text: alphabet characters mixed with characters the codec must skip."""
+    pool = main.SERIAL_CHARS + " \t'\"@,.:|\\é€あ"
+    blob = "".join(rng.choice(pool) for _ in range(rng.randint(0, 80)))
+    return ("@Ug" + blob) if rng.random() < 0.5 else blob
+
+
+def inputs(seed, count=200):
+    rng = random.Random(seed)
+    return [random_serial(rng) if rng.random() < 0.5 else random_blob(rng) for _ in range(count)]
+
+
+@pytest.mark.parametrize("serial", inputs(1))
+def test_bit_pack_decode_matches_reference(serial):
+    assert main.bit_pack_decode(serial) == main._bit_pack_decode_reference(serial)
+
+
+@pytest.mark.parametrize("serial", inputs(2))
+def test_bit_pack_encode_matches_reference_and_round_trips(serial):
+    data, prefix, positions, offsets = main.bit_pack_decode(serial)
+    payload = serial[len(prefix):]
+    rng = random.Random(serial)
+    for buf in (data, data[:rng.randint(0, len(data))],
+                data + bytes(rng.randrange(256) for _ in range(rng.randint(1, 4))),
+                bytes(rng.randrange(256) for _ in range(len(data)))):
+        assert (main.bit_pack_encode(buf, prefix, payload, positions, offsets)
+                == main._bit_pack_encode_reference(buf, prefix, payload, positions, offsets))
+    assert main.bit_pack_encode(data, prefix, payload, positions, offsets) == serial
+
+
+def test_encode_item_serial_round_trip():
+    rng = random.Random(3)
+    for _ in range(200):
+        serial = random_serial(rng)
+        assert main.encode_item_serial(main.decode_item_serial(serial)) == serial
+
+
+ITEM_FIELDS = ("serial", "item_type", "item_category", "length", "stats", "confidence",
+               "original_binary", "original_prefix", "weapon_name")
+
+
+def test_decode_batch_matches_decode_item_serial():
+    serials = inputs(4, 1000) + ["", "@Ug", "@Ugr", "@Ugr" + "A" * 200, "@Ugr\ud800Abc", "@Ugréèü" * 4]
+    for serial, got in zip(serials, main.decode_batch(serials)):
+        want = main.decode_item_serial(serial)
+        assert [getattr(got, f) for f in ITEM_FIELDS] == [getattr(want, f) for f in ITEM_FIELDS], serial
+
+
+def test_patch_serial_matches_encode_item_serial():
+    rng = random.Random(5)
+    for _ in range(100):
+        serial = "@Ug" + rng.choice("red") + "".join(rng.choices(main.SERIAL_CHARS, k=40))
+        patch = {"rarity": rng.randrange(256), "item_class": rng.randrange(256)}
+        item = main.decode_item_serial(serial)
+        before = (item.stats.rarity, item.stats.item_class)
+        item.stats.rarity, item.stats.item_class = patch["rarity"], patch["item_class"]
+        patched = main.patch_serial(serial, patch)
+        assert patched == main.encode_item_serial(item)
+        stats = main.decode_item_serial(patched).stats
+        assert (stats.rarity, stats.item_class) == (patch["rarity"], patch["item_class"])
+        restored = main.patch_serial(patched, dict(zip(("rarity", "item_class"), before)))
+        assert main.bit_pack_decode(restored)[0] == main.bit_pack_decode(serial)[0]
+
+
+def test_patch_serials_filters_types_and_validates():
+    rng = random.Random(6)
+    serials = [random_serial(rng) for _ in range(50)]
+    got = main.patch_serials(serials, {"level": 30}, item_types="r", workers=1)
+    assert got == [main.patch_serial(s, {"level": 30}) if s[3] == "r" else s for s in serials]
+    with pytest.raises(ValueError):
+        main.patch_serials(serials, {"level": 70000})
+    with pytest.raises(ValueError):
+        main.patch_serials(serials, {"colour": 1})
+
+
+@pytest.mark.parametrize("patch", [{"level": 70000}, {"rarity": -1}, {"level": 1.5}, {"colour": 1}])
+def test_patch_serial_rejects_an_invalid_patch(patch):
+    with pytest.raises(ValueError):
+        main.patch_serial("@Ugr" + "A" * 40, patch)
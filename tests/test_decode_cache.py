@@ -0,0 +1,22 @@
+from bank_core import SUMMARY_FIELDS, DecodeCache
+
+
+def summary(n):
+    return dict.fromkeys(SUMMARY_FIELDS, None) | {"weapon_name": f"gun {n}", "level": n}
+
+
+def test_decode_cache_round_trip_eviction_and_version(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    cache = DecodeCache(path, "v1", max_entries=3)
+    cache.put_many({f"@Ugr{n}": summary(n) for n in range(3)})
+    assert cache.get_many(["@Ugr0", "@Ugr9", "@Ugr2", "@Ugr0"]) == {"@Ugr0": summary(0), "@Ugr2": summary(2)}
+    assert (cache.hits, cache.misses) == (2, 1)
+    cache.put_many({"@Ugr3": summary(3)})   # over max_entries: the least recently used goes
+    assert set(cache.get_many([f"@Ugr{n}" for n in range(4)])) == {"@Ugr0", "@Ugr2", "@Ugr3"}
+    cache.close()
+
+    cache = DecodeCache(path, "v1")   # next session
+    assert cache.get_many(["@Ugr3"]) == {"@Ugr3": summary(3)}
+    cache.set_version("v2")   # main.py changed: everything is dropped
+    assert cache.get_many(["@Ugr3"]) == {} and cache.stats()["entries"] == 0
+    cache.close()
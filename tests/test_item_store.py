@@ -0,0 +1,94 @@
+import random
+
+import pytest
+
+from bank_core import ItemStore, dedupe_items, detect_category
+from store_model import COMMENTS, SERIALS, Model, mutate
+
+SORTS = [("serial",), ("comment",), ("category",), ("category", "serial"), ("comment", "category", "serial")]
+
+
+def check_store(store, model):
+    assert list(store.ids) == model.alive
+    for iid in model.alive:
+        assert store.item(iid) == {"id": iid, **model.rows[iid]}
+    assert list(store.iter_items()) == [{k: model.rows[i][k] for k in ("serial", "comment", "category")}
+                                        for i in model.alive]
+    for serial in SERIALS:
+        group = model.group(serial)
+        assert store.group(serial) == group
+        assert store.first(serial) == (group[0] if group else None)
+
+
+def check_sorts(rng, store, model):
+    def key(iid, columns):
+        return tuple(model.rows[iid][c].lower() for c in columns)
+
+    for columns in SORTS:
+        expected = sorted(model.alive, key=lambda i: key(i, columns))
+        assert list(store.sorted_ids(columns)) == expected
+        assert list(store.order(None, columns, reverse=True)) == expected[::-1]
+        subset = [i for i in model.alive if rng.random() < rng.choice((0.02, 0.5))]
+        assert list(store.order(subset, columns)) == sorted(subset, key=lambda i: key(i, columns))
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_item_store_matches_a_list_of_dicts(seed):
+    rng = random.Random(seed)
+    store, model = ItemStore(), Model()
+    for step in range(300):
+        mutate(rng, store, model)
+        if step % 10 == 0:
+            check_store(store, model)
+            check_sorts(rng, store, model)
+    check_store(store, model)
+    check_sorts(rng, store, model)
+    before = list(store.iter_items())
+    frozen = store.frozen()
+    for _ in range(20):
+        mutate(rng, store, model)
+    assert list(frozen.iter_items()) == before
+
+
+def test_load_columns_indexes_duplicates():
+    store = ItemStore()
+    serials = ["@Ugra", "@Ugeb", "@Ugra", "@Ugra"]
+    codes = bytes(ItemStore.CATEGORIES.index(detect_category(s)) for s in serials)
+    assert list(store.load_columns(serials, ["", "x", "", "y"], codes)) == [0, 1, 2, 3]
+    assert store.group("@Ugra") == [0, 2, 3]
+    assert store.comments == {1: "x", 3: "y"}
+    assert [store.category(i) for i in store.ids] == [detect_category(s) for s in serials]
+
+
+def test_removing_duplicates_in_any_order_keeps_groups_exact():
+    store = ItemStore()
+    store.load_columns(["@Ugra"] * 50 + ["@Ugeb"] * 5, [""] * 55, bytes(55))
+    order = list(range(1, 50))
+    random.Random(0).shuffle(order)
+    for n, iid in enumerate(order[:40]):
+        store.remove([iid])
+        if n == 20:
+            store.set_serial(0, "@Ugeb")   # the first one leaves, then comes back
+            store.set_serial(0, "@Ugra")
+    alive = [0] + sorted(order[40:])
+    assert store.group("@Ugra") == alive and store.first("@Ugra") == 0
+    store.remove(alive[:-1])
+    assert store.group("@Ugra") == alive[-1:]
+    store.set_serial(alive[-1], "@Ugeb")
+    assert store.group("@Ugra") == [] and store.group("@Ugeb") == alive[-1:] + list(range(50, 55))
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_dedupe_matches_dedupe_items(seed):
+    rng = random.Random(seed)
+    items = [{"serial": rng.choice(SERIALS), "comment": rng.choice(COMMENTS),
+              "category": rng.choice(ItemStore.CATEGORIES)} for _ in range(200)]
+    store = ItemStore()
+    for it in items:
+        store.append(it["serial"], it["comment"], it["category"])
+    before = {iid: store.comment(iid) for iid in store.ids}
+    dropped, enriched = store.dedupe()
+    blank = {"  ": ""}   # the store keeps no blank comments
+    kept, removed = dedupe_items([dict(it, comment=blank.get(it["comment"], it["comment"])) for it in items])
+    assert len(dropped) == removed and list(store.iter_items()) == kept
+    assert enriched == [iid for iid in store.ids if store.comment(iid) != before[iid]]
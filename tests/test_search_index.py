@@ -0,0 +1,48 @@
+import random
+
+import pytest
+
+from bank_core import ItemStore, SearchIndex
+from store_model import CATEGORIES, Model, mutate
+
+
+@pytest.mark.parametrize("sync_max", [0, 5, 10_000])
+def test_search_index_matches_a_scan(sync_max):
+    rng = random.Random(sync_max)
+    store, model = ItemStore(), Model()
+    index = SearchIndex(store)
+    index.SYNC_MAX = sync_max   # 0: trigrams only once index_pending() ran; large: always in sync
+    for step in range(400):
+        mutate(rng, store, model, index)
+        if rng.random() < 0.2:
+            index.index_pending(limit=rng.randint(1, 8))
+        if step % 5:
+            continue
+        texts = [model.rows[i][c].lower() for i in model.alive for c in ("serial", "comment")]
+        text = rng.choice([t for t in texts if t] or ["x"])
+        start = rng.randrange(len(text))
+        query = rng.choice([text[start:start + rng.randint(1, 6)], "", "zzzz"])
+        category = rng.choice((None,) + CATEGORIES)
+        has_comment = rng.choice((None, True, False))
+        got = index.search(category, has_comment, query)
+        if category is None and has_comment is None and not query:
+            assert got is None
+        else:
+            assert list(got) == model.search(category, has_comment, query)
+
+
+def test_stale_index_is_rebuilt_by_index_pending_not_by_search():
+    store = ItemStore()
+    index = SearchIndex(store)
+    index.SYNC_MAX = 0
+    index.add(store.load_columns([f"@Ugr{i:04d}x" for i in range(10)], [""] * 10, bytes(10)))
+    assert not index.index_pending()
+    for _ in range(3):
+        index.update(0)
+    store.remove(range(6))
+    index.remove(range(6))   # 9 traces for 4 items: reset
+    assert index.grams == {} and list(index.pending) == list(store.ids)
+    assert list(index.search(query="r000")) == [6, 7, 8, 9]
+    assert index.grams == {}   # the search scanned instead of rebuilding
+    assert not index.index_pending()
+    assert list(index.search(query="r0008")) == [8]